@@ -2,20 +2,52 @@ import os
 import re
 import csv
 import time
-import pyautogui
+import copy
+import threading
 import subprocess
-import pyperclip
 import webbrowser
 import json
 import psutil
+import shutil
+import sqlite3
+import tempfile
+import urllib.request
+import urllib.error
 from urllib.parse import urlparse
 from datetime import datetime
-from typing import List, Dict, Optional, Tuple, Set
-from selenium import webdriver
-from selenium.webdriver.edge.service import Service
-from selenium.webdriver.edge.options import Options
+from typing import List, Dict, Iterable, Optional, Tuple, Set
+from html import unescape
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
 import random
 
+from browser_backend import BrowserBackend, PyAutoGUIBackend, SeleniumBackend, HTTPBackend, BrowserBackendPool, LOGIN_URL_PATTERN
+import run_trace
+import embedded_state
+from download_stats import DownloadStatsCollector
+from retry_queue import RetryQueue
+from circuit_breaker import DomainCircuitBreaker
+from paper_library import StagingArea, LibraryLayout, doi_filename
+from library_index import LibraryIndex, link_or_copy
+from doi_index import DoiIndex
+from singleflight import DoiSingleFlight
+
+try:
+    import pyautogui
+except Exception:  # Linux无桌面环境下只能使用无头后端
+    pyautogui = None
+
+try:
+    import regex  # 支持匹配超时的正则库
+except ImportError:  # 未安装时用启发式预检查限制最坏情况
+    regex = None
+
+try:
+    import cv2
+    import numpy as np
+except ImportError:  # 未安装OpenCV时退回pyautogui.locateOnScreen
+    cv2 = None
+    np = None
+
 # 全局配置
 class Config:
     """应用程序配置类"""
@@ -25,13 +57,46 @@ class Config:
     DOWNLOAD_TEMPLATE_JSON = r"D:\Paperdownload-xzq\DownloadTemplates.json"  # 下载模板配置
     DOWNLOAD_SETTINGS_JSON = r"D:\Paperdownload-xzq\DownloadSettings.json"  # 下载设置配置
     LOGIN_CONFIG_JSON = r"D:\Paperdownload-xzq\LoginConfig.json"  # 登录配置路径
+    LOGIN_FLOW_JSON = r"D:\Paperdownload-xzq\LoginFlows.json"  # 登录流程配置路径
+    EDGE_PROFILE_PATH = os.path.expandvars(r"%LOCALAPPDATA%\Microsoft\Edge\User Data\Default")  # Edge用户配置目录
+    SESSION_PROBE_TTL = 1800  # 登录状态探测结果缓存时间(秒)
+    CLICK_POSITION_JSON = r"D:\Paperdownload-xzq\ClickPositions.json"  # 已学习的点击坐标缓存
+    DOWNLOAD_STATS_JSON = r"D:\Paperdownload-xzq\DownloadStats.json"  # 各域名下载耗时/成功率统计(供autotune.py使用)
     CSV_PATH = r"D:\Paperdownload-xzq\PaperDoi_updated-xzq_failed-1.csv"  # 论文列表CSV
     EDGE_DRIVER_PATH = r"D:\Paperdownload-xzq\edgedriver\msedgedriver.exe"  # Selenium驱动路径
     USE_SELENIUM = False  # 是否使用Selenium方案
+    HEADLESS = True  # Selenium方案是否使用无头浏览器
+    HEADLESS_PROFILE_DIR = ""  # Selenium浏览器的用户目录(先用它登录一次机构账号)，为空时为不带Cookie的新会话
+    PRINT_DOWNLOAD_WAIT = 10  # 打印页面为PDF之前，先等待浏览器自己下载PDF的时间(秒)
+    LAZY_HTML_CAPTURE = False  # 模板分支(direct=1)和页面头部快速路径不保存HTML快照，只在下载失败时补存；需同时开启SIdownload的SI_CAPTURE_HTML(已登录的HEADLESS_PROFILE_DIR)，否则这些论文的SI会被跳过
+    PARALLEL_PAGES = 1  # Selenium方案同时处理的页面数
+    HTTP_BACKEND = False  # 不启动浏览器，直接用HTTP请求(只适用于静态页面，主要用于基准测试)
+    HTTP_URL_MAP = {}  # HTTP后端的域名映射，如 {"www.sciencedirect.com": "http://127.0.1.14:8765"}
     DELAY_BETWEEN_PAPERS = 60  # 每篇论文间隔时间(秒)
+    RETRY_QUEUE_JSON = r"D:\Paperdownload-xzq\RetryQueue.json"  # 失败下载的延迟重试队列(跨运行保留)
+    RETRY_MAX_DELAY = 1800  # 重试退避上限(秒)
+    RETRY_DRAIN_WAIT = 600  # 新论文处理完后，最多等待多久执行剩余重试(秒)，更晚到期的留到下次运行
+    CIRCUIT_BREAKER_THRESHOLD = 3  # 同一域名连续失败多少篇后熔断
+    CIRCUIT_BREAKER_COOLDOWN = 600  # 熔断后多久放行一篇论文探测(秒)，探测失败时加倍
+    CIRCUIT_BREAKER_MAX_COOLDOWN = 3600  # 熔断冷却时间上限(秒)
     PAGE_LOAD_TIMEOUT = 40  # 页面加载超时时间(秒)
+    ENABLE_TRACE = True  # 是否记录各阶段耗时
+    EXTRACTION_TIME_BUDGET = 2.0  # 每次正则提取的时间预算(秒)，超出后改用线性扫描
+    EXTRACTION_SCAN_LIMIT = 20000000  # 预估回溯扫描字符数上限(未安装regex库时的预检查)
+    META_FAST_PATH = True  # 先只读页面头部的citation_pdf_url/Dublin Core元数据，没有时再扫描整个页面
+    HEAD_SCAN_LIMIT = 131072  # 快速路径最多读取的字符数(找不到</head>时)
+    SLOW_PAGE_LOG = r"D:\Paperdownload-xzq\slow_pages.jsonl"  # 超出预算的页面记录(可加入基准测试语料)
+    TRACE_PATH = r"D:\Paperdownload-xzq\traces"  # 耗时追踪输出目录(JSONL/Chrome trace/统计报告)
     DOCUMENT_EXTENSIONS = ["pdf"]  # 支持的文档扩展名
     PAPER_DOWNLOAD_FOLDER = r"D:\Paperdownload-xzq\Paper-xzq"  # Paper下载文件夹
+    LIBRARY_INDEX_DB = r"D:\PaperLibrary\library.db"  # 各项目共享的内容索引(SHA-256)，为空时不使用
+    PROJECT_NAME = "xzq"  # 登记到内容索引的项目名
+    SINGLEFLIGHT_DIR = r"D:\PaperLibrary\inflight"  # 各项目共享的进行中DOI锁目录，多个项目同时处理同一DOI时只下载一次，为空时不使用
+    SINGLEFLIGHT_POLL = 60  # 其它项目正在处理同一DOI时，多久后查看其结果(秒)
+    SINGLEFLIGHT_STALE = 1800  # 锁超过多久未释放视为持有进程已失效(秒)
+    LIBRARY_LAYOUT = "prefix"  # Paper库目录布局: flat/prefix(DOI前缀分片)/hash，已有平铺文件用migrate_library.py迁移
+    PHOTOS_PATH = r"D:\Paperdownload\photos"  # 登录按钮和保存控件(save_control.png)模板图片文件夹
+    IMAGE_CONFIDENCE = 0.9  # 模板匹配相似度阈值
 
     @classmethod
     def ensure_directories_exist(cls):
@@ -163,16 +228,84 @@ class DownloadSettingsManager:
         return settings.get("retry_delay", 10)
 
 
+class ClickPositionCache:
+    """点击坐标缓存类：按分辨率和域名持久化登录按钮和保存控件上次被模板匹配到的位置"""
+    def __init__(self, json_path: str):
+        self.json_path = json_path
+        self.positions = {}  # "宽x高" -> 域名 -> 控件名 -> 位置信息
+        self.resolution = None
+        self.dirty = False  # 有未写回文件的修改
+        
+    def load(self):
+        """加载点击坐标缓存"""
+        try:
+            width, height = pyautogui.size()
+            self.resolution = f"{width}x{height}"
+            if not os.path.exists(self.json_path):
+                print(f"[点击缓存] 缓存文件不存在，将在首次命中后创建: {self.json_path}")
+                return
+            with open(self.json_path, 'r', encoding='utf-8-sig') as f:
+                self.positions = json.load(f)
+            count = sum(len(controls) for controls in self.positions.get(self.resolution, {}).values())
+            print(f"[点击缓存] 已加载当前分辨率 {self.resolution} 下的 {count} 个控件位置")
+        except Exception as e:
+            print(f"[点击缓存错误] 缓存读取失败: {str(e)}")
+    
+    def get(self, domain: str, control: str) -> Optional[Dict]:
+        """获取指定域名控件的缓存位置"""
+        return self.positions.get(self.resolution, {}).get(domain, {}).get(control)
+    
+    def record(self, domain: str, control: str, position: Tuple[int, int],
+               box: Optional[Tuple[int, int, int, int]] = None):
+        """记录控件位置(由flush统一写回文件)"""
+        if not domain or not self.resolution:
+            return
+        controls = self.positions.setdefault(self.resolution, {}).setdefault(domain, {})
+        entry = controls.get(control, {})
+        entry.update({"x": int(position[0]), "y": int(position[1]), "hits": entry.get("hits", 0) + 1})
+        if box:
+            entry["box"] = [int(v) for v in box]
+        controls[control] = entry
+        self.dirty = True
+    
+    def invalidate(self, domain: str, control: str):
+        """删除已失效的缓存位置"""
+        controls = self.positions.get(self.resolution, {}).get(domain, {})
+        if control in controls:
+            del controls[control]
+            print(f"[点击缓存] 已移除失效位置: {domain} / {control}")
+            self.dirty = True
+    
+    def flush(self):
+        """有修改时保存缓存到文件(每次登录流程或保存控件定位结束后调用一次)"""
+        if not self.dirty:
+            return
+        try:
+            with open(self.json_path, 'w', encoding='utf-8-sig') as f:
+                json.dump(self.positions, f, indent=2)
+            self.dirty = False
+        except Exception as e:
+            print(f"[点击缓存错误] 写入缓存失败: {str(e)}")
+
+
 class DomainClickManager:
-    """域名点击位置管理类"""
-    def __init__(self):
+    """域名点击位置管理类：保存前要点击的控件有模板时按模板定位，并按分辨率和域名缓存找到的位置"""
+    SAVE_CONTROL_IMAGE = "save_control.png"  # 通用保存控件模板；某个域名专用的模板命名为 save_control_<域名>.png
+    
+    def __init__(self, click_cache: Optional[ClickPositionCache] = None, photos_path: Optional[str] = None):
         self.special_domains = {
             "oiccpress.com": "center",
             "ieeexplore.ieee.org": "center"
         }
+        self.click_cache = click_cache
+        self.photos_path = photos_path
     
     def get_click_position(self, domain: str) -> Tuple[int, int]:
         """获取指定域名的点击位置"""
+        position = self._locate_save_control(domain)
+        if position:
+            return position
+        
         if domain in self.special_domains:
             # 特殊域名使用屏幕中心位置
             print(f"[域名点击] 使用特殊域名 {domain} 的中心位置")
@@ -184,6 +317,59 @@ class DomainClickManager:
         # 默认返回屏幕左上角附近位置
         print(f"[域名点击] 使用默认位置: (700, 150)")
         return (700, 150)
+    
+    def _save_control_images(self, domain: str) -> List[str]:
+        """该域名可用的保存控件模板路径(域名专用的优先)"""
+        if not self.photos_path:
+            return []
+        names = [f"save_control_{domain}.png", self.SAVE_CONTROL_IMAGE]
+        return [os.path.join(self.photos_path, name) for name in names
+                if os.path.exists(os.path.join(self.photos_path, name))]
+    
+    def _locate_save_control(self, domain: str) -> Optional[Tuple[int, int]]:
+        """先在缓存框附近的小区域校验上次的位置，未命中再全屏查找模板；没有模板或找不到时返回None"""
+        image_paths = self._save_control_images(domain)
+        if not image_paths:
+            return None
+        try:
+            # 缓存校验只截取控件附近的小区域
+            for image_path in image_paths:
+                template_name = os.path.basename(image_path)
+                cached = self.click_cache.get(domain, template_name) if self.click_cache else None
+                if not cached or "box" not in cached:
+                    continue
+                left, top, right, bottom = cached["box"]
+                margin = 10
+                region = (max(0, left - margin), max(0, top - margin),
+                          right - left + 2 * margin, bottom - top + 2 * margin)
+                if self._locate(image_path, region):
+                    print(f"[域名点击] 命中已学习的保存控件位置: {template_name} ({cached['x']}, {cached['y']})")
+                    return (cached["x"], cached["y"])
+                self.click_cache.invalidate(domain, template_name)
+            
+            for image_path in image_paths:
+                location = self._locate(image_path)
+                if not location:
+                    continue
+                center = pyautogui.center(location)
+                print(f"[域名点击] 找到保存控件 {os.path.basename(image_path)}: ({center.x}, {center.y})")
+                if self.click_cache:
+                    box = (location.left, location.top, location.left + location.width, location.top + location.height)
+                    self.click_cache.record(domain, os.path.basename(image_path), (center.x, center.y), box=box)
+                return (center.x, center.y)
+            print(f"[域名点击] 屏幕上没有找到保存控件，使用默认规则")
+            return None
+        finally:
+            if self.click_cache:
+                self.click_cache.flush()
+    
+    @staticmethod
+    def _locate(image_path: str, region: Optional[Tuple[int, int, int, int]] = None):
+        """在屏幕(或指定区域)上查找模板，找不到时返回None"""
+        try:
+            return pyautogui.locateOnScreen(image_path, region=region, confidence=Config.IMAGE_CONFIDENCE)
+        except Exception:
+            return None
 
 
 class CSVManager:
@@ -192,6 +378,8 @@ class CSVManager:
         self.csv_path = csv_path
         self.rows: List[Dict] = []
         self.fieldnames: List[str] = []
+        self.index = DoiIndex()  # 规范DOI键 -> 行
+        self.lock = threading.Lock()  # 并行页面同时回写时串行化
         
     def load_data(self) -> List[Dict]:
         """加载CSV数据，跳过DownloadStatus为Success的行"""
@@ -201,9 +389,12 @@ class CSVManager:
                 reader = csv.DictReader(f)
                 self.fieldnames = list(reader.fieldnames) if reader.fieldnames else []
                 self.rows = list(reader)
+                self.index = DoiIndex(self.rows)
+                if self.index.duplicates:
+                    print(f"[CSV警告] {len(self.index.duplicates)} 行的DOI与前面的行重复(大小写/前缀/编码不同)，已跳过")
             
-                # 筛选有DOI的论文
-                papers = [row for row in self.rows if row.get('DOI', '').strip()]
+                # 筛选有DOI的论文(同一DOI只处理第一行)
+                papers = [row for row in self.rows if self.index.get(row.get('DOI')) is row]
             
                 # 找到第一个DownloadStatus为空的行
                 start_index = 0
@@ -223,10 +414,17 @@ class CSVManager:
             print(f"[CSV错误] 文件读取失败: {str(e)}")
             return []
 
+    def get_row_by_doi(self, doi: str) -> Optional[Dict]:
+        """根据DOI查找行"""
+        return self.index.get(doi)
+
     def update_row_by_doi(self, doi: str, updates: Dict):
         """根据DOI更新行数据"""
+        with self.lock:
+            self._update_row_by_doi(doi, updates)
+    
+    def _update_row_by_doi(self, doi: str, updates: Dict):
         doi = doi.strip()
-        updated = False
         
         # 检查是否有新字段
         field_names_changed = False
@@ -236,14 +434,11 @@ class CSVManager:
                 field_names_changed = True
                 print(f"[CSV] 添加新字段: {key}")
         
-        for row in self.rows:
-            if row.get('DOI', '').strip() == doi:
-                row.update(updates)
-                updated = True
-                print(f"[CSV] 已更新DOI={doi}的数据: {updates}")
-                break
-                
-        if not updated:
+        row = self.index.get(doi)
+        if row is not None:
+            row.update(updates)
+            print(f"[CSV] 已更新DOI={doi}的数据: {updates}")
+        else:
             print(f"[CSV警告] 未找到DOI={doi}，无法更新数据")
             return
             
@@ -329,11 +524,53 @@ class DomainBranchManager:
         return 0
 
 
+class RewriteRule:
+    """下载链接改写规则：对DOI或跳转后的最终URL做正则匹配，用命名捕获组填充模板
+    
+    DownloadTemplates.json 中每个域名的值可以是:
+      "https://host/doi/pdf/{doi}"                       只用DOI填充的模板
+      {"source": "final_url", "pattern": "...", "template": "...", "lower": false}
+      [规则1, 规则2, ...]                                 依次尝试，第一个匹配的生效
+    source 为 doi(默认) 或 final_url；template 中可以使用 {doi}、{final_url} 和 pattern 的命名捕获组
+    """
+    SOURCES = ("doi", "final_url")
+    PLACEHOLDER_PATTERN = re.compile(r'\{(\w+)\}')
+    
+    def __init__(self, spec):
+        if isinstance(spec, str):
+            spec = {"template": spec}
+        self.template = spec["template"]
+        self.source = spec.get("source", "doi")
+        if self.source not in self.SOURCES:
+            raise ValueError(f"未知的source: {self.source}，可选: {', '.join(self.SOURCES)}")
+        self.pattern = re.compile(spec["pattern"], re.IGNORECASE) if spec.get("pattern") else None
+        self.lower = bool(spec.get("lower", False))  # 生成的URL是否转小写
+    
+    @classmethod
+    def compile(cls, value) -> List['RewriteRule']:
+        """把一个域名的配置值编译为规则列表"""
+        return [cls(spec) for spec in (value if isinstance(value, list) else [value])]
+    
+    def apply(self, doi: str, final_url: Optional[str]) -> Optional[str]:
+        """生成下载URL，不匹配时返回None"""
+        values = {"doi": doi, "final_url": final_url or ""}
+        if self.pattern:
+            match = self.pattern.search(values[self.source])
+            if not match:
+                return None
+            values.update({name: value for name, value in match.groupdict().items() if value is not None})
+        elif self.source == "final_url" and not final_url:
+            return None
+        url = self.PLACEHOLDER_PATTERN.sub(lambda m: values.get(m.group(1), m.group(0)), self.template)
+        return url.lower() if self.lower else url
+
+
 class DownloadTemplateManager:
-    """下载模板管理类"""
+    """下载模板管理类：加载时把每个域名的模板编译为改写规则"""
     def __init__(self, json_path: str):
         self.json_path = json_path
         self.download_templates = {}
+        self.rules: Dict[str, List[RewriteRule]] = {}  # 域名 -> 编译后的规则
         
     def load_templates(self):
         """加载下载模板"""
@@ -341,14 +578,23 @@ class DownloadTemplateManager:
             if not os.path.exists(self.json_path):
                 print(f"[下载模板] 配置文件不存在，将创建一个新文件: {self.json_path}")
                 self._create_default_config()
-                return
-                
-            with open(self.json_path, 'r', encoding='utf-8-sig') as f:
-                self.download_templates = json.load(f)
-                print(f"[下载模板] 已加载 {len(self.download_templates)} 个下载模板")
+            else:
+                with open(self.json_path, 'r', encoding='utf-8-sig') as f:
+                    self.download_templates = json.load(f)
+            self._compile_rules()
+            print(f"[下载模板] 已加载 {len(self.rules)} 个下载模板")
         except Exception as e:
             print(f"[下载模板错误] 配置文件读取失败: {str(e)}")
     
+    def _compile_rules(self):
+        """编译全部模板，格式错误的域名跳过"""
+        self.rules = {}
+        for domain, value in self.download_templates.items():
+            try:
+                self.rules[domain] = RewriteRule.compile(value)
+            except (KeyError, TypeError, ValueError, re.error) as e:
+                print(f"[下载模板错误] {domain} 的规则无效，已跳过: {str(e)}")
+    
     def _create_default_config(self):
         """创建默认的下载模板配置"""
         default_config = {
@@ -356,8 +602,27 @@ class DownloadTemplateManager:
             "nature.com": "https://www.nature.com/articles/{doi}.pdf",
             "springer.com": "https://link.springer.com/content/pdf/{doi}.pdf",
             "wiley.com": "https://onlinelibrary.wiley.com/doi/pdfdirect/{doi}",
-            "ieeexplore.ieee.org": "https://ieeexplore.ieee.org/stampPDF/getPDF.jsp?tp=&arnumber={arnumber}"
+            "ieeexplore.ieee.org": [
+                {
+                    "source": "doi",
+                    "pattern": "\\.(?P<arnumber>[^./]+)$",
+                    "template": "https://ieeexplore.ieee.org/stampPDF/getPDF.jsp?tp=&arnumber={arnumber}"
+                },
+                {
+                    # DOI后缀不带点时从文章页 /document/<arnumber> 取
+                    "source": "final_url",
+                    "pattern": "/document/(?P<arnumber>\\d+)",
+                    "template": "https://ieeexplore.ieee.org/stampPDF/getPDF.jsp?tp=&arnumber={arnumber}"
+                }
+            ],
+            "pubs.rsc.org": {
+                "source": "final_url",
+                "pattern": "^(?P<head>.+)/articlelanding/(?P<tail>.+)$",
+                "template": "{head}/articlepdf/{tail}",
+                "lower": True
+            }
         }
+        self.download_templates = default_config
         try:
             with open(self.json_path, 'w', encoding='utf-8-sig') as f:
                 json.dump(default_config, f, indent=2)
@@ -366,153 +631,116 @@ class DownloadTemplateManager:
             print(f"[下载模板错误] 创建配置文件失败: {str(e)}")
     
     def get_download_url(self, domain: str, doi: str, original_url: str = None) -> Optional[str]:
-        """根据域名和DOI生成下载URL"""
-        # 特殊处理pubs.rsc.org
-        if domain == "pubs.rsc.org" and original_url:
-            return self._handle_rsc_org(original_url)
-            
-        if domain in self.download_templates:
-            template = self.download_templates[domain]
-            
-            # IEEE Explore特殊处理
-            if domain == "ieeexplore.ieee.org":
-                return self._handle_ieee_explore(template, doi)
-            
-            # 其他域名直接替换DOI
-            download_url = template.replace("{doi}", doi)
-            print(f"[下载模板] 生成下载URL: {download_url}")
-            return download_url
+        """根据域名的改写规则，由DOI或最终URL生成下载URL"""
+        rules = self.rules.get(domain)
+        if rules is None:
+            # 尝试匹配主域名（去掉子域名部分）
+            parts = domain.split('.')
+            if len(parts) >= 2:
+                rules = self.rules.get(parts[-2] + '.' + parts[-1])
+        if rules is None:
+            print(f"[下载模板警告] 未找到域名 {domain} 的下载模板")
+            return None
         
-        # 尝试匹配主域名（去掉子域名部分）
-        parts = domain.split('.')
-        if len(parts) >= 2:
-            main_domain = parts[-2] + '.' + parts[-1]
-            if main_domain in self.download_templates:
-                template = self.download_templates[main_domain]
-                
-                # IEEE Explore特殊处理
-                if main_domain == "ieeexplore.ieee.org":
-                    return self._handle_ieee_explore(template, doi)
-                
-                download_url = template.replace("{doi}", doi)
+        for rule in rules:
+            download_url = rule.apply(doi, original_url)
+            if download_url:
                 print(f"[下载模板] 生成下载URL: {download_url}")
                 return download_url
-        
-        print(f"[下载模板警告] 未找到域名 {domain} 的下载模板")
+        print(f"[下载模板警告] {domain} 的规则与当前DOI/URL不匹配: {original_url or doi}")
         return None
-    
-    def _handle_rsc_org(self, original_url: str) -> str:
-        """处理RSC的特殊URL格式"""
-        print("[下载模板] RSC特殊处理")
-        
-        # 将原始URL转换为小写并替换articlelanding为articlepdf
-        download_url = original_url.lower().replace("articlelanding", "articlepdf")
-        print(f"[下载模板] 生成RSC下载URL: {download_url}")
-        return download_url
-    
-    def _handle_ieee_explore(self, template: str, doi: str) -> str:
-        """处理IEEE Explore的特殊DOI格式"""
-        print("[下载模板] IEEE Explore特殊处理")
-        
-        # 提取DOI的最后一部分数字
-        parts = doi.split('.')
-        if len(parts) > 1:
-            arnumber = parts[-1]
-            print(f"[下载模板] 提取arnumber: {arnumber}")
-            download_url = template.replace("{doi}", arnumber)
-        else:
-            print("[下载模板警告] IEEE Explore DOI格式异常，使用完整DOI")
-            download_url = template.replace("{doi}", doi)
-        
-        print(f"[下载模板] 生成IEEE Explore下载URL: {download_url}")
-        return download_url
 
 
 class WebScraper:
     """网页内容抓取类"""
-    def __init__(self, use_selenium: bool = False):
+    def __init__(self, use_selenium: bool = False, backend: Optional[BrowserBackend] = None):
         self.use_selenium = use_selenium
-        self.screen_width, self.screen_height = pyautogui.size()
-        self.driver = None  # Selenium驱动实例
-        
-    def __del__(self):
-        """析构函数，确保关闭浏览器"""
-        if self.driver:
-            self.driver.quit()
+        self.backend = backend or self.create_backend(use_selenium)
+        self.loaded_doi = None  # 当前页面对应的DOI，避免重复打开
     
-    def fetch_html(self, doi: str) -> Tuple[Optional[str], Optional[str]]:
-        """获取HTML内容"""
-       
-        return self._fetch_html_with_pyautogui(doi)
+    @staticmethod
+    def create_backend(use_selenium: bool) -> BrowserBackend:
+        """根据配置创建浏览器后端"""
+        if Config.HTTP_BACKEND:
+            return HTTPBackend(Config.PAPER_DOWNLOAD_FOLDER, Config.PAGE_LOAD_TIMEOUT, Config.HTTP_URL_MAP)
+        if use_selenium:
+            return SeleniumBackend(
+                Config.EDGE_DRIVER_PATH,
+                Config.PAPER_DOWNLOAD_FOLDER,
+                headless=Config.HEADLESS,
+                page_load_timeout=Config.PAGE_LOAD_TIMEOUT,
+                user_data_dir=Config.HEADLESS_PROFILE_DIR or None
+            )
+        return PyAutoGUIBackend(Config.PAGE_LOAD_TIMEOUT)
+    
+    def open_doi(self, doi: str) -> Optional[str]:
+        """打开DOI页面，返回跳转后的最终URL"""
+        print(f"[{self.backend.name}] 通过DOI打开页面: {doi}")
+        self.loaded_doi = None
+        if not self.backend.navigate(f"https://doi.org/{doi}"):
+            return None
+        final_url = self.backend.get_current_url()
+        if final_url:
+            self.loaded_doi = doi
+        return final_url
     
+    def invalidate_page(self):
+        """页面状态已改变(如登录)，下次抓取时重新打开"""
+        self.loaded_doi = None
     
-    def _fetch_html_with_pyautogui(self, doi: str) -> Tuple[Optional[str], Optional[str]]:
-        """使用PyAutoGUI获取HTML"""
-        print(f"[PyAutoGUI] 通过DOI获取HTML: {doi}")
-        try:
-            print("[PyAutoGUI] 启动Edge浏览器...")
-            subprocess.Popen([
-                r"C:\Program Files (x86)\Microsoft\Edge\Application\msedge.exe",
-                f"https://doi.org/{doi}"
-            ], stdout=subprocess.PIPE, stderr=subprocess.PIPE)
-            
-            print(f"[PyAutoGUI] 等待页面加载({Config.PAGE_LOAD_TIMEOUT}秒)...")
-            time.sleep(Config.PAGE_LOAD_TIMEOUT)
-            
-            # 获取最终URL
-            final_url = self._get_current_url()
-            if not final_url:
-                return None, None
-                
-            # 获取HTML源码
-            html = self._get_page_source()
-            
-            # 关闭标签页
-            self._close_current_tab()
-            
-            return html, final_url
-        except Exception as e:
-            print(f"[PyAutoGUI错误] 浏览器操作失败: {str(e)}")
+    def fetch_html(self, doi: str) -> Tuple[Optional[str], Optional[str]]:
+        """获取HTML内容，返回(源码, 最终URL)"""
+        chunks, final_url = self._open_source(doi)
+        if chunks is None:
             return None, None
+        try:
+            return "".join(chunks), final_url
+        finally:
+            self._close_page()
     
-    def _get_current_url(self) -> Optional[str]:
-        """获取当前浏览器URL"""
+    def fetch_head(self, doi: str) -> Optional[str]:
+        """读取已打开的DOI页面的<head>部分(不关闭页面)，后端不支持低成本读取时返回None"""
+        if self.loaded_doi != doi:
+            return None
         try:
-            print("[PyAutoGUI] 获取当前URL...")
-            pyautogui.hotkey('alt', 'd')
-            time.sleep(1)
-            pyautogui.hotkey('ctrl', 'a')
-            time.sleep(1)
-            pyautogui.hotkey('ctrl', 'c')
-            time.sleep(2)
-            return pyperclip.paste().strip()
+            return self.backend.get_head_source()
         except Exception as e:
-            print(f"[PyAutoGUI错误] 获取URL失败: {str(e)}")
+            print(f"[{self.backend.name}错误] 读取页面头部失败: {str(e)}")
             return None
     
-    def _get_page_source(self) -> Optional[str]:
-        """获取页面源代码"""
+    def capture_html(self, doi: str, filename_builder) -> Tuple[Optional[str], Optional[str]]:
+        """抓取页面源码并直接分块写入快照文件，返回(文件路径, 最终URL)
+        
+        filename_builder(final_url) 返回不含扩展名的快照文件名
+        """
+        chunks, final_url = self._open_source(doi)
+        if chunks is None:
+            return None, None
         try:
-            print("[PyAutoGUI] 获取页面源代码...")
-            pyautogui.hotkey('ctrl', 'u')
-            time.sleep(10)
-            pyautogui.hotkey('ctrl', 'a')
-            time.sleep(1)
-            pyautogui.hotkey('ctrl', 'c')
-            time.sleep(3)
-            return pyperclip.paste()
-        except Exception as e:
-            print(f"[PyAutoGUI错误] 获取源码失败: {str(e)}")
-            return None
+            return FileHandler.save_html_stream(chunks, filename_builder(final_url)), final_url
+        finally:
+            self._close_page()
     
-    def _close_current_tab(self):
-        """关闭当前标签页"""
+    def _open_source(self, doi: str):
+        """确保DOI页面已打开，返回(源码块迭代器, 最终URL)"""
         try:
-            print("[PyAutoGUI] 关闭标签页...")
-            pyautogui.hotkey('ctrl', 'w')
-            time.sleep(2)
+            if self.loaded_doi != doi and not self.open_doi(doi):
+                return None, None
+            
+            # 获取最终URL
+            final_url = self.backend.get_current_url()
+            if not final_url:
+                return None, None
+            
+            return self.backend.iter_page_source(), final_url
         except Exception as e:
-            print(f"[PyAutoGUI警告] 关闭标签页失败: {str(e)}")
+            print(f"[{self.backend.name}错误] 浏览器操作失败: {str(e)}")
+            return None, None
+    
+    def _close_page(self):
+        """关闭标签页"""
+        self.backend.close_page()
+        self.loaded_doi = None
 
 
 class FileHandler:
@@ -539,6 +767,31 @@ class FileHandler:
             print(f"[文件错误] 保存失败: {str(e)}")
             return None
     
+    @staticmethod
+    def save_html_stream(chunks, filename: str) -> Optional[str]:
+        """将分块的HTML内容写入快照文件(先写临时文件，完成后替换)"""
+        filename = FileHandler.normalize_filename(filename)
+        filepath = os.path.join(Config.DOWNLOAD_PATH, f"{filename}.txt")
+        temp_path = filepath + ".part"
+        try:
+            size = 0
+            with open(temp_path, "w", encoding="utf-8") as f:
+                for chunk in chunks:
+                    f.write(chunk)
+                    size += len(chunk)
+            if size == 0:
+                print("[文件警告] 页面源码为空，未保存快照")
+                os.remove(temp_path)
+                return None
+            os.replace(temp_path, filepath)
+            print(f"[文件] HTML内容已保存到: {filepath} ({size}字符)")
+            return filepath
+        except Exception as e:
+            print(f"[文件错误] 保存失败: {str(e)}")
+            if os.path.exists(temp_path):
+                os.remove(temp_path)
+            return None
+    
     @staticmethod
     def normalize_filename(filename: str) -> str:
         """标准化文件名，移除无效字符"""
@@ -573,11 +826,166 @@ class FileHandler:
             return None
 
 
+class LinearTagScanner:
+    """线性时间的标签扫描器：逐个标签解析属性，作为正则超预算时的兜底
+    
+    标签不跨越'<'，属性按记号依次消费，任何输入下每个字符只被扫描常数次"""
+    TAG_PATTERN = re.compile(r'<[A-Za-z][^<>]*>')
+    # 属性名(可带 =值，引号未闭合时取到标签结尾)，或单独的引号；每次匹配都会消费扫描过的字符
+    ATTR_TOKEN_PATTERN = re.compile(r'([^\s"\'<>/=]+)(?:\s*=\s*(?:"([^"]*)"?|\'([^\']*)\'?|([^\s"\'>]*)))?|["\']')
+    
+    @classmethod
+    def iter_attributes(cls, content: str):
+        """逐个标签返回[(属性名, 属性值)]，没有值的属性(含标签名)值为None"""
+        for tag in cls.TAG_PATTERN.finditer(content):
+            yield [(m.group(1).lower(), m.group(2) if m.group(2) is not None else m.group(3) if m.group(3) is not None else m.group(4))
+                   for m in cls.ATTR_TOKEN_PATTERN.finditer(content, tag.start() + 1, tag.end() - 1) if m.group(1)]
+    
+    @staticmethod
+    def anchored_matches(content: str, anchor: str, pattern) -> List[Tuple]:
+        """只在字面量anchor出现的位置尝试匹配pattern，返回各匹配的分组"""
+        matches = []
+        position = content.find(anchor)
+        while position != -1:
+            match = pattern.match(content, position)
+            if match:
+                matches.append(match.groups())
+            position = content.find(anchor, position + len(anchor))
+        return matches
+    
+    @classmethod
+    def class_href_pairs(cls, content: str) -> List[Tuple[str, str]]:
+        """同一标签内class在href之前的(class, href)组合"""
+        pairs = []
+        for attributes in cls.iter_attributes(content):
+            class_val = None
+            for name, value in attributes:
+                if name == "class" and class_val is None:
+                    class_val = value
+                elif name == "href" and class_val is not None:
+                    pairs.append((class_val, value))
+                    break
+        return pairs
+    
+    @classmethod
+    def attribute_values(cls, content: str, attribute: str) -> List[str]:
+        """所有标签中指定属性的值"""
+        return [value for attributes in cls.iter_attributes(content)
+                for name, value in attributes if name == attribute and value]
+
+
+class ExtractionAuditor:
+    """提取审计类：为每个提取正则计时并设置时间预算，超预算时改用线性扫描并记录页面"""
+    def __init__(self, budget: float, log_path: Optional[str] = None, scan_limit: int = 20000000):
+        self.budget = budget
+        self.log_path = log_path
+        self.scan_limit = scan_limit
+        self.local = threading.local()  # 各线程当前处理的页面(文件路径, 域名)
+        self.stats: Dict[str, List[float]] = {}  # 正则名 -> [次数, 总耗时, 最大耗时]
+        self.compiled = {}
+        
+    def begin_page(self, path: str, domain: str):
+        """记录当前处理的页面，用于超预算日志"""
+        self.local.page = (path, domain)
+    
+    def findall(self, name: str, pattern: str, content: str, fallback=None, anchor: Optional[str] = None) -> List:
+        """在时间预算内执行findall
+        
+        安装了regex库时直接使用匹配超时；否则按anchor(正则起点的字面量)估算扫描量，
+        超过上限时不运行正则。fallback为线性兜底函数，每个提取策略都应同时提供anchor和fallback。
+        """
+        start = time.perf_counter()
+        action = None
+        if regex is not None:
+            if pattern not in self.compiled:
+                self.compiled[pattern] = regex.compile(pattern)
+            try:
+                result = self.compiled[pattern].findall(content, timeout=self.budget)
+            except TimeoutError:
+                action = "timeout"
+        elif fallback and (not anchor or self._estimate_scan(content, anchor) > self.scan_limit):
+            action = "precheck"
+        else:
+            result = re.findall(pattern, content)
+        
+        if action:
+            # 正则被中断或未运行：使用线性兜底
+            print(f"[提取审计] {name} 超出时间预算({action})，改用线性扫描")
+            result = fallback(content) if fallback else []
+        
+        elapsed = time.perf_counter() - start
+        if action is None and elapsed > self.budget:
+            action = "over_budget"
+        self._record(name, elapsed)
+        if action:
+            self._log_slow_page(name, len(content), elapsed, action)
+        return result
+    
+    def _estimate_scan(self, content: str, anchor: str) -> int:
+        """估算扫描的字符数：每个anchor到下一个'>'的距离之和"""
+        total = 0
+        position = content.find(anchor)
+        while position != -1:
+            end = content.find('>', position)
+            total += (len(content) if end == -1 else end) - position
+            if total > self.scan_limit:
+                break
+            position = content.find(anchor, position + len(anchor))
+        return total
+    
+    def _record(self, name: str, elapsed: float):
+        entry = self.stats.setdefault(name, [0, 0.0, 0.0])
+        entry[0] += 1
+        entry[1] += elapsed
+        entry[2] = max(entry[2], elapsed)
+    
+    def _log_slow_page(self, name: str, size: int, elapsed: float, action: str):
+        path, domain = getattr(self.local, "page", (None, None))
+        print(f"[提取审计] {name} 用时 {elapsed:.2f}秒(预算 {self.budget}秒, {action}): {path}")
+        if not self.log_path:
+            return
+        try:
+            with open(self.log_path, 'a', encoding='utf-8') as f:
+                f.write(json.dumps({
+                    "time": datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
+                    "pattern": name,
+                    "page": path,
+                    "domain": domain,
+                    "size": size,
+                    "elapsed": round(elapsed, 3),
+                    "action": action,
+                }, ensure_ascii=False) + "\n")
+        except Exception as e:
+            print(f"[提取审计警告] 慢页面记录失败: {str(e)}")
+    
+    def print_summary(self):
+        """打印各正则的耗时统计"""
+        if not self.stats:
+            return
+        print("[提取审计] 正则耗时统计:")
+        for name, (count, total, worst) in sorted(self.stats.items()):
+            print(f"  {name}: {count}次, 平均 {total / count * 1000:.1f}毫秒, 最长 {worst * 1000:.1f}毫秒")
+
+
 class PaperExtractor:
     """论文处理类"""
-    def __init__(self, json_path: str):
+    CLASS_HREF_PATTERN = r'class\s*=\s*["\']([^"\']*)["\'][^>]*?href\s*=\s*["\']([^"\']*)["\']'
+    MD5_PATTERN = r'\{"md5":"([a-f0-9]{32})","pid":"([^"]+)"\},"pii":"([A-Z0-9]{10,})"'
+    MD5_REGEX = re.compile(MD5_PATTERN)
+    MD5_ANCHOR = '{"md5":"'
+    MD5_PREFERRED_PID_SUFFIX = "-main.pdf"  # 正文PDF的pid，如 1-s2.0-S0142961224001234-main.pdf
+    HEAD_CHUNK_SIZE = 8192  # 快速路径每次读取的字符数
+    HEAD_END_PATTERN = re.compile(r'</head\s*>|<body[\s>]', re.IGNORECASE)
+    META_PDF_NAMES = ("citation_pdf_url", "bepress_citation_pdf_url", "eprints.document_url")  # Highwire及同类
+    DC_META_NAMES = ("dc.identifier", "dc.relation", "dcterms.identifier", "dcterms.relation")  # Dublin Core，只取PDF链接
+    PDF_LINK_PATTERN = re.compile(r'\.pdf(?:$|[?#])|/pdf(?:/|$|[?#])', re.IGNORECASE)
+    
+    def __init__(self, json_path: str, auditor: Optional[ExtractionAuditor] = None):
         self.json_path = json_path
         self._last_is_full_supp = False  # 确保初始化
+        self.auditor = auditor or ExtractionAuditor(
+            Config.EXTRACTION_TIME_BUDGET, Config.SLOW_PAGE_LOG, Config.EXTRACTION_SCAN_LIMIT
+        )
         
     def extract_paper_url(self, txt_path: str, doi: str) -> Optional[str]:
         """从HTML文件提取Paper链接(仅返回文档链接)"""
@@ -586,6 +994,7 @@ class PaperExtractor:
             filename = os.path.basename(txt_path)
             domain = filename.split('_')[0]  # 获取主域名
             print(f"[Paper] 解析主域名: {domain}")
+            self.auditor.begin_page(txt_path, domain)
         
             # 从JSON文件查找关键词
             keywords_info = self._get_keywords_from_json(domain)
@@ -599,6 +1008,14 @@ class PaperExtractor:
                 print("[Paper警告] 未找到有效的Paper关键词")
                 return None
             
+            # 快速路径: 只读文档头部的PDF元数据，读取量与页面大小无关
+            if Config.META_FAST_PATH:
+                with open(txt_path, 'r', encoding='utf-8') as f:
+                    chunks = iter(lambda: f.read(self.HEAD_CHUNK_SIZE), "")
+                    meta_url = self._meta_pdf_url(chunks, domain, paper_keywords)
+                if meta_url:
+                    return meta_url
+            
             # 读取HTML内容
             content = self._read_html_content(txt_path)
 
@@ -618,7 +1035,10 @@ class PaperExtractor:
             
             #特殊处理：当关键词包含"downloadpdf"时
             elif "downloadpdf" in paper_keywords:
-                urls = re.findall(r'content=[\'"]?([^\'" >]+)', content)
+                urls = self.auditor.findall(
+                    "content_attr", r'content=[\'"]?([^\'" >]+)', content,
+                    lambda page: LinearTagScanner.attribute_values(page, "content"), anchor="content="
+                )
                 print(f"[Paper] 共找到 {len(urls)} 个链接")
             
                 # 查找有效链接
@@ -627,7 +1047,10 @@ class PaperExtractor:
 
             # 常规查找链接
             else:
-                urls = re.findall(r'href=[\'"]?([^\'" >]+)', content)
+                urls = self.auditor.findall(
+                    "href_attr", r'href=[\'"]?([^\'" >]+)', content,
+                    lambda page: LinearTagScanner.attribute_values(page, "href"), anchor="href="
+                )
                 print(f"[Paper] 共找到 {len(urls)} 个链接")
             
                 # 查找有效链接
@@ -637,13 +1060,62 @@ class PaperExtractor:
             print(f"[Paper错误] 提取失败: {str(e)}")
             return None
     
+    def extract_meta_url(self, chunks: Iterable[str], domain: str) -> Optional[str]:
+        """从页面头部的源码块提取PDF元数据链接(用于浏览器中已打开的页面)，域名未配置关键词时返回None"""
+        keywords_info = self._get_keywords_from_json(domain)
+        if not keywords_info or not keywords_info['keywords']:
+            return None
+        return self._meta_pdf_url(chunks, domain, keywords_info['keywords'])
+    
+    @classmethod
+    def read_head(cls, chunks: Iterable[str], limit: int) -> str:
+        """逐块读取源码，读到</head>(或<body>)或limit个字符为止，返回头部内容"""
+        parts, size = [], 0
+        for chunk in chunks:
+            # 带上前一块的结尾，避免标签跨块
+            window = (parts[-1][-16:] if parts else "") + chunk
+            parts.append(chunk)
+            size += len(chunk)
+            if size >= limit or cls.HEAD_END_PATTERN.search(window):
+                break
+        head = "".join(parts)
+        end = cls.HEAD_END_PATTERN.search(head)
+        return head[:end.start()] if end else head[:limit]
+    
+    def _meta_pdf_url(self, chunks: Iterable[str], domain: str, keywords: List[str]) -> Optional[str]:
+        """返回头部citation_pdf_url等Highwire元数据(其次为指向PDF的Dublin Core元数据)中包含关键词的链接"""
+        highwire, dublin_core = [], []
+        for attributes in LinearTagScanner.iter_attributes(self.read_head(chunks, Config.HEAD_SCAN_LIMIT)):
+            attributes = dict(attributes)
+            name = (attributes.get("name") or "").lower()
+            content = unescape(attributes.get("content") or "").strip()
+            if not content:
+                continue
+            if name in self.META_PDF_NAMES:
+                highwire.append(content)
+            elif name in self.DC_META_NAMES and self.PDF_LINK_PATTERN.search(content):
+                dublin_core.append(content)
+        
+        for url in highwire + dublin_core:
+            if not any(keyword.lower() in url.lower() for keyword in keywords):
+                continue
+            if url.startswith("//"):
+                url = f"https:{url}"
+            elif not url.startswith("http"):
+                url = f"https://{domain}/{url.lstrip('/')}"
+            print(f"[Paper] 页面头部元数据中找到PDF链接: {url}")
+            return url
+        return None
+    
     def _special_extraction_for_pdf_keyword(self, html_content: str, keywords: List[str]) -> Optional[str]:
         """专门处理当keywords中包含'pdf'的特殊情况"""
         print("[特殊处理] 检测到关键词中包含'pdf'，启动特殊解析模式")
         
         # 创建正则模式匹配同时包含class和href的属性组合
-        pattern = r'class\s*=\s*["\']([^"\']*)["\'][^>]*?href\s*=\s*["\']([^"\']*)["\']'
-        matches = re.findall(pattern, html_content)  # 修正了参数传递方式
+        matches = self.auditor.findall(
+            "pdf_class_href", self.CLASS_HREF_PATTERN, html_content,
+            LinearTagScanner.class_href_pairs, anchor="class"
+        )
         
         if not matches:
             print("[特殊处理] 未找到同时包含class和href的属性组合")
@@ -665,34 +1137,30 @@ class PaperExtractor:
         return None
     
     def _special_extraction_for_md5_keyword(self, html_content: str, keywords: List[str]) -> Optional[str]:
-        """专门处理当keywords中包含'md5'的特殊情况"""
+        """专门处理当keywords中包含'md5'的特殊情况(ScienceDirect)：解析页面内嵌的JSON状态，按字段读取PDF下载参数"""
         print("[特殊处理] 检测到关键词中包含'md5'，启动特殊解析模式")
-    
-        # 改进1：修正正则表达式，使用捕获组提取各部分值
-        pattern = r'\{"md5":"([a-f0-9]{32})","pid":"([^"]+)"\},"pii":"([A-Z0-9]{10,})"'
-        # 改进2：实际在HTML内容中搜索匹配项，而不是错误地解析正则表达式
-        matches = re.findall(pattern, html_content)
-    
-        if not matches:
-            print("[特殊处理] 未找到同时包含md5和pid的属性组合")
+        
+        entries = embedded_state.pdf_download_entries(list(embedded_state.iter_states(html_content, '"md5"')))
+        if not entries:
+            # 没有可解析的内嵌状态时退回正则
+            entries = [{"md5": md5_val, "pid": pid_val, "pii": pii_val} for md5_val, pid_val, pii_val in
+                       self.auditor.findall("md5_pid", self.MD5_PATTERN, html_content,
+                                            lambda page: LinearTagScanner.anchored_matches(page, self.MD5_ANCHOR, self.MD5_REGEX),
+                                            anchor=self.MD5_ANCHOR)]
+        if not entries:
+            print("[特殊处理] 未找到同时包含md5和pid的下载参数")
             return None
-    
-        print(f"[特殊处理] 找到 {len(matches)} 个md5+pid+pii属性组合")
-    
-        # 改进3：准备用于搜索的关键词（排除md5）
-        search_keywords = "mainext"  # 关键词可以根据实际需要调整
-    
-        # 改进4：遍历所有匹配项
-        for match in matches:
-            md5_val, pid_val, pii_val = match
-            # 改进5：检查pid值是否包含任何关键词
-            if any(keyword.lower() in pid_val.lower() for keyword in search_keywords):
-                print(f"[特殊处理] 找到匹配链接: md5={md5_val} | pid={pid_val}")
-                # 改进6：正确构造完整的URL
-                return f"https://www.sciencedirect.com/science/article/pii/{pii_val}/pdfft?md5={md5_val}&pid={pid_val}-mainext.pdf"
-    
-        print("[特殊处理] 没有找到包含指定关键词的pid值")
-        return None
+        
+        print(f"[特殊处理] 找到 {len(entries)} 组md5+pid+pii下载参数")
+        
+        # 优先使用正文PDF(pid以-main.pdf结尾)的参数，附件等其它PDF排在后面
+        entry = next((e for e in entries if e["pid"].lower().endswith(self.MD5_PREFERRED_PID_SUFFIX)), entries[0])
+        if not entry["pii"]:
+            print("[特殊处理] 下载参数中缺少pii")
+            return None
+        print(f"[特殊处理] 找到匹配链接: md5={entry['md5']} | pid={entry['pid']}")
+        return (f"https://www.sciencedirect.com/science/article/pii/{entry['pii']}/pdfft"
+                f"?md5={entry['md5']}&pid={entry['pid']}")
     
     def _get_keywords_from_json(self, domain: str) -> Optional[Dict]:
         """从JSON获取关键词配置"""
@@ -749,131 +1217,203 @@ class PaperExtractor:
 
 class FileDownloader:
     """文件下载类"""
-    def __init__(self, download_folder: str, settings_manager: DownloadSettingsManager):
+    LOGIN_URL_PATTERN = LOGIN_URL_PATTERN  # 登录/机构认证页面的URL
+
+    def __init__(self, download_folder: str, settings_manager: DownloadSettingsManager,
+                 backend: Optional[BrowserBackend] = None, stats: Optional[DownloadStatsCollector] = None,
+                 click_cache: Optional[ClickPositionCache] = None):
         self.download_folder = download_folder
+        self.staging = StagingArea(download_folder)  # 每个下载任务独立的暂存目录
+        self.layout = LibraryLayout(download_folder, Config.LIBRARY_LAYOUT)  # 下载文件按DOI分片保存
+        self.task_folder = download_folder  # 当前任务的下载目录(暂存目录，后端不支持时为共享目录)
+        self.task_start = time.time()  # 当前任务的开始时间，共享目录中只认领之后出现的文件
         self.settings_manager = settings_manager
+        self.backend = backend or PyAutoGUIBackend(Config.PAGE_LOAD_TIMEOUT)
+        self.stats = stats
         self.last_downloaded_file = None  # 记录最后下载的文件名
-        self.domain_click_manager = DomainClickManager()  # 新增的点击位置管理器
+        self.domain_click_manager = DomainClickManager(click_cache, Config.PHOTOS_PATH)  # 保存前的点击位置
+        self.last_time_to_file = None  # 最近一次尝试从保存操作到文件出现的耗时(秒)
+        self.last_save_method = "save"  # 最近一次尝试的保存方式(save/print)
+        self.last_failure = None  # 最近一次失败的类型(timeout/not_pdf/login_wall)，供重试队列选择策略
         
-    def download_and_rename(self, doi: str, url: str, domain: str) -> Tuple[bool, Optional[str]]:
+    @run_trace.traced("download")
+    def download_and_rename(self, doi: str, url: str, domain: str, attempt: int = 1) -> Tuple[bool, Optional[str]]:
         """
-        下载并重命名文件
+        下载并重命名文件(单次尝试，失败后的重试由PaperProcessor的重试队列调度)
         1. 获取初始文件列表
         2. 打开URL
         3. 模拟下载操作（如果需要）
-        4. 判断是否下载成功
-        5. 失败时重试
+        4. 判断是否下载成功，失败时在 last_failure 中记录失败类型
         
         返回: (下载是否成功, 文件名)
         """
         print(f"[下载] 开始处理: {doi} (域名: {domain})")
-        max_retries = self.settings_manager.get_max_retries(domain)
         
         # 获取初始文件列表
-        initial_files = set(os.listdir(self.download_folder))
+        self.last_failure = None
+        initial_files = self._begin_task(doi)
         
         # 打开URL
         self._open_url_in_browser(url)
-        time.sleep(Config.PAGE_LOAD_TIMEOUT)  # 等待页面加载
+        if self.backend.uses_desktop_browser:
+            time.sleep(Config.PAGE_LOAD_TIMEOUT)  # 等待页面加载
         
         try:
-            for attempt in range(1, max_retries + 1):
-                print(f"[下载] 尝试 #{attempt}/{max_retries}")
-                success, filename = self._download_attempt(doi, url, domain, attempt, initial_files)
-                if success:
-                    self.last_downloaded_file = filename
-                    return True, filename
-                    
-                if attempt < max_retries:
-                    delay = self.settings_manager.get_retry_delay(domain)
-                    pyautogui.hotkey('esc')  # 关闭当前标签页
-                    print(f"[下载] 将在 {delay} 秒后重试...")
-                    time.sleep(delay)
-        
-            print(f"[下载] 所有尝试失败，跳过: {doi}")
-            return False, None
+            print(f"[下载] 尝试 #{attempt}/{self.settings_manager.get_max_retries(domain)}")
+            success, filename = self._download_attempt(doi, url, domain, attempt, initial_files)
+            return self._finish_attempt(doi, domain, attempt, success, filename)
         finally:
-            # 无论成功与否，在所有尝试完成后关闭浏览器
+            # 无论成功与否，在尝试完成后关闭浏览器
             self._cleanup_after_download()
+            self._end_task()
     
-    def download_with_template(self, doi: str, url: str, domain: str) -> Tuple[bool, Optional[str]]:
-        """使用模板生成的URL下载文件，支持重试"""
+    @run_trace.traced("download_template")
+    def download_with_template(self, doi: str, url: str, domain: str, attempt: int = 1) -> Tuple[bool, Optional[str]]:
+        """使用模板生成的URL下载文件(单次尝试)"""
         print(f"[下载] 使用模板URL下载: {url} (域名: {domain})")
-        max_retries = self.settings_manager.get_max_retries(domain)
         
         # 获取初始文件列表
-        initial_files = set(os.listdir(self.download_folder))
+        self.last_failure = None
+        initial_files = self._begin_task(doi)
         
         # 打开URL
         self._open_url_in_browser(url)
         
         try:
-            for attempt in range(1, max_retries + 1):
-                print(f"[下载] 尝试 #{attempt}/{max_retries}")
-                success, filename = self._download_template_attempt(doi, url, domain, attempt, initial_files)
-                if success:
-                    self.last_downloaded_file = filename
-                    return True, filename
-                    
-                if attempt < max_retries:
-                    delay = self.settings_manager.get_retry_delay(domain)
-                    print(f"[下载] 将在 {delay} 秒后重试...")
-                    time.sleep(delay)
-        
-            print(f"[下载] 所有尝试失败，跳过: {doi}")
-            return False, None
+            print(f"[下载] 尝试 #{attempt}/{self.settings_manager.get_max_retries(domain)}")
+            success, filename = self._download_template_attempt(doi, url, domain, attempt, initial_files)
+            return self._finish_attempt(doi, domain, attempt, success, filename)
         finally:
-            # 无论成功与否，在所有尝试完成后关闭浏览器
+            # 无论成功与否，在尝试完成后关闭浏览器
             self._cleanup_after_download()
+            self._end_task()
+    
+    def _begin_task(self, doi: str) -> Set[str]:
+        """为本次下载创建暂存目录并让浏览器下载到其中，返回目录中已有的文件"""
+        self.task_start = time.time()
+        staging_dir = self.staging.create(doi)
+        if self.backend.set_download_folder(staging_dir):
+            self.task_folder = staging_dir
+            return set()
+        # 桌面浏览器无法按任务指定下载目录，退回对比共享目录(只在顺序处理时使用)
+        self.staging.discard(staging_dir)
+        self.task_folder = self.download_folder
+        return set(os.listdir(self.download_folder))
+    
+    def _end_task(self):
+        """删除本次任务的暂存目录，之后迟到的下载不会被算到其它论文上"""
+        if self.task_folder != self.download_folder:
+            self.staging.discard(self.task_folder)
+        self.task_folder = self.download_folder
+    
+    def _hand_off(self, doi: str, filename: str) -> Optional[str]:
+        """把下载的文件以DOI命名原子移动到库中的分片目录，返回相对路径"""
+        target_name = self.layout.relative_path(doi, doi_filename(doi, os.path.splitext(filename)[1], "_pdf"))
+        if self.task_folder != self.download_folder:
+            return self.staging.commit(self.task_folder, filename, target_name)
+        try:
+            target_path = self.layout.path(doi, os.path.basename(target_name))
+            os.makedirs(os.path.dirname(target_path), exist_ok=True)
+            os.replace(os.path.join(self.download_folder, filename), target_path)
+            return target_name
+        except OSError as e:
+            print(f"[下载错误] 重命名失败: {str(e)}")
+            return None
+    
+    def _finish_attempt(self, doi: str, domain: str, attempt: int, success: bool, filename: Optional[str]) -> Tuple[bool, Optional[str]]:
+        """记录尝试结果；失败时判断失败类型(关闭页面前调用，需要读取当前URL)"""
+        if success:
+            filename = self._hand_off(doi, filename)
+            success = filename is not None
+        self._record_attempt_stats(domain, attempt, success)
+        if success:
+            self.last_downloaded_file = filename
+            self.last_failure = None
+            return True, filename
+        if self.last_failure not in ("not_pdf", "login_wall"):
+            self.last_failure = "login_wall" if self._is_login_wall() else "timeout"
+        print(f"[下载] 尝试失败({self.last_failure})")
+        return False, None
     
+    def _is_login_wall(self) -> bool:
+        """当前页面是否被重定向到登录/机构认证页面"""
+        current_url = self.backend.get_current_url()
+        return bool(current_url and self.LOGIN_URL_PATTERN.search(current_url))
+    
+    def _verify_document(self, filename: str) -> bool:
+        """检查下载的文件确实是PDF；出版商返回的HTML(登录页/错误页)改名为.invalid，避免被当作论文"""
+        path = os.path.join(self.task_folder, filename)
+        try:
+            with open(path, 'rb') as f:
+                if f.read(1024).lstrip().startswith(b"%PDF"):
+                    return True
+            os.replace(path, path + ".invalid")
+            print(f"[下载警告] 文件不是有效的PDF: {filename}")
+        except OSError as e:
+            print(f"[下载警告] 无法检查下载文件: {str(e)}")
+        self.last_failure = "not_pdf"
+        return False
+    
+    @run_trace.traced("download_attempt")
     def _download_attempt(self, doi: str, url: str, domain: str, attempt: int, initial_files: Set[str]) -> Tuple[bool, Optional[str]]:
         """单次下载尝试"""
         # 尝试模拟Ctrl+S（如果需要）
         ctrl_s_delay = 40
         if self.settings_manager.should_use_ctrl_s(domain):
+            printed_filename = self._print_page_to_pdf(doi, initial_files)
+            if printed_filename and self._verify_document(printed_filename):
+                return True, printed_filename
+            if self.last_failure == "login_wall":
+                return False, None
             print("[下载] 尝试模拟Ctrl+S保存")
             self._simulate_save(domain,doi)  # 传递domain参数
             ctrl_s_delay = self.settings_manager.get_ctrl_s_delay(domain)
             
-        # 等待下载完成
-        time.sleep(ctrl_s_delay)
+        # 等待下载完成(文件出现即返回)
+        downloaded_filename = self._wait_for_download(initial_files, ctrl_s_delay)
         
-        # 检查是否下载成功
-        downloaded_filename = self._get_downloaded_filename(initial_files)
-        
-        if downloaded_filename:
+        if downloaded_filename and self._verify_document(downloaded_filename):
             print(f"[下载] 下载成功 (尝试 {attempt})，文件: {downloaded_filename}")
             return True, downloaded_filename
         
         print(f"[下载] 下载失败 (尝试 {attempt})")
         return False, None
     
+    @run_trace.traced("download_attempt")
     def _download_template_attempt(self, doi: str, url: str, domain: str, attempt: int, initial_files: Set[str]) -> Tuple[bool, Optional[str]]:
         """使用模板的单次下载尝试"""
-        time.sleep(5)  # 等待页面加载
+        if self.backend.uses_desktop_browser:
+            time.sleep(5)  # 等待页面加载
         
         # 尝试模拟Ctrl+S（如果需要）
         ctrl_s_delay = 0
         if self.settings_manager.should_use_ctrl_s(domain):
+            printed_filename = self._print_page_to_pdf(doi, initial_files)
+            if printed_filename and self._verify_document(printed_filename):
+                return True, printed_filename
+            if self.last_failure == "login_wall":
+                return False, None
             print("[下载] 尝试模拟Ctrl+S保存")
             self._simulate_save(domain,doi)
             ctrl_s_delay = self.settings_manager.get_ctrl_s_delay(domain)
             
-        # 等待下载完成
-        time.sleep(ctrl_s_delay)
+        # 等待下载完成(文件出现即返回)
+        downloaded_filename = self._wait_for_download(initial_files, ctrl_s_delay)
         
-        # 检查是否下载成功
-        downloaded_filename = self._get_downloaded_filename(initial_files)
-        
-        if downloaded_filename:
+        if downloaded_filename and self._verify_document(downloaded_filename):
             print(f"[下载] 下载成功 (尝试 {attempt})，文件: {downloaded_filename}")
             return True, downloaded_filename
         
         print(f"[下载] 下载失败 (尝试 {attempt})")
         return False, None
     
+    @run_trace.traced("open_url")
     def _open_url_in_browser(self, url: str):
-        """在浏览器中打开URL"""
+        """在浏览器中打开URL(Selenium/HTTP后端在自己的浏览器中打开，不另开桌面Edge)"""
+        if not self.backend.uses_desktop_browser:
+            self.backend.navigate(url)
+            print(f"[浏览器] 已打开URL: {url}")
+            return
         try:
             print("[浏览器] 启动Edge浏览器...")
             subprocess.Popen([
@@ -884,8 +1424,12 @@ class FileDownloader:
         except Exception as e:
             print(f"[浏览器错误] 打开URL失败: {str(e)}")
     
+    @run_trace.traced("cleanup")
     def _cleanup_after_download(self):
-        """下载完成后清理浏览器"""
+        """下载完成后清理浏览器(只有桌面Edge方案才关闭全部msedge进程，否则会关掉WebDriver控制的浏览器)"""
+        if not self.backend.uses_desktop_browser:
+            self.backend.close_page()
+            return
         try:
             print("[清理] 正在关闭浏览器标签页和进程...")
             
@@ -904,8 +1448,42 @@ class FileDownloader:
         except Exception as e:
             print(f"[清理错误] 清理过程中出错: {str(e)}")
     
+    @run_trace.traced("print_to_pdf")
+    def _print_page_to_pdf(self, doi: str, initial_files: Set[str]) -> Optional[str]:
+        """通过浏览器原生打印接口将当前页面直接保存为<doi>_pdf.pdf，不支持时返回None
+        
+        先等待浏览器自己下载PDF(此时页面只剩空白的查看器外壳)；登录/付费墙页面和空白页不打印"""
+        if not self.backend.supports_print_to_pdf:
+            return None
+        downloaded_filename = self._wait_for_download(initial_files, Config.PRINT_DOWNLOAD_WAIT)
+        if downloaded_filename:
+            print(f"[下载] 浏览器已下载文件，无需打印: {downloaded_filename}")
+            return downloaded_filename
+        if self.backend.is_login_page():
+            print("[下载警告] 当前是登录/付费墙页面，不打印")
+            self.last_failure = "login_wall"
+            return None
+        if self.backend.is_blank_page():
+            print("[下载警告] 页面没有可打印的内容(PDF查看器或空白页)，不打印")
+            return None
+        filename = doi_filename(doi, ".pdf", "_pdf")
+        output_path = os.path.join(self.task_folder, filename)
+        print(f"[下载] 使用浏览器打印接口保存PDF: {filename}")
+        start = time.time()
+        if self.backend.print_to_pdf(output_path) and os.path.exists(output_path):
+            self.last_time_to_file = time.time() - start
+            self.last_save_method = "print"
+            print(f"[下载] 打印完成，用时 {self.last_time_to_file:.1f}秒")
+            return filename
+        print("[下载警告] 打印PDF失败，改用模拟保存")
+        return None
+    
+    @run_trace.traced("simulate_save")
     def _simulate_save(self, domain: str = None,doi: str = None):
         """模拟保存文件操作，支持根据域名调整点击位置"""
+        if self.backend.headless:
+            print("[下载警告] 无头浏览器无法模拟键盘保存")
+            return
         try:
             print("[下载] 模拟Ctrl+S保存文件...")
             time.sleep(20)
@@ -930,20 +1508,36 @@ class FileDownloader:
         except Exception as e:
             print(f"[下载警告] 模拟保存失败: {str(e)}")
             
-    def _get_downloaded_filename(self, initial_files: Set[str]) -> Optional[str]:
-        """获取新下载的文件名"""
-        current_files = set(os.listdir(self.download_folder))
-        new_files = current_files - initial_files
-        
-        # 查找有效的下载文件
-        for filename in new_files:
-            # 检查是否为支持的文档类型
-            ext = filename.split('.')[-1].lower()
-            if ext in Config.DOCUMENT_EXTENSIONS:
+    @run_trace.traced("wait_for_download")
+    def _wait_for_download(self, initial_files: Set[str], timeout: float) -> Optional[str]:
+        """轮询下载文件夹，新文档出现即返回文件名"""
+        start = time.time()
+        if self.task_folder != self.download_folder:
+            filename = self.backend.wait_for_download(
+                self.task_folder, initial_files, timeout, Config.DOCUMENT_EXTENSIONS
+            )
+        else:
+            filename = self._claim_from_shared_folder(initial_files, timeout)
+        self.last_time_to_file = time.time() - start if filename else None
+        self.last_save_method = "save"
+        return filename
+    
+    def _claim_from_shared_folder(self, initial_files: Set[str], timeout: float, poll_interval: float = 1.0) -> Optional[str]:
+        """桌面浏览器下载到共享目录时，轮询认领任务开始后出现的最新完整文件"""
+        deadline = time.time() + timeout
+        while True:
+            filename = StagingArea.claim_new_file(
+                self.download_folder, initial_files, self.task_start, Config.DOCUMENT_EXTENSIONS
+            )
+            if filename or time.time() >= deadline:
                 return filename
-                
-        # 没有找到有效的文件
-        return None
+            time.sleep(poll_interval)
+    
+    def _record_attempt_stats(self, domain: str, attempt: int, success: bool):
+        """把本次尝试的结果和文件出现耗时记入下载统计"""
+        if self.stats:
+            self.stats.record_attempt(domain, attempt, success, self.last_time_to_file, self.last_save_method)
+        self.last_time_to_file = None
 
 
 class BrowserController:
@@ -965,14 +1559,392 @@ class BrowserController:
         print(f"[浏览器] 已打开URL: {url}")
 
 
+class TemplateMatcher:
+    """模板匹配类：启动时预加载所有模板，每次尝试只截屏一次并在同一帧中搜索"""
+    def __init__(self, photos_path: str, confidence: float = 0.9, roi_margin: int = 200, frame_max_age: float = 0.5):
+        self.photos_path = photos_path
+        self.confidence = confidence
+        self.roi_margin = roi_margin          # 学习到的搜索区域向外扩展的像素数
+        self.frame_max_age = frame_max_age    # 同一帧可复用的最长时间(秒)
+        self.templates = {}                   # 文件名 -> 灰度模板
+        self.domain_rois = {}                 # 域名 -> (left, top, right, bottom)
+        self._frame = None                    # 复用的灰度帧缓冲
+        self._frame_time = 0.0
+    
+    @property
+    def available(self) -> bool:
+        """OpenCV可用且已加载模板"""
+        return cv2 is not None and bool(self.templates)
+    
+    def load_templates(self):
+        """解码并预处理photos目录下所有PNG模板"""
+        if cv2 is None:
+            print("[模板匹配] 未安装OpenCV，使用pyautogui逐图查找")
+            return
+        try:
+            for filename in sorted(os.listdir(self.photos_path)):
+                if not filename.lower().endswith('.png'):
+                    continue
+                path = os.path.join(self.photos_path, filename)
+                # 使用imdecode以支持中文路径
+                template = cv2.imdecode(np.fromfile(path, dtype=np.uint8), cv2.IMREAD_GRAYSCALE)
+                if template is not None:
+                    self.templates[filename] = template
+            print(f"[模板匹配] 已预加载 {len(self.templates)} 个模板")
+        except Exception as e:
+            print(f"[模板匹配错误] 模板加载失败: {str(e)}")
+    
+    def templates_for_domain(self, domain: str) -> List[str]:
+        """返回属于指定域名的模板文件名(如 pubs.acs.org1.png)"""
+        return [name for name in self.templates
+                if os.path.splitext(name)[0].rstrip('0123456789') == domain]
+    
+    def capture_frame(self, force: bool = False):
+        """截取整个屏幕并转为灰度，写入复用的帧缓冲"""
+        now = time.time()
+        if not force and self._frame is not None and now - self._frame_time < self.frame_max_age:
+            return self._frame
+        screenshot = np.asarray(pyautogui.screenshot())
+        if self._frame is None or self._frame.shape != screenshot.shape[:2]:
+            self._frame = np.empty(screenshot.shape[:2], dtype=np.uint8)
+        cv2.cvtColor(screenshot, cv2.COLOR_RGB2GRAY, dst=self._frame)
+        self._frame_time = now
+        return self._frame
+    
+    def match_at(self, name: str, box: Tuple[int, int, int, int], margin: int = 10) -> bool:
+        """只截取缓存框附近的小区域，验证模板是否仍在原处"""
+        template = self.templates.get(name)
+        if template is None:
+            return False
+        left, top, right, bottom = box
+        left, top = max(0, left - margin), max(0, top - margin)
+        region = (left, top, right - left + margin, bottom - top + margin)
+        shot = np.asarray(pyautogui.screenshot(region=region))
+        gray = cv2.cvtColor(shot, cv2.COLOR_RGB2GRAY)
+        match = self._match_in_area(gray, template, (0, 0, gray.shape[1], gray.shape[0]))
+        return bool(match and match[0] >= self.confidence)
+    
+    def invalidate_frame(self):
+        """页面发生变化(点击/滚动)后丢弃当前帧"""
+        self._frame_time = 0.0
+    
+    def _match_in_area(self, frame, template, area: Tuple[int, int, int, int]) -> Optional[Tuple[float, int, int]]:
+        """在帧的指定区域内匹配模板，返回(得分, 左, 上)"""
+        left, top, right, bottom = area
+        h, w = template.shape[:2]
+        if right - left < w or bottom - top < h:
+            return None
+        result = cv2.matchTemplate(frame[top:bottom, left:right], template, cv2.TM_CCOEFF_NORMED)
+        _, max_val, _, max_loc = cv2.minMaxLoc(result)
+        return max_val, left + max_loc[0], top + max_loc[1]
+    
+    def find(self, names: List[str], domain: Optional[str] = None) -> Optional[Tuple[str, Tuple[int, int]]]:
+        """在同一帧中搜索多个模板，返回(匹配的模板名, 中心坐标)"""
+        names = [name for name in names if name in self.templates]
+        if not names:
+            return None
+        frame = self.capture_frame()
+        frame_h, frame_w = frame.shape[:2]
+        full_area = (0, 0, frame_w, frame_h)
+        
+        # 先在学习到的区域内查找，找不到再搜全屏
+        areas = [full_area]
+        if domain in self.domain_rois:
+            areas.insert(0, self.domain_rois[domain])
+        
+        for area in areas:
+            best = None
+            for name in names:
+                match = self._match_in_area(frame, self.templates[name], area)
+                if match and match[0] >= self.confidence and (best is None or match[0] > best[1][0]):
+                    best = (name, match)
+            if best:
+                name, (score, left, top) = best
+                h, w = self.templates[name].shape[:2]
+                if domain:
+                    self._learn_roi(domain, (left, top, left + w, top + h), frame_w, frame_h)
+                print(f"[模板匹配] 匹配到模板 {name} (相似度 {score:.2f})")
+                return name, (left + w // 2, top + h // 2)
+        return None
+    
+    def _learn_roi(self, domain: str, box: Tuple[int, int, int, int], frame_w: int, frame_h: int):
+        """将匹配框并入该域名的搜索区域"""
+        left, top, right, bottom = box
+        if domain in self.domain_rois:
+            r_left, r_top, r_right, r_bottom = self.domain_rois[domain]
+            left, top = min(left, r_left + self.roi_margin), min(top, r_top + self.roi_margin)
+            right, bottom = max(right, r_right - self.roi_margin), max(bottom, r_bottom - self.roi_margin)
+        self.domain_rois[domain] = (
+            max(0, left - self.roi_margin),
+            max(0, top - self.roi_margin),
+            min(frame_w, right + self.roi_margin),
+            min(frame_h, bottom + self.roi_margin)
+        )
+
+
+class LoginFlowEngine:
+    """登录流程引擎：按LoginFlows.json中的步骤执行，以条件等待代替固定等待"""
+    POLL_INTERVAL = 0.5  # 条件轮询间隔(秒)
+    GONE_SETTLE = 5  # 按钮消失后等待下一页加载的时间(秒)，可用wait.settle覆盖
+    
+    def __init__(self, login_manager: 'LoginManager'):
+        self.login_manager = login_manager
+        self.last_trace: List[Dict] = []  # 最近一次登录的分步耗时
+        self.domain = None  # 正在执行流程的域名
+    
+    def run(self, domain: str, flow: Dict) -> bool:
+        """执行登录流程，返回流程是否完整执行(on_missing为stop/fail提前结束时返回False)"""
+        self.last_trace = []
+        self.domain = domain
+        flow_start = time.time()
+        completed = True
+        
+        for index, step in enumerate(flow.get("steps", []), 1):
+            step_start = time.time()
+            action = step.get("action", "")
+            record = {"step": index, "action": action, "image": step.get("image")}
+            try:
+                with run_trace.span("login_step", domain=domain, step=index, action=action):
+                    ok = self._run_step(step, record)
+            except Exception as e:
+                print(f"[登录流程错误] 步骤{index}({action})执行失败: {str(e)}")
+                ok = False
+            record["elapsed"] = round(time.time() - step_start, 2)
+            record["ok"] = ok
+            self.last_trace.append(record)
+            
+            if not ok:
+                on_missing = step.get("on_missing", "stop")
+                if on_missing == "continue":
+                    print(f"[登录流程] 步骤{index}未完成，继续下一步")
+                    continue
+                # stop: 未出现登录按钮，不登录直接尝试下载；fail: 登录中途出错
+                completed = False
+                print(f"[登录流程] 步骤{index}未完成，结束流程({on_missing})")
+                break
+        
+        self._print_trace(domain, time.time() - flow_start)
+        return completed
+    
+    def _run_step(self, step: Dict, record: Dict) -> bool:
+        """执行单个步骤，并等待其后置条件"""
+        action = step.get("action")
+        image_paths = self._image_paths(step.get("image"))
+        
+        if action == "click":
+            match = self._find_image(image_paths, step.get("timeout", 5), step.get("scroll"))
+            if not match:
+                print(f"[登录流程] 未找到: {step.get('image')}")
+                return False
+            record["matched"] = match[0]
+            self.login_manager._click_image(match[1])
+        elif action == "click_at":
+            pyautogui.click(step["x"], step["y"])
+            self.login_manager.template_matcher.invalidate_frame()
+        elif action == "type":
+            pyautogui.write(step.get("text", ""), interval=step.get("interval", 0.05))
+        elif action == "press":
+            pyautogui.press(step.get("key", "enter"))
+        else:
+            print(f"[登录流程警告] 未知的步骤类型: {action}")
+            return False
+        
+        wait = step.get("wait")
+        if wait:
+            # 等待点击的模板消失时，以实际匹配到的模板为准
+            if record.get("matched"):
+                image_paths = [os.path.join(Config.PHOTOS_PATH, record["matched"])]
+            record["waited"] = self._wait_condition(wait, image_paths)
+        if step.get("settle"):
+            time.sleep(step["settle"])
+        return True
+    
+    def _image_paths(self, image) -> List[str]:
+        """将模板名解析为完整路径：单个模板名、候选模板名列表，或"*"(该域名的全部模板)"""
+        if not image:
+            return []
+        if image == "*":
+            names = self.login_manager.template_matcher.templates_for_domain(self.domain)
+        else:
+            names = [image] if isinstance(image, str) else list(image)
+        return [os.path.join(Config.PHOTOS_PATH, name) for name in names]
+    
+    def _find_image(self, image_paths: List[str], timeout: float, scroll: Optional[Dict]) -> Optional[Tuple[str, Tuple[int, int]]]:
+        """在超时时间内轮询查找候选图像(同一帧中一起匹配)，配置了滚动时每轮向下滚动"""
+        scroll_count = 0
+        deadline = time.time() + timeout
+        while True:
+            match = self.login_manager._locate_images_on_screen(image_paths) if image_paths else None
+            if match:
+                return match
+            if scroll and scroll_count < scroll.get("max", 0):
+                pyautogui.scroll(-scroll.get("step", 900))
+                self.login_manager.template_matcher.invalidate_frame()
+                scroll_count += 1
+                time.sleep(scroll.get("delay", 0.5))
+                continue
+            if time.time() >= deadline:
+                return None
+            time.sleep(self.POLL_INTERVAL)
+    
+    def _wait_condition(self, wait: Dict, step_image_paths: List[str]) -> float:
+        """等待条件满足或超时，返回实际等待时间"""
+        until = wait.get("until", "image_gone")
+        timeout = wait.get("timeout", 10)
+        image_paths = self._image_paths(wait.get("image")) or step_image_paths
+        start = time.time()
+        
+        if until == "delay" or not image_paths:
+            time.sleep(timeout)
+            return round(time.time() - start, 2)
+        
+        while time.time() - start < timeout:
+            self.login_manager.template_matcher.invalidate_frame()
+            visible = self.login_manager._locate_images_on_screen(image_paths) is not None
+            if (until == "image_visible") == visible:
+                # 按钮消失只说明已跳转，再等待新页面加载完成
+                if until == "image_gone":
+                    time.sleep(wait.get("settle", self.GONE_SETTLE))
+                break
+            time.sleep(self.POLL_INTERVAL)
+        else:
+            names = ", ".join(os.path.basename(path) for path in image_paths)
+            print(f"[登录流程] 等待条件超时: {until} {names} ({timeout}秒)")
+        return round(time.time() - start, 2)
+    
+    def _print_trace(self, domain: str, total: float):
+        """打印分步耗时"""
+        print(f"[登录流程] {domain} 登录流程耗时 {total:.1f} 秒")
+        for record in self.last_trace:
+            waited = f"，条件等待 {record['waited']} 秒" if "waited" in record else ""
+            image = record.get("matched") or record["image"] or ""
+            print(f"  - 步骤{record['step']} {record['action']} {image}: "
+                  f"{'完成' if record['ok'] else '未完成'}，耗时 {record['elapsed']} 秒{waited}")
+
+
+class SessionProbe:
+    """登录状态探测类：判断是否可以跳过登录，结果按TTL缓存
+    
+    探测配置写在LoginFlows.json对应域名的"probe"字段中，可以是一个探测或探测列表(任一通过即跳过登录):
+      {"type": "cookie", "host": "acs.org", "names": ["cookie名"]}
+          浏览器配置中的会话Cookie是否存在且未过期(会话Cookie expires_utc为0，存在即视为有效)
+      {"type": "head", "url": "https://pubs.acs.org/doi/pdf/{doi}", "expect_status": 200, "expect_content_type": "pdf"}
+          不带浏览器Cookie的HEAD请求(Edge的Cookie值已加密，无法读取)，测的是本机网络(机构IP)能否直接访问全文。
+          通过时浏览器同样无需登录；不通过不代表浏览器会话已失效，只是照常执行登录流程
+    """
+    CHROME_EPOCH_OFFSET = 11644473600  # 1601-01-01 到 1970-01-01 的秒数
+    
+    def __init__(self, profile_path: str, ttl: int = 1800, timeout: int = 10):
+        self.profile_path = profile_path
+        self.ttl = ttl
+        self.timeout = timeout
+        self.cache: Dict[str, Tuple[bool, float]] = {}  # 域名 -> (是否有效, 探测时间)
+    
+    def is_logged_in(self, domain: str, probe: Optional[Dict], doi: Optional[str] = None) -> bool:
+        """返回域名会话是否有效，优先使用未过期的缓存结果"""
+        cached = self.cache.get(domain)
+        if cached and time.time() - cached[1] < self.ttl:
+            print(f"[会话探测] 使用缓存结果: {domain} {'已登录' if cached[0] else '未登录'}")
+            return cached[0]
+        if not probe:
+            return False
+        
+        valid = any(self._probe(domain, item, doi) for item in (probe if isinstance(probe, list) else [probe]))
+        print(f"[会话探测] {domain} 探测结果: {'已登录' if valid else '未登录'}")
+        self.mark(domain, valid)
+        return valid
+    
+    def mark(self, domain: str, valid: bool):
+        """记录域名的会话状态(登录流程完成后调用；遇到登录墙时记为未登录)"""
+        self.cache[domain] = (valid, time.time())
+    
+    def _probe(self, domain: str, probe: Dict, doi: Optional[str]) -> bool:
+        probe_type = probe.get("type")
+        try:
+            if probe_type == "cookie":
+                return self._probe_cookie(probe)
+            if probe_type == "head":
+                return self._probe_head(probe, doi)
+            print(f"[会话探测警告] 未知的探测类型: {probe_type}")
+        except Exception as e:
+            print(f"[会话探测错误] {domain} 探测失败: {str(e)}")
+        return False
+    
+    def _cookie_db_path(self) -> Optional[str]:
+        """返回Cookie数据库路径(新版Edge位于Network子目录)"""
+        for path in (os.path.join(self.profile_path, "Network", "Cookies"),
+                     os.path.join(self.profile_path, "Cookies")):
+            if os.path.exists(path):
+                return path
+        return None
+    
+    def _probe_cookie(self, probe: Dict) -> bool:
+        """检查浏览器配置中指定Cookie是否存在且未过期"""
+        db_path = probe.get("db_path") or self._cookie_db_path()
+        if not db_path:
+            print("[会话探测] 未找到浏览器Cookie数据库")
+            return False
+        
+        host = probe.get("host", "").lstrip(".")
+        names = probe.get("names", [])
+        now_chrome = int((time.time() + self.CHROME_EPOCH_OFFSET) * 1_000_000)
+        
+        # 浏览器运行时数据库被占用，复制一份再读取
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            tmp_db = os.path.join(tmp_dir, "Cookies")
+            shutil.copy2(db_path, tmp_db)
+            conn = sqlite3.connect(tmp_db)
+            try:
+                # 只匹配该主机及其子域名(host_key为 acs.org / .acs.org / pubs.acs.org)，不匹配 xyzacs.org
+                rows = conn.execute(
+                    "SELECT name, expires_utc FROM cookies WHERE host_key = ? OR host_key = ? OR host_key LIKE ?",
+                    (host, f".{host}", f"%.{host}")
+                ).fetchall()
+            finally:
+                conn.close()
+        
+        # expires_utc为0的是会话Cookie，浏览器保留了它说明会话仍在
+        valid_names = {name for name, expires_utc in rows if expires_utc == 0 or expires_utc > now_chrome}
+        return bool(names) and all(name in valid_names for name in names)
+    
+    def _probe_head(self, probe: Dict, doi: Optional[str]) -> bool:
+        """对权限URL发送不带Cookie的HEAD请求，根据状态码和Content-Type判断本机网络是否有访问权限"""
+        url = probe.get("url", "")
+        if "{doi}" in url:
+            if not doi:
+                return False
+            url = url.replace("{doi}", doi)
+        
+        expect_status = probe.get("expect_status", 200)
+        expect_type = probe.get("expect_content_type", "")
+        request = urllib.request.Request(url, method="HEAD", headers={"User-Agent": "Mozilla/5.0"})
+        try:
+            with urllib.request.urlopen(request, timeout=self.timeout) as response:
+                status = response.status
+                content_type = response.headers.get("Content-Type", "")
+        except urllib.error.HTTPError as e:
+            status = e.code
+            content_type = e.headers.get("Content-Type", "") if e.headers else ""
+        
+        return status == expect_status and expect_type.lower() in content_type.lower()
+
+
 class LoginManager:
     """登录管理类"""
-    def __init__(self, json_path: str):
+    def __init__(self, json_path: str, click_cache: Optional[ClickPositionCache] = None):
         self.json_path = json_path
         self.login_domains = set()  # 存储需要登录的域名
+        self.current_domain = None  # 当前正在登录的域名
+        self.template_matcher = TemplateMatcher(Config.PHOTOS_PATH, Config.IMAGE_CONFIDENCE)
+        self.click_cache = click_cache  # 已学习的按钮位置
+        self.login_flows = {}  # 域名 -> 登录流程
+        self.flow_engine = LoginFlowEngine(self)
+        self.session_probe = SessionProbe(Config.EDGE_PROFILE_PATH, Config.SESSION_PROBE_TTL)
         
     def load_config(self):
         """加载登录配置"""
+        self.template_matcher.load_templates()
+        self._load_flows()
         try:
             if not os.path.exists(self.json_path):
                 print(f"[登录配置] 配置文件不存在，将创建默认配置: {self.json_path}")
@@ -1022,45 +1994,140 @@ class LoginManager:
         
         return False
     
-    def perform_login(self, domain: str):
-        """执行登录操作"""
+    def _load_flows(self):
+        """加载登录流程配置"""
+        try:
+            if not os.path.exists(Config.LOGIN_FLOW_JSON):
+                print(f"[登录流程] 配置文件不存在: {Config.LOGIN_FLOW_JSON}")
+                return
+            with open(Config.LOGIN_FLOW_JSON, 'r', encoding='utf-8-sig') as f:
+                self.login_flows = json.load(f)
+            print(f"[登录流程] 已加载 {len(self.login_flows)} 个域名的登录流程")
+        except Exception as e:
+            print(f"[登录流程错误] 配置文件读取失败: {str(e)}")
+    
+    def get_login_flow(self, domain: str) -> Optional[Dict]:
+        """获取指定域名的登录流程，支持主域名匹配和use别名"""
+        flow = self.login_flows.get(domain)
+        if flow is None:
+            parts = domain.split('.')
+            if len(parts) >= 2:
+                flow = self.login_flows.get(parts[-2] + '.' + parts[-1])
+        
+        # 解析别名(最多跳转几次，防止循环引用)
+        for _ in range(5):
+            if not flow or "use" not in flow:
+                break
+            flow = self.login_flows.get(flow["use"])
+        return flow
+    
+    def perform_login(self, domain: str, doi: Optional[str] = None) -> bool:
+        """执行登录操作，会话仍有效时跳过"""
         if not self.needs_login(domain):
-            return
+            return True
+        
+        flow = self.get_login_flow(domain)
+        with run_trace.span("login_probe", domain=domain):
+            logged_in = self.session_probe.is_logged_in(domain, flow.get("probe") if flow else None, doi)
+        if logged_in:
+            print(f"[登录] 域名 {domain} 会话仍有效，跳过登录")
+            return True
             
         print(f"[登录] 开始为域名 {domain} 执行登录操作")
+        self.current_domain = domain
         
-        # 根据域名调用对应的登录函数
-        login_func_name = f"_login_{domain.replace('.', '_')}"
-        login_func = getattr(self, login_func_name, None)
-        
-        if login_func:
-            login_func()
-        else:
-            print(f"[登录错误] 域名 {domain} 没有对应的登录函数")
+        if not flow or not flow.get("steps"):
+            print(f"[登录错误] 域名 {domain} 没有对应的登录流程")
+            return False
+        with run_trace.span("login", domain=domain) as span:
+            completed = self.flow_engine.run(domain, flow)
+            span["ok"] = completed
+        if self.click_cache:
+            self.click_cache.flush()  # 本次流程学到的按钮位置一次写回
+        if completed:
+            self.session_probe.mark(domain, True)
+        return completed
     
     def _locate_image_on_screen(self, image_path: str) -> Optional[Tuple[int, int]]:
         """在屏幕上定位图像位置"""
+        match = self._locate_images_on_screen([image_path])
+        return match[1] if match else None
+    
+    def _locate_images_on_screen(self, image_paths: List[str]) -> Optional[Tuple[str, Tuple[int, int]]]:
+        """在同一帧中搜索多个候选图像，返回(匹配的模板名, 中心位置)"""
         try:
-            if not os.path.exists(image_path):
-                print(f"[图像识别警告] 图像文件不存在: {image_path}")
-                return None
+            # 先用小区域校验上次找到的位置，命中则跳过全屏搜索
+            for image_path in image_paths:
+                cached_pos = self._check_cached_position(image_path)
+                if cached_pos:
+                    return os.path.basename(image_path), cached_pos
+            
+            # 优先使用预加载的模板，所有候选在同一帧中只截屏一次
+            names = [os.path.basename(path) for path in image_paths]
+            if self.template_matcher.available and all(name in self.template_matcher.templates for name in names):
+                match = self.template_matcher.find(names, self.current_domain)
+                if not match:
+                    return None
+                template_name, center = match
+                h, w = self.template_matcher.templates[template_name].shape[:2]
+                box = (center[0] - w // 2, center[1] - h // 2, center[0] - w // 2 + w, center[1] - h // 2 + h)
+                self._remember_position(template_name, center, box)
+                return match
+            
+            for image_path in image_paths:
+                if not os.path.exists(image_path):
+                    print(f"[图像识别警告] 图像文件不存在: {image_path}")
+                    continue
                 
-            # 使用pyautogui的locateOnScreen函数
-            location = pyautogui.locateOnScreen(image_path, confidence=0.9)
-            if location:
-                center_x = location.left + location.width // 2
-                center_y = location.top + location.height // 2
-                return (center_x, center_y)
+                # 使用pyautogui的locateOnScreen函数
+                location = pyautogui.locateOnScreen(image_path, confidence=Config.IMAGE_CONFIDENCE)
+                if location:
+                    template_name = os.path.basename(image_path)
+                    center_x = location.left + location.width // 2
+                    center_y = location.top + location.height // 2
+                    box = (location.left, location.top, location.left + location.width, location.top + location.height)
+                    self._remember_position(template_name, (center_x, center_y), box)
+                    return template_name, (center_x, center_y)
             return None
         except Exception as e:
             return None
     
+    def _check_cached_position(self, image_path: str) -> Optional[Tuple[int, int]]:
+        """校验缓存位置是否仍显示该按钮"""
+        if not self.click_cache or not self.current_domain:
+            return None
+        template_name = os.path.basename(image_path)
+        cached = self.click_cache.get(self.current_domain, template_name)
+        if not cached or "box" not in cached:
+            return None
+        try:
+            box = tuple(cached["box"])
+            if self.template_matcher.available and template_name in self.template_matcher.templates:
+                found = self.template_matcher.match_at(template_name, box)
+            else:
+                margin = 10
+                region = (max(0, box[0] - margin), max(0, box[1] - margin),
+                          box[2] - box[0] + 2 * margin, box[3] - box[1] + 2 * margin)
+                found = pyautogui.locateOnScreen(image_path, region=region, confidence=Config.IMAGE_CONFIDENCE) is not None
+        except Exception:
+            found = False
+        if found:
+            print(f"[点击缓存] 命中已学习位置: {template_name} ({cached['x']}, {cached['y']})")
+            return (cached["x"], cached["y"])
+        return None
+    
+    def _remember_position(self, template_name: str, center: Tuple[int, int], box: Tuple[int, int, int, int]):
+        """记录按钮位置供下次直接校验"""
+        if self.click_cache and self.current_domain:
+            self.click_cache.record(self.current_domain, template_name, center, box=box)
+    
     def _click_image(self, position: Tuple[int, int]):
         """点击指定位置的图像"""
         try:
             x, y = position
             pyautogui.moveTo(x, y, duration=0.5)
             pyautogui.click()
+            self.template_matcher.invalidate_frame()
             print(f"[鼠标操作] 已点击位置: ({x}, {y})")
         except Exception as e:
             print(f"[鼠标操作错误] 点击失败: {str(e)}")
@@ -1079,6 +2146,7 @@ class LoginManager:
                 
             # 向下滚动页面
             pyautogui.scroll(-scroll_step)
+            self.template_matcher.invalidate_frame()
             time.sleep(scroll_delay)
             
             # 打印进度
@@ -1100,543 +2168,6 @@ class LoginManager:
                 return self._locate_image_on_screen(image_path)
                 
         return None
-    def _login_pubs_acs_org(self):
-        """ACS Publications登录 - 通过图像识别登录按钮"""
-        # 1. 定义本地存储的登录按钮图像路径
-        login_button_image = r"D:\Paperdownload\photos\pubs.acs.org1.png"
-        # 2. 尝试在屏幕上查找登录按钮
-        try:
-            print("[图像识别] 正在查找登录按钮...")
-            button_pos = self._locate_image_on_screen(login_button_image)
-            
-            if button_pos:
-                print(f"[图像识别] 找到登录按钮，位置: {button_pos}")
-                # 3. 点击登录按钮
-                self._click_image(button_pos)
-                print("[登录] 已点击登录按钮")
-                time.sleep(10)  # 等待登录完成
-                pyautogui.press('enter')  # 确保登录成功
-                time.sleep(10)  # 等待页面
-            else:
-                print("[图像识别] 未找到登录按钮，尝试直接下载")
-        except Exception as e:
-            print(f"[登录错误] 图像识别失败: {str(e)}")
-
-    def _login_sciencedirect_com(self):
-        """ACS Publications登录 - 通过图像识别登录按钮"""
-        # 1. 定义本地存储的登录按钮图像路径
-        login_button_image = r"D:\Paperdownload\photos\sciencedirect.com1.png"
-        pyautogui.click(700, 1000)  # 点击登录按钮位置
-        # 2. 尝试在屏幕上查找登录按钮
-        try:
-            print("[图像识别] 正在查找登录按钮...")
-            button_pos = self._locate_image_on_screen(login_button_image)
-            
-            if button_pos:
-                print(f"[图像识别] 找到登录按钮，位置: {button_pos}")
-                # 3. 点击登录按钮
-                self._click_image(button_pos)
-                print("[登录] 已点击登录按钮")
-                time.sleep(10)  # 等待登录完成
-                pyautogui.press('enter')  # 确保登录成功
-                time.sleep(10)  # 等待页面加载
-
-            else:
-                print("[图像识别] 未找到登录按钮，尝试直接下载")
-        except Exception as e:
-            print(f"[登录错误] 图像识别失败: {str(e)}")
-    
-    def _login_link_springer_com(self):
-        """Springer登录"""
-        print("[登录] 执行Springer登录流程")
-        # 1. 定义本地存储的登录按钮图像路径
-        login_button_img = r"D:\Paperdownload\photos\link.springer.com1.png"
-        institution_input_img = r"D:\Paperdownload\photos\link.springer.com3.png"
-        select_institution_img = r"D:\Paperdownload\photos\link.springer.com2.png"
-        try:
-             # 配置参数
-            scroll_step = 900  # 每次滚动像素数
-            scroll_delay = 1   # 滚动间隔时间(秒)
-            max_scroll_attempts = 60 # 最大滚动尝试次数
-            # 先尝试不滚动直接查找
-            if self._locate_image_on_screen(login_button_img):
-                button_pos = self._locate_image_on_screen(login_button_img)
-                print("[图像识别] 找到登录按钮1")
-                # 3. 点击登录按钮
-                self._click_image(button_pos)
-                print("[登录] 已点击登录按钮1")
-                time.sleep(5)
-            else:
-                print("[滚动检测] 开始滚动查找登录按钮...")
-                for attempt in range(max_scroll_attempts):
-                    # 向下滚动页面
-                    pyautogui.scroll(-scroll_step)
-                    time.sleep(scroll_delay)
-            
-                    # 检查是否找到登录按钮
-                    if self._locate_image_on_screen(login_button_img):
-                        button_pos = self._locate_image_on_screen(login_button_img)
-                        print("[图像识别] 找到登录按钮1")
-                        # 3. 点击登录按钮
-                        self._click_image(button_pos)
-                        print("[登录] 已点击登录按钮1")
-                        time.sleep(5)  # 等待登录完成
-                        break
-        
-        
-            # 3. 查找并点击机构输入框
-            print("[图像识别] 正在查找机构输入框...")
-            input_pos = self._locate_image_on_screen(institution_input_img)
-        
-            if input_pos:
-                print(f"[图像识别] 找到机构输入框，位置: {input_pos}")
-                self._click_image(input_pos)
-                print("[登录] 已点击机构输入框")
-                time.sleep(20)
-            
-                # 4. 输入机构名称
-                print("[键盘输入] 输入机构名称: Zhejiang")
-                pyautogui.write("Zhejiang", interval=0.1)
-                time.sleep(1)
-                # 5. 滚动页面查找机构
-                print("[滚动页面] 开始滚动查找机构...")
-                scroll_step = 300  # 每次滚动像素数
-                scroll_delay = 1   # 滚动间隔时间(秒)
-                max_scroll_attempts = 20  # 最大滚动尝试次数
-                
-                for attempt in range(max_scroll_attempts):
-                    # 尝试查找机构选择按钮
-                    select_pos = self._locate_image_on_screen(select_institution_img)
-                    if select_pos:
-                        print(f"[图像识别] 找到机构选择按钮，位置: {select_pos}")
-                        self._click_image(select_pos)
-                        print("[登录] 已选择机构")
-                        time.sleep(10)  # 等待登录完成
-                        pyautogui.press('enter')  # 确保登录成功
-                        time.sleep(10)  # 等待页面
-                        return True
-                    # 向下滚动页面
-                    pyautogui.scroll(-scroll_step)
-                    time.sleep(scroll_delay)
-                    print(f"[滚动页面] 已滚动 {attempt+1}/{max_scroll_attempts} 次...")
-                
-                
-                else:
-                    print("[图像识别] 未找到搜索按钮")
-                    return False
-            else:
-                print("[图像识别] 未找到机构输入框")
-                return False
-            
-        except Exception as e:
-            print(f"[登录错误] Springer登录失败: {str(e)}")
-            return False
-    
-    def _login_tandfonline_com(self):
-        """Taylor & Francis登录"""
-        print("[登录] 执行Taylor & Francis登录流程")
-        # 1. 定义本地存储的登录按钮图像路径
-        login_button_img = r"D:\Paperdownload\photos\tandfonline.com1.png"
-        institution_input_img = r"D:\Paperdownload\photos\tandfonline.com2.png"
-        select_institution_img = r"D:\Paperdownload\photos\tandfonline.com3.png"
-        try:
-             # 配置参数
-            scroll_step = 900  # 每次滚动像素数
-            scroll_delay = 1   # 滚动间隔时间(秒)
-            max_scroll_attempts = 60 # 最大滚动尝试次数
-            # 先尝试不滚动直接查找
-            if self._locate_image_on_screen(login_button_img):
-                button_pos = self._locate_image_on_screen(login_button_img)
-                print("[图像识别] 找到登录按钮1")
-                # 3. 点击登录按钮
-                self._click_image(button_pos)
-                print("[登录] 已点击登录按钮1")
-                time.sleep(5)
-            else:
-                print("[滚动检测] 开始滚动查找登录按钮...")
-                for attempt in range(max_scroll_attempts):
-                    # 向下滚动页面
-                    pyautogui.scroll(-scroll_step)
-                    time.sleep(scroll_delay)
-            
-                    # 检查是否找到登录按钮
-                    if self._locate_image_on_screen(login_button_img):
-                        button_pos = self._locate_image_on_screen(login_button_img)
-                        print("[图像识别] 找到登录按钮1")
-                        # 3. 点击登录按钮
-                        self._click_image(button_pos)
-                        print("[登录] 已点击登录按钮1")
-                        time.sleep(5)  # 等待登录完成
-                        break
-        
-        
-            # 3. 查找并点击机构输入框
-            print("[图像识别] 正在查找机构输入框...")
-            input_pos = self._locate_image_on_screen(institution_input_img)
-        
-            if input_pos:
-                print(f"[图像识别] 找到机构输入框，位置: {input_pos}")
-                self._click_image(input_pos)
-                print("[登录] 已点击机构输入框")
-                time.sleep(20)
-            
-                # 4. 输入机构名称
-                print("[键盘输入] 输入机构名称: Zhejiang")
-                pyautogui.write("Zhejiang", interval=0.1)
-                time.sleep(1)
-                # 5. 滚动页面查找机构
-                print("[滚动页面] 开始滚动查找机构...")
-                scroll_step = 300  # 每次滚动像素数
-                scroll_delay = 1   # 滚动间隔时间(秒)
-                max_scroll_attempts = 20  # 最大滚动尝试次数
-                
-                for attempt in range(max_scroll_attempts):
-                    # 尝试查找机构选择按钮
-                    select_pos = self._locate_image_on_screen(select_institution_img)
-                    if select_pos:
-                        print(f"[图像识别] 找到机构选择按钮，位置: {select_pos}")
-                        self._click_image(select_pos)
-                        print("[登录] 已选择机构")
-                        time.sleep(10)  # 等待登录完成
-                        pyautogui.press('enter')  # 确保登录成功
-                        time.sleep(10)  # 等待页面
-                        return True
-                    # 向下滚动页面
-                    pyautogui.scroll(-scroll_step)
-                    time.sleep(scroll_delay)
-                    print(f"[滚动页面] 已滚动 {attempt+1}/{max_scroll_attempts} 次...")
-                
-                
-                else:
-                    print("[图像识别] 未找到搜索按钮")
-                    return False
-            else:
-                print("[图像识别] 未找到机构输入框")
-                return False
-            
-        except Exception as e:
-            print(f"[登录错误] Springer登录失败: {str(e)}")
-            return False
-        
-    
-    def _login_advanced_onlinelibrary_wiley_com(self):
-        """Wiley Advanced 图像识别登录流程"""
-        print("[登录] 执行Wiley Advanced图像识别登录流程")
-        
-        # 定义本地存储的图像路径
-        login_button_img = r"D:\Paperdownload\photos\advanced.onlinelibrary.wiley.com1.png"
-        submit_button_img = r"D:\Paperdownload\photos\advanced.onlinelibrary.wiley.com2.png"
-        try:
-            print("[图像识别] 正在查找登录按钮1...")
-            button_pos = self._locate_image_on_screen(login_button_img)
-            
-            if button_pos:
-                print(f"[图像识别] 找到登录按钮1")
-                # 3. 点击登录按钮
-                self._click_image(button_pos)
-                print("[登录] 已点击登录按钮1")
-                time.sleep(20)  # 等待登录完成
-            else:
-                print("[图像识别] 未找到登录按钮1，尝试直接下载")
-        except Exception as e:
-            print(f"[登录错误] 图像识别失败: {str(e)}")
-        # 继续执行登录流程
-        try:
-            print("[图像识别] 正在查找登录按钮2...")
-            button_pos = self._locate_image_on_screen(submit_button_img)
-            
-            if button_pos:
-                print(f"[图像识别] 找到登录按钮2")
-                # 3. 点击登录按钮
-                self._click_image(button_pos)
-                print("[登录] 已点击登录按钮2")
-                time.sleep(10)  # 等待登录完成
-                pyautogui.press('enter')  # 确保登录成功
-                time.sleep(10)  # 等待页面加载
-            else:
-                print("[图像识别] 未找到登录按钮2")
-        except Exception as e:
-            print(f"[登录错误] 图像识别失败: {str(e)}")
-        
-    def _login_onlinelibrary_wiley_com(self):
-        """Wiley Advanced 图像识别登录流程"""
-        print("[登录] 执行Wiley Advanced图像识别登录流程")
-        
-        # 定义本地存储的图像路径
-        login_button_img = r"D:\Paperdownload\photos\advanced.onlinelibrary.wiley.com1.png"
-        submit_button_img = r"D:\Paperdownload\photos\advanced.onlinelibrary.wiley.com2.png"
-        try:
-            print("[图像识别] 正在查找登录按钮1...")
-            button_pos = self._locate_image_on_screen(login_button_img)
-            
-            if button_pos:
-                print(f"[图像识别] 找到登录按钮1")
-                # 3. 点击登录按钮
-                self._click_image(button_pos)
-                print("[登录] 已点击登录按钮1")
-                time.sleep(20)  # 等待登录完成
-            else:
-                print("[图像识别] 未找到登录按钮1，尝试直接下载")
-        except Exception as e:
-            print(f"[登录错误] 图像识别失败: {str(e)}")
-        # 继续执行登录流程
-        try:
-            print("[图像识别] 正在查找登录按钮2...")
-            button_pos = self._locate_image_on_screen(submit_button_img)
-            
-            if button_pos:
-                print(f"[图像识别] 找到登录按钮2")
-                # 3. 点击登录按钮
-                self._click_image(button_pos)
-                print("[登录] 已点击登录按钮2")
-                time.sleep(10)  # 等待登录完成
-                pyautogui.press('enter')
-                time.sleep(10)  # 等待页面加载
-            else:
-                print("[图像识别] 未找到登录按钮2")
-        except Exception as e:
-            print(f"[登录错误] 图像识别失败: {str(e)}")
-
-
-    #def _login_aiche_onlinelibrary_wiley_com(self):
-        #"""AIChE Wiley登录"""
-        #print("[登录] 执行AIChE Wiley登录流程")
-        # 具体登录操作待实现
-    
-    def _login_analyticalsciencejournals_onlinelibrary_wiley_com(self):
-        """Wiley Analytical Science Journals登录"""
-        print("[登录] 执行Wiley Analytical Science Journals登录流程")
-        # 定义本地存储的图像路径
-        login_button_img = r"D:\Paperdownload\photos\advanced.onlinelibrary.wiley.com1.png"
-        submit_button_img = r"D:\Paperdownload\photos\advanced.onlinelibrary.wiley.com2.png"
-        try:
-            print("[图像识别] 正在查找登录按钮1...")
-            button_pos = self._locate_image_on_screen(login_button_img)
-            
-            if button_pos:
-                print(f"[图像识别] 找到登录按钮1")
-                # 3. 点击登录按钮
-                self._click_image(button_pos)
-                print("[登录] 已点击登录按钮1")
-                time.sleep(20)  # 等待登录完成
-            else:
-                print("[图像识别] 未找到登录按钮1，尝试直接下载")
-        except Exception as e:
-            print(f"[登录错误] 图像识别失败: {str(e)}")
-        # 继续执行登录流程
-        try:
-            print("[图像识别] 正在查找登录按钮2...")
-            button_pos = self._locate_image_on_screen(submit_button_img)
-            
-            if button_pos:
-                print(f"[图像识别] 找到登录按钮2")
-                # 3. 点击登录按钮
-                self._click_image(button_pos)
-                print("[登录] 已点击登录按钮2")
-                time.sleep(10)  # 等待登录完成
-                pyautogui.press('enter')  # 确保登录成功
-                time.sleep(10)
-            else:
-                print("[图像识别] 未找到登录按钮2")
-        except Exception as e:
-            print(f"[登录错误] 图像识别失败: {str(e)}")
-    
-    def _login_iopscience_iop_org(self):
-        """IOP Science登录"""
-        print("[登录] 执行IOP Science登录流程")
-        # 配置参数
-        scroll_step = 300  # 每次滚动像素数
-        scroll_delay = 1   # 滚动间隔时间(秒)
-        max_scroll_attempts = 60 # 最大滚动尝试次数
-        login_button_img = r"D:\Paperdownload\photos\iopscience.iop.org1.png"
-        button_img = r"D:\Paperdownload\photos\iopscience.iop.org2.png"
-        try:
-            print("[图像识别] 正在查找登录按钮1...")
-            button_pos = self._locate_image_on_screen(button_img)
-            
-            if button_pos:
-                print(f"[图像识别] 找到登录按钮1")
-                # 3. 点击登录按钮
-                self._click_image(button_pos)
-                print("[登录] 已点击登录按钮1")
-                time.sleep(20)  # 等待登录完成
-            else:
-                print("[图像识别] 未找到登录按钮1，尝试直接下载")
-        except Exception as e:
-            print(f"[登录错误] 图像识别失败: {str(e)}")
-        # 继续执行登录流程
-        
-        print("[滚动检测] 开始滚动查找登录按钮...")
-        for attempt in range(max_scroll_attempts):
-            # 向下滚动页面
-            pyautogui.scroll(-scroll_step)
-            time.sleep(scroll_delay)
-            
-            # 检查是否找到登录按钮
-            if self._locate_image_on_screen(login_button_img):
-                button_pos = self._locate_image_on_screen(login_button_img)
-                print("[图像识别] 找到登录按钮")
-                # 3. 点击登录按钮
-                self._click_image(button_pos)
-                print("[登录] 已点击登录按钮")
-                time.sleep(10)  # 等待登录完成
-                pyautogui.press('enter')  # 确保登录成功
-                time.sleep(20)  # 等待页面加载  
-                break
-            
-        print("[滚动检测] 达到最大滚动次数仍未找到按钮")
-        return False
-
-    def _login_ieeexplore_ieee_org(self):
-        """IEEE Xplore登录"""
-        print("[登录] 执行IEEE Xplore登录流程")
-       # 定义本地存储的图像路径
-        login_button_img = r"D:\Paperdownload\photos\ieeexplore.ieee.org1.png"
-        submit_button_img = r"D:\Paperdownload\photos\ieeexplore.ieee.org2.png"
-        try:
-            print("[图像识别] 正在查找登录按钮1...")
-            button_pos = self._locate_image_on_screen(login_button_img)
-            
-            if button_pos:
-                print(f"[图像识别] 找到登录按钮1")
-                # 3. 点击登录按钮
-                self._click_image(button_pos)
-                print("[登录] 已点击登录按钮1")
-                time.sleep(20)  # 等待登录完成
-            else:
-                print("[图像识别] 未找到登录按钮1，尝试直接下载")
-        except Exception as e:
-            print(f"[登录错误] 图像识别失败: {str(e)}")
-        # 继续执行登录流程
-        try:
-            print("[图像识别] 正在查找登录按钮2...")
-            button_pos = self._locate_image_on_screen(submit_button_img)
-            
-            if button_pos:
-                print(f"[图像识别] 找到登录按钮2")
-                # 3. 点击登录按钮
-                self._click_image(button_pos)
-                print("[登录] 已点击登录按钮2")
-                time.sleep(10)  # 等待登录完成
-                pyautogui.press('enter')  # 确保登录成功
-                time.sleep(10)  # 等待页面加载
-            else:
-                print("[图像识别] 未找到登录按钮2")
-        except Exception as e:
-            print(f"[登录错误] 图像识别失败: {str(e)}")
-    
-    def _login_karger_com(self):
-        """Karger登录"""
-        print("[登录] 执行Karger登录流程")
-        # 定义本地存储的图像路径
-        login_button_img = r"D:\Paperdownload\photos\karger.com1.png"
-        submit_button_img = r"D:\Paperdownload\photos\karger.com2.png"
-        try:
-            # 配置参数
-            scroll_step = 900  # 每次滚动像素数
-            scroll_delay = 1   # 滚动间隔时间(秒)
-            max_scroll_attempts = 60 # 最大滚动尝试次数
-            # 先尝试不滚动直接查找
-            if self._locate_image_on_screen(login_button_img):
-                return True
-        
-            print("[滚动检测] 开始滚动查找登录按钮...")
-            for attempt in range(max_scroll_attempts):
-                # 向下滚动页面
-                pyautogui.scroll(-scroll_step)
-                time.sleep(scroll_delay)
-            
-                # 检查是否找到登录按钮
-                if self._locate_image_on_screen(login_button_img):
-                    button_pos = self._locate_image_on_screen(login_button_img)
-                    print("[图像识别] 找到登录按钮1")
-                    # 3. 点击登录按钮
-                    self._click_image(button_pos)
-                    print("[登录] 已点击登录按钮1")
-                    time.sleep(5)  # 等待登录完成
-                    break
-        except Exception as e:
-            print(f"[登录错误] 图像识别失败: {str(e)}")
-        # 继续执行登录流程
-        try:
-            print("[图像识别] 正在查找登录按钮2...")
-            button_pos = self._locate_image_on_screen(submit_button_img)
-            
-            if button_pos:
-                print(f"[图像识别] 找到登录按钮2")
-                # 3. 点击登录按钮
-                self._click_image(button_pos)
-                print("[登录] 已点击登录按钮2")
-                time.sleep(5)  # 等待登录完成
-                pyautogui.press('enter')  # 确保登录成功
-                time.sleep(10)  # 等待页面加载  
-            else:
-                print("[图像识别] 未找到登录按钮2")
-        except Exception as e:
-            print(f"[登录错误] 图像识别失败: {str(e)}")
-    
-    def _login_pubs_rsc_org(self):
-        """RSC Publications登录"""
-        print("[登录] 执行RSC Publications登录流程")
-        # 定义本地存储的图像路径
-        login_button_img = r"D:\Paperdownload\photos\pubs.rsc.org1.png"
-        submit_button_img = r"D:\Paperdownload\photos\pubs.rsc.org2.png"
-        button_img = r"D:\Paperdownload\photos\pubs.rsc.org3.png"
-        try:
-            print("[图像识别] 正在查找登录按钮1...")
-            button_pos = self._locate_image_on_screen(login_button_img)
-            
-            if button_pos:
-                print(f"[图像识别] 找到登录按钮1")
-                # 3. 点击登录按钮
-                self._click_image(button_pos)
-                print("[登录] 已点击登录按钮1")
-                time.sleep(30)  # 等待登录完成
-            else:
-                print("[图像识别] 未找到登录按钮1，尝试直接下载")
-                return False
-        except Exception as e:
-            print(f"[登录错误] 图像识别失败: {str(e)}")
-        # 继续执行登录流程
-        try:
-            print("[图像识别] 正在查找登录按钮2...")
-            button_pos = self._locate_image_on_screen(submit_button_img)
-            
-            if button_pos:
-                print(f"[图像识别] 找到登录按钮2")
-                # 3. 点击登录按钮
-                self._click_image(button_pos)
-                print("[登录] 已点击登录按钮2")
-                time.sleep(10)  # 等待登录完成
-            else:
-                print("[图像识别] 未找到登录按钮2")
-                return False
-        except Exception as e:
-            print(f"[登录错误] 图像识别失败: {str(e)}")
-        try:
-            # 配置参数
-            scroll_step = 900  # 每次滚动像素数
-            scroll_delay = 1   # 滚动间隔时间(秒)
-            max_scroll_attempts = 120 # 最大滚动尝试次数
-            # 先尝试不滚动直接查找
-            print("[滚动检测] 开始滚动查找登录按钮...")
-            for attempt in range(max_scroll_attempts):
-                # 向下滚动页面
-                pyautogui.scroll(-scroll_step)
-                time.sleep(scroll_delay)
-            
-                # 检查是否找到登录按钮
-                if self._locate_image_on_screen(button_img):
-                    button_pos = self._locate_image_on_screen(button_img)
-                    print("[图像识别] 找到登录按钮3")
-                    # 3. 点击登录按钮
-                    self._click_image(button_pos)
-                    print("[登录] 已点击登录按钮3")
-                    time.sleep(5)  # 等待登录完成
-                    break
-        except Exception as e:
-            print(f"[登录错误] 图像识别失败: {str(e)}")
-    
 
 
 class PaperProcessor:
@@ -1646,18 +2177,44 @@ class PaperProcessor:
         
         # 初始化组件
         self.csv_manager = CSVManager(Config.CSV_PATH)
-        self.web_scraper = WebScraper(Config.USE_SELENIUM)
+        
+        # 浏览器后端：Selenium方案使用后端池，可并行驱动多个无头页面
+        self.backend_pool = None
+        if Config.USE_SELENIUM or Config.HTTP_BACKEND:
+            self.backend_pool = BrowserBackendPool(lambda: WebScraper.create_backend(True), Config.PARALLEL_PAGES)
+            backend = self.backend_pool.acquire()
+        else:
+            backend = WebScraper.create_backend(False)
+        self.web_scraper = WebScraper(Config.USE_SELENIUM, backend)
         self.paper_extractor = PaperExtractor(Config.JSON_PATH)
         
         # 下载设置管理
         self.download_settings_manager = DownloadSettingsManager(Config.DOWNLOAD_SETTINGS_JSON)
         self.download_settings_manager.load_settings()
         
+        # 已学习的登录按钮和保存控件位置
+        self.click_position_cache = ClickPositionCache(Config.CLICK_POSITION_JSON)
+        self.click_position_cache.load()
+        self.download_stats = DownloadStatsCollector(Config.DOWNLOAD_STATS_JSON)
+        self.download_stats.load()
+        self.retry_queue = RetryQueue(Config.RETRY_QUEUE_JSON, Config.RETRY_MAX_DELAY)
+        self.retry_queue.load()
+        self.circuit_breaker = DomainCircuitBreaker(
+            Config.CIRCUIT_BREAKER_THRESHOLD, Config.CIRCUIT_BREAKER_COOLDOWN, Config.CIRCUIT_BREAKER_MAX_COOLDOWN
+        )
+        self.prefix_domains = {}  # DOI前缀 -> 解析到的域名集合，用于在解析前判断论文所属域名
+        self.library_index = LibraryIndex(Config.LIBRARY_INDEX_DB) if Config.LIBRARY_INDEX_DB else None
+        self.singleflight = DoiSingleFlight(Config.SINGLEFLIGHT_DIR, Config.SINGLEFLIGHT_STALE) if Config.SINGLEFLIGHT_DIR else None
+        
         # 文件下载器需要下载设置管理器
         self.file_downloader = FileDownloader(
             Config.PAPER_DOWNLOAD_FOLDER,
-            self.download_settings_manager
+            self.download_settings_manager,
+            backend,
+            self.download_stats,
+            self.click_position_cache
         )
+        self.file_downloader.staging.cleanup()
         
         # 域名分支管理
         self.domain_branch_manager = DomainBranchManager(Config.DOMAIN_BRANCH_JSON)
@@ -1668,7 +2225,7 @@ class PaperProcessor:
         self.download_template_manager.load_templates()
         
         # 登录管理
-        self.login_manager = LoginManager(Config.LOGIN_CONFIG_JSON)
+        self.login_manager = LoginManager(Config.LOGIN_CONFIG_JSON, self.click_position_cache)
         self.login_manager.load_config()
         
         # 浏览器控制器
@@ -1676,29 +2233,41 @@ class PaperProcessor:
         
         # 运行状态
         self.start_time = datetime.now()
-        self.screen_width, self.screen_height = pyautogui.size()
+        self.screen_width, self.screen_height = pyautogui.size() if pyautogui else (0, 0)
+        self.worker_lock = threading.Lock()
+        self.workers = {}  # 后端 -> 绑定该后端的处理器副本
+        self.browser_used = False  # 本篇论文(及其后执行的重试)是否打开过页面，没有时不需要论文间隔
         
         # 打印开始信息
         self._print_startup_info()
     
-    def __del__(self):
-        """析构函数，确保关闭所有资源"""
-        if hasattr(self, 'web_scraper') and hasattr(self.web_scraper, 'driver') and self.web_scraper.driver:
-            self.web_scraper.driver.quit()
+    def close(self):
+        """关闭所有浏览器后端，输出耗时追踪报告"""
+        run_trace.stop()
+        if getattr(self, 'library_index', None):
+            self.library_index.close()
+            self.library_index = None
+        if getattr(self, 'backend_pool', None):
+            self.backend_pool.close()
+            self.backend_pool = None
     
     def _print_startup_info(self):
         """打印启动信息"""
         print(f"\n{'='*50}")
         print(f"论文处理程序启动 - {self.start_time.strftime('%Y-%m-%d %H:%M:%S')}")
         print(f"HTML保存路径: {Config.DOWNLOAD_PATH}")
-        print(f"Paper下载文件夹: {Config.PAPER_DOWNLOAD_FOLDER}")
+        print(f"Paper下载文件夹: {Config.PAPER_DOWNLOAD_FOLDER} (布局: {Config.LIBRARY_LAYOUT})")
         print(f"论文列表文件: {Config.CSV_PATH}")
         print(f"域名分支配置文件: {Config.DOMAIN_BRANCH_JSON}")
         print(f"下载模板配置文件: {Config.DOWNLOAD_TEMPLATE_JSON}")
         print(f"下载设置配置文件: {Config.DOWNLOAD_SETTINGS_JSON}")
         print(f"登录配置文件: {Config.LOGIN_CONFIG_JSON}")
-        print(f"使用{'Selenium' if Config.USE_SELENIUM else 'PyAutoGUI'}方案")
+        print(f"登录流程文件: {Config.LOGIN_FLOW_JSON}")
+        print(f"使用{'HTTP' if Config.HTTP_BACKEND else 'Selenium' if Config.USE_SELENIUM else 'PyAutoGUI'}方案")
+        if self.backend_pool:
+            print(f"无头模式: {self.web_scraper.backend.headless}, 并行页面数: {Config.PARALLEL_PAGES}")
         print(f"目标文件类型: {', '.join(Config.DOCUMENT_EXTENSIONS)}")
+        print(f"熔断: 连续失败{Config.CIRCUIT_BREAKER_THRESHOLD}篇后暂停该域名 {Config.CIRCUIT_BREAKER_COOLDOWN} 秒")
         print(f"{'='*50}\n")
     
     def run(self):
@@ -1710,55 +2279,373 @@ class PaperProcessor:
         
         total = len(papers)
         print(f"[处理开始] 共 {total} 篇论文，预计时间: ~{total * Config.DELAY_BETWEEN_PAPERS // 60}分钟")
+        if Config.ENABLE_TRACE:
+            run_trace.start(Config.TRACE_PATH)
+        
+        # 已在重试队列中的论文由队列按到期时间调度
+        queued = len(self.retry_queue)
+        papers = [paper for paper in papers if paper.get('DOI', '').strip() not in self.retry_queue]
+        if queued:
+            print(f"[重试队列] {queued} 篇论文等待重试，不作为新论文处理")
+        
+        if self.backend_pool and Config.PARALLEL_PAGES > 1:
+            success_count = self._run_parallel(papers)
+            self._print_summary(success_count, len(papers) + queued)
+            return
         
+        total = len(papers)
         success_count = 0
         for i, paper in enumerate(papers, 1):
+            # 其它项目已下载过的论文直接链接过来
+            if self._link_from_library(paper.get('DOI', '').strip()):
+                success_count += 1
+                continue
+            
+            # 所属域名已熔断时直接暂缓，不占用等待间隔
+            if self._park_if_blocked(paper.get('DOI', '').strip()):
+                continue
+            
             # 处理单篇论文
+            self.browser_used = False
             result = self.process_paper(paper, i, total)
             if result:
                 success_count += 1
+            
+            # 处理已到期的重试
+            success_count += self._run_retries(self.retry_queue.pop_due())
                 
-            # 等待间隔
-            if i < total:
-                self._wait_between_papers(i, total)
+            # 等待间隔(交给其它项目处理、共享结果等没有打开页面时不等待)
+            if i < total and self.browser_used:
+                with run_trace.span("wait_between_papers"):
+                    self._wait_between_papers(i, total)
+        
+        # 新论文处理完后，等待即将到期的重试
+        while self._wait_for_next_retry():
+            success_count += self._run_retries(self.retry_queue.pop_due())
             
-        self._print_summary(success_count, total)
+        self._print_summary(success_count, total + queued)
+    
+    def _run_retries(self, entries: List[Dict]) -> int:
+        """依次执行到期的重试项，返回成功数量(传入的项都已到期，不再等待；未到期的由_wait_for_next_retry等待)"""
+        success_count = 0
+        for entry in entries:
+            if self._park_if_blocked(entry["doi"], entry["domain"]):
+                continue
+            if self.process_retry(entry):
+                success_count += 1
+        return success_count
+    
+    def _wait_for_next_retry(self) -> bool:
+        """等待下一个重试项到期；队列为空或到期时间超过RETRY_DRAIN_WAIT时返回False"""
+        next_due = self.retry_queue.next_due()
+        if next_due is None:
+            return False
+        delay = next_due - time.time()
+        if delay > Config.RETRY_DRAIN_WAIT:
+            print(f"[重试队列] 剩余 {len(self.retry_queue)} 项最早 {delay:.0f} 秒后到期，保留到下次运行: {Config.RETRY_QUEUE_JSON}")
+            return False
+        if delay > 0:
+            print(f"[重试队列] 等待 {delay:.0f} 秒后执行重试...")
+            with run_trace.span("wait_retry"):
+                time.sleep(delay)
+        return True
+    
+    def _link_from_library(self, doi: str) -> bool:
+        """DOI已在任一项目的库中时链接到本项目库并标记成功，返回是否已处理"""
+        if not self.library_index or not doi:
+            return False
+        sources = self.library_index.lookup(doi, "paper")
+        if not sources:
+            return False
+        filename = self._adopt_paper(doi, sources[0])
+        if not filename:
+            return False
+        self.retry_queue.remove(doi)
+        self.csv_manager.update_row_by_doi(doi, {
+            'DownloadStatus': 'Success',
+            'Filename': filename,
+            'DownloadURL': f"library:{sources[0]}"
+        })
+        return True
+    
+    def _adopt_paper(self, doi: str, source: str) -> Optional[str]:
+        """把其它项目的PDF链接(或复制)到本项目库，返回库中的相对路径"""
+        layout = self.file_downloader.layout
+        filename = doi_filename(doi, os.path.splitext(source)[1], "_pdf")
+        target = layout.path(doi, filename)
+        if os.path.abspath(source) == os.path.abspath(target):
+            print(f"[内容索引] {doi} 已在本项目库中: {source}")
+            return layout.relative_path(doi, filename)
+        if self.library_index:
+            method = self.library_index.link_into(source, target, doi, "paper", Config.PROJECT_NAME)
+        else:
+            try:
+                method = link_or_copy(source, target)
+            except OSError as e:
+                print(f"[内容索引错误] 链接文件失败: {str(e)}")
+                method = None
+        if not method:
+            return None
+        print(f"[内容索引] {doi} 已在库中，{'硬链接' if method == 'link' else '复制'}: {source}")
+        return layout.relative_path(doi, filename)
+    
+    def _share_flight_result(self, doi: str) -> bool:
+        """其它项目刚处理完同一DOI且下载成功时共享其结果(PDF、HTML快照、下载链接)，返回是否已处理"""
+        shared = self.singleflight.result(doi)
+        if not shared or not shared.get("success") or not os.path.isfile(shared.get("pdf_path") or ""):
+            return False
+        filename = self._adopt_paper(doi, shared["pdf_path"])
+        if not filename:
+            return False
+        updates = {
+            'DownloadStatus': 'Success',
+            'Filename': filename,
+            'DownloadURL': shared.get("download_url") or f"library:{shared['pdf_path']}"
+        }
+        snapshot = shared.get("snapshot")
+        if snapshot and os.path.isfile(snapshot):
+            local = os.path.join(Config.DOWNLOAD_PATH, os.path.basename(snapshot))
+            try:
+                if os.path.abspath(local) != os.path.abspath(snapshot):
+                    link_or_copy(snapshot, local)
+                updates['HTMLFile'] = local
+            except OSError:
+                updates['HTMLFile'] = snapshot
+        if shared.get("final_url"):
+            domain = FileHandler.extract_main_domain(shared["final_url"])
+            self.prefix_domains.setdefault(doi.split('/')[0], set()).add(domain)
+        print(f"[请求合并] {doi} 已由项目 {shared.get('project') or shared.get('host')} 处理完成，共享其结果")
+        self.retry_queue.remove(doi)
+        self.csv_manager.update_row_by_doi(doi, updates)
+        return True
+    
+    def _flight_result(self, doi: str, flight: Dict) -> Dict:
+        """本进程处理完一个DOI后供其它项目共享的结果"""
+        row = self.csv_manager.get_row_by_doi(doi) or {}
+        pdf_path = self.file_downloader.layout.locate(doi, row.get('Filename', '')) if flight.get("success") else None
+        snapshot = row.get('HTMLFile') or None
+        return {
+            "success": bool(pdf_path),
+            "project": Config.PROJECT_NAME,
+            "final_url": flight.get("final_url"),
+            "snapshot": os.path.abspath(snapshot) if snapshot else None,
+            "pdf_path": os.path.abspath(pdf_path) if pdf_path else None,
+            "download_url": row.get('DownloadURL') or None,
+        }
+    
+    def _park_in_flight(self, doi: str) -> bool:
+        """其它项目正在处理同一DOI时暂缓，到期后再查看其结果"""
+        holder = self.singleflight.holder(doi) or {}
+        domain = self._guess_domain(doi) or ""
+        self.retry_queue.park(doi, domain, time.time() + Config.SINGLEFLIGHT_POLL,
+                              self.download_settings_manager.get_max_retries(domain), "in_flight")
+        self.csv_manager.update_row_by_doi(doi, {'DownloadStatus': 'Retrying', 'FailureReason': 'in_flight'})
+        print(f"[请求合并] {doi} 正由 {holder.get('host', '?')}:{holder.get('pid', '?')} 处理，"
+              f"{Config.SINGLEFLIGHT_POLL} 秒后查看结果")
+        return False
+    
+    def _park_if_blocked(self, doi: str, domain: Optional[str] = None) -> bool:
+        """论文所属域名处于熔断状态时放入重试队列暂缓，返回是否已暂缓"""
+        domain = domain or self._guess_domain(doi)
+        if not domain or not self.circuit_breaker.blocked(domain):
+            return False
+        self._park(doi, domain)
+        return True
+    
+    def _park(self, doi: str, domain: str) -> bool:
+        """暂缓到熔断器下次探测的时间"""
+        due = self.circuit_breaker.retry_at(domain)
+        self.retry_queue.park(doi, domain, due, self.download_settings_manager.get_max_retries(domain))
+        self.csv_manager.update_row_by_doi(doi, {'DownloadStatus': 'Retrying', 'FailureReason': 'circuit_open'})
+        print(f"[熔断] {domain} 暂停中，{doi} 暂缓 {max(0, due - time.time()):.0f} 秒")
+        return False
+    
+    def _guess_domain(self, doi: str) -> Optional[str]:
+        """按本次运行已解析过的同前缀DOI推断域名(前缀只对应一个域名时)"""
+        domains = self.prefix_domains.get(doi.split('/')[0])
+        return next(iter(domains)) if domains and len(domains) == 1 else None
+    
+    def _run_parallel(self, papers: List[Dict]) -> int:
+        """多个无头页面并行处理论文，空闲页面优先执行已到期的重试，返回成功数量"""
+        total = len(papers)
+        print(f"[并行处理] 使用 {Config.PARALLEL_PAGES} 个无头页面并行处理")
+        self.backend_pool.release(self.web_scraper.backend)
+        
+        def task(index: int, paper: Dict) -> bool:
+            backend = self.backend_pool.acquire()
+            try:
+                result = self._worker_for(backend).process_paper(paper, index, total)
+                with run_trace.span("wait_between_papers"):
+                    time.sleep(Config.DELAY_BETWEEN_PAPERS)
+                return result
+            finally:
+                self.backend_pool.release(backend)
+        
+        def retry_task(entry: Dict) -> bool:
+            backend = self.backend_pool.acquire()
+            try:
+                result = self._worker_for(backend).process_retry(entry)
+                with run_trace.span("wait_between_papers"):
+                    time.sleep(Config.DELAY_BETWEEN_PAPERS)
+                return result
+            finally:
+                self.backend_pool.release(backend)
+        
+        fresh = iter(enumerate(papers, 1))
+        due = []
+        running = set()
+        success_count = 0
+        with ThreadPoolExecutor(max_workers=Config.PARALLEL_PAGES) as executor:
+            while True:
+                # 填满空闲页面: 先到期重试，再新论文
+                while len(running) < Config.PARALLEL_PAGES:
+                    due = due or self.retry_queue.pop_due()
+                    if due:
+                        entry = due.pop(0)
+                        if not self._park_if_blocked(entry["doi"], entry["domain"]):
+                            running.add(executor.submit(retry_task, entry))
+                        continue
+                    item = next(fresh, None)
+                    if item is None:
+                        break
+                    if self._link_from_library(item[1].get('DOI', '').strip()):
+                        success_count += 1
+                    elif not self._park_if_blocked(item[1].get('DOI', '').strip()):
+                        running.add(executor.submit(task, *item))
+                if not running:
+                    if not self._wait_for_next_retry():
+                        break
+                    continue
+                done, running = wait(running, timeout=30, return_when=FIRST_COMPLETED)
+                success_count += sum(1 for future in done if future.result())
+        return success_count
+    
+    def _worker_for(self, backend: BrowserBackend) -> 'PaperProcessor':
+        """返回绑定指定后端的处理器副本(共享CSV和各配置管理器)"""
+        with self.worker_lock:
+            if backend is self.web_scraper.backend:
+                return self
+            if backend not in self.workers:
+                worker = copy.copy(self)
+                worker.web_scraper = WebScraper(True, backend)
+                worker.file_downloader = FileDownloader(
+                    Config.PAPER_DOWNLOAD_FOLDER,
+                    self.download_settings_manager,
+                    backend,
+                    self.download_stats,
+                    self.click_position_cache
+                )
+                self.workers[backend] = worker
+            return self.workers[backend]
     
     def process_paper(self, paper: Dict, index: int, total: int) -> bool:
         """处理单篇论文"""
-        self._print_progress(index, total, paper)
         doi = paper.get('DOI', '').strip()
-        paper_id = paper.get('Key', f"paper_{index}")
+        run_trace.clear_context()
+        run_trace.set_context(doi=doi)
+        with run_trace.span("paper", index=index) as span:
+            result = self._process_paper(paper, index, total)
+            span["ok"] = bool(result)
+        return result
+    
+    def process_retry(self, entry: Dict) -> bool:
+        """执行一个到期的重试项"""
+        doi = entry["doi"]
+        run_trace.clear_context()
+        run_trace.set_context(doi=doi, domain=entry.get("domain"))
+        with run_trace.span("retry", attempt=entry["attempt"], failure=entry["failure"]) as span:
+            result = self._process_retry(entry)
+            span["ok"] = bool(result)
+        return result
+    
+    def _process_retry(self, entry: Dict) -> bool:
+        doi, domain, attempt = entry["doi"], entry["domain"], entry["attempt"]
+        print(f"\n{'='*40}")
+        print(f"[重试] {doi} 第{attempt}/{entry['max_attempts']}次尝试 (上次失败: {entry['failure']}, 策略: {entry['action']})")
+        print(f"{'='*40}")
+        
+        # timeout: 链接有效，只是文件没有按时出现，直接重新下载
+        if entry["action"] == "redownload" and entry.get("url"):
+            if not self.circuit_breaker.allow(domain):
+                return self._park(doi, domain)
+            self.browser_used = True
+            if entry["branch"] == "template":
+                success, filename = self.file_downloader.download_with_template(doi, entry["url"], domain, attempt)
+            else:
+                success, filename = self.file_downloader.download_and_rename(doi, entry["url"], domain, attempt)
+            result = self._finish_download(doi, domain, entry["branch"], entry["url"], success, filename, attempt)
+            self.circuit_breaker.record(domain, result)
+            return result
+        
+        # login_wall: 先登录；not_pdf: 链接可能已失效，重新获取页面并提取链接
+        if entry["action"] == "login" and not self.web_scraper.backend.headless:
+            self.login_manager.perform_login(domain, doi)
+            self.web_scraper.invalidate_page()
+        paper = self.csv_manager.get_row_by_doi(doi) or {'DOI': doi}
+        return self._process_paper(paper, 0, 0, attempt)
+    
+    def _process_paper(self, paper: Dict, index: int, total: int, attempt: int = 1) -> bool:
+        if total:
+            self._print_progress(index, total, paper)
+        doi = paper.get('DOI', '').strip()
         
         if not doi:
             print("[跳过] 无DOI，跳过处理")
             return False
 
+        if not self.singleflight:
+            return self._resolve_and_process(paper, index, doi, attempt, {})
+        
+        # 同一DOI只由一个项目处理，其它项目暂缓后共享结果
+        if not self.singleflight.acquire(doi):
+            return self._park_in_flight(doi)
+        flight = {}
+        try:
+            if self._share_flight_result(doi):
+                return True
+            flight["success"] = self._resolve_and_process(paper, index, doi, attempt, flight)
+            return flight["success"]
+        finally:
+            self.singleflight.publish(doi, self._flight_result(doi, flight) if "success" in flight else None)
+    
+    def _resolve_and_process(self, paper: Dict, index: int, doi: str, attempt: int, flight: Dict) -> bool:
+        """获取最终URL后按域名处理，flight中记录供其它项目共享的最终URL"""
+        self.browser_used = True
         # 阶段1: 获取最终URL并提取域名
-        final_url = self._get_final_url(doi)
-        if not final_url:
-            return False
+        with run_trace.span("resolve"):
+            final_url = self._get_final_url(doi)
+            if not final_url:
+                return False
+            flight["final_url"] = final_url
             
-        domain = FileHandler.extract_main_domain(final_url)
+            domain = FileHandler.extract_main_domain(final_url)
+            run_trace.set_context(domain=domain)
+            self.prefix_domains.setdefault(doi.split('/')[0], set()).add(domain)
         
-        # 阶段2: 执行登录检查
-        if self.login_manager.needs_login(domain):
-            print(f"[登录] 检测到需要登录的域名: {domain}")
-            self.login_manager.perform_login(domain)
-            time.sleep(5)  # 等待登录完成
-            
-        # 阶段3: 获取并保存HTML内容
-        html = self._get_html_content(doi)
-        if not html:
-            return False
-            
-        file_path = self._save_html(html, final_url, paper_id, doi)
-        if not file_path:
-            return False
+        # 域名已熔断时暂缓；冷却结束后本篇作为半开探测
+        if not self.circuit_breaker.allow(domain):
+            return self._park(doi, domain)
+        result = False
+        try:
+            result = self._process_domain_paper(paper, index, doi, domain, final_url, attempt)
+        finally:
+            self.circuit_breaker.record(domain, result)
+        return result
+    
+    def _process_domain_paper(self, paper: Dict, index: int, doi: str, domain: str, final_url: str, attempt: int) -> bool:
+        """阶段2之后的处理: 登录、按域名分支下载(需要页面内容时保存HTML快照)"""
+        paper_id = paper.get('Key', f"paper_{index}")
         
-        self.csv_manager.update_row_by_doi(doi, {'HTMLFile': file_path})
+        # 阶段2: 执行登录检查(图像识别登录需要桌面浏览器)
+        if self.login_manager.needs_login(domain):
+            if self.web_scraper.backend.headless:
+                print(f"[登录] 无头模式无法执行图像识别登录，跳过: {domain}")
+            else:
+                print(f"[登录] 检测到需要登录的域名: {domain}")
+                self.login_manager.perform_login(domain, doi)
+                self.web_scraper.invalidate_page()
             
-        # 检查是否需要使用新分支
+        # 阶段3: 按域名选择分支；模板分支用DOI生成下载链接，不需要页面内容
         use_new_branch = False
         if domain:
             # 获取域名的direct值
@@ -1774,60 +2661,59 @@ class PaperProcessor:
         else:
             print("[域名分支] 未获取到域名，使用原有处理流程")
         
+        if Config.LAZY_HTML_CAPTURE:
+            if use_new_branch:
+                result = self._process_new_branch(doi, domain, final_url, None, attempt)
+            else:
+                result = self._process_head_meta(doi, domain, attempt)
+            if result is not None:
+                if not result:
+                    # 下载失败时补存快照，供排查失败原因和SI阶段使用
+                    self.web_scraper.invalidate_page()
+                    self._capture_snapshot(doi, final_url, paper_id)
+                return result
+        
+        # 阶段4: 获取HTML内容并直接写入快照文件
+        file_path = self._capture_snapshot(doi, final_url, paper_id)
+        if not file_path:
+            return False
+        
         if use_new_branch:
             # 新分支处理
-            return self._process_new_branch(doi, domain, final_url, file_path)
+            return self._process_new_branch(doi, domain, final_url, file_path, attempt)
         else:
             # 原有处理流程
-            return self._process_normal_branch(doi, file_path, final_url, domain)
-    
-    def _get_final_url(self, doi: str) -> Optional[str]:
-        """获取论文的最终URL"""
-        print(f"[URL获取] 正在获取DOI={doi}的最终URL")
-        return self._get_final_url_with_pyautogui(doi)
+            return self._process_normal_branch(doi, file_path, final_url, domain, attempt)
     
-    def _get_final_url_with_pyautogui(self, doi: str) -> Optional[str]:
-        """使用PyAutoGUI获取最终URL"""
-        print(f"[PyAutoGUI] 通过DOI获取最终URL: {doi}")
-        try:
-            print("[PyAutoGUI] 启动Edge浏览器...")
-            subprocess.Popen([
-                r"C:\Program Files (x86)\Microsoft\Edge\Application\msedge.exe",
-                f"https://doi.org/{doi}"
-            ], stdout=subprocess.PIPE, stderr=subprocess.PIPE)
-            
-            print(f"[PyAutoGUI] 等待页面加载({Config.PAGE_LOAD_TIMEOUT}秒)...")
-            time.sleep(Config.PAGE_LOAD_TIMEOUT)
-            
-            # 获取最终URL
-            final_url = self._get_current_url()
-            
-            return final_url
-        except Exception as e:
-            print(f"[PyAutoGUI错误] 浏览器操作失败: {str(e)}")
+    def _process_head_meta(self, doi: str, domain: str, attempt: int) -> Optional[bool]:
+        """关键词分支的快速路径: 直接读取浏览器中页面头部的PDF元数据，找到时不保存快照直接下载；没有时返回None"""
+        if not Config.META_FAST_PATH:
             return None
-    
-    def _get_current_url(self) -> Optional[str]:
-        """获取当前浏览器URL"""
-        try:
-            print("[PyAutoGUI] 获取当前URL...")
-            pyautogui.hotkey('alt', 'd')
-            time.sleep(1)
-            pyautogui.hotkey('ctrl', 'a')
-            time.sleep(1)
-            pyautogui.hotkey('ctrl', 'c')
-            time.sleep(2)
-            return pyperclip.paste().strip()
-        except Exception as e:
-            print(f"[PyAutoGUI错误] 获取URL失败: {str(e)}")
+        with run_trace.span("extract", method="head_meta"):
+            head = self.web_scraper.fetch_head(doi)
+            paper_url = self.paper_extractor.extract_meta_url([head], domain) if head else None
+        if not paper_url:
             return None
+        success, filename = self.file_downloader.download_and_rename(doi, paper_url, domain, attempt)
+        return self._finish_download(doi, domain, "keyword", paper_url, success, filename, attempt)
+    
+    def _capture_snapshot(self, doi: str, final_url: str, paper_id: str) -> Optional[str]:
+        """保存当前DOI页面的HTML快照并写入CSV，返回快照路径"""
+        with run_trace.span("capture_html"):
+            file_path, _ = self.web_scraper.capture_html(
+                doi, lambda url: self._snapshot_filename(url or final_url, paper_id, doi)
+            )
+        if file_path:
+            self.csv_manager.update_row_by_doi(doi, {'HTMLFile': file_path})
+        return file_path
     
-    def _get_html_content(self, doi: str) -> Optional[str]:
-        """获取HTML内容"""
-        return self.web_scraper._fetch_html_with_pyautogui(doi)
+    def _get_final_url(self, doi: str) -> Optional[str]:
+        """获取论文的最终URL"""
+        print(f"[URL获取] 正在获取DOI={doi}的最终URL")
+        return self.web_scraper.open_doi(doi)
     
 
-    def _process_new_branch(self, doi: str, domain: str, final_url: str, file_path: str) -> bool:
+    def _process_new_branch(self, doi: str, domain: str, final_url: str, file_path: Optional[str], attempt: int = 1) -> bool:
         """
         新分支处理
         1. 根据域名获取下载模板
@@ -1837,60 +2723,84 @@ class PaperProcessor:
         print(f"[新分支] 开始处理: {doi} (域名: {domain})")
         
         # 1. 获取下载URL模板
-        download_url = self.download_template_manager.get_download_url(domain, doi, final_url)
+        with run_trace.span("extract", method="template"):
+            download_url = self.download_template_manager.get_download_url(domain, doi, final_url)
         if not download_url:
             print("[新分支错误] 无法生成下载URL")
             return False
         
         # 2. 下载文件（不需要再次检查登录，因为已经在第一次访问时处理过）
-        success, filename = self.file_downloader.download_with_template(doi, download_url, domain)
+        success, filename = self.file_downloader.download_with_template(doi, download_url, domain, attempt)
         
         # 3. 更新状态和文件名
-        if success:
-            self.csv_manager.update_row_by_doi(doi, {
-                'DownloadStatus': 'Success',
-                'Filename': filename,
-                'DownloadURL': download_url
-            })
-            return True
-        else:
-            self.csv_manager.update_row_by_doi(doi, {
-                'DownloadStatus': 'Failed',
-                'DownloadURL': download_url
-            })
-            return False
+        return self._finish_download(doi, domain, "template", download_url, success, filename, attempt)
     
-    def _process_normal_branch(self, doi: str, file_path: str, final_url: str, domain: str) -> bool:
+    def _process_normal_branch(self, doi: str, file_path: str, final_url: str, domain: str, attempt: int = 1) -> bool:
         """原有处理流程"""
         # 1. 提取Paper链接
-        paper_url = self.paper_extractor.extract_paper_url(file_path, doi)
+        with run_trace.span("extract", method="keyword"):
+            paper_url = self.paper_extractor.extract_paper_url(file_path, doi)
         if not paper_url:
+            if FileDownloader.LOGIN_URL_PATTERN.search(final_url or ""):
+                # 落在登录页上，页面里自然没有论文链接
+                return self._defer_failure(doi, domain, "keyword", None, attempt, "login_wall")
+            self.retry_queue.remove(doi)
             self.csv_manager.update_row_by_doi(doi, {'DownloadStatus': 'Failed'})
             return False
         
         # 2. 下载文件
-        success, filename = self.file_downloader.download_and_rename(doi, paper_url, domain)
+        success, filename = self.file_downloader.download_and_rename(doi, paper_url, domain, attempt)
         
         # 3. 更新状态
+        return self._finish_download(doi, domain, "keyword", paper_url, success, filename, attempt)
+    
+    def _finish_download(self, doi: str, domain: str, branch: str, url: str,
+                         success: bool, filename: Optional[str], attempt: int) -> bool:
+        """记录一次下载尝试的结果；失败时交给重试队列"""
+        self.download_stats.record_result(domain, branch, success)
         if success:
+            self.retry_queue.remove(doi)
+            if self.library_index:
+                try:
+                    self.library_index.add(self.file_downloader.layout.path(doi, os.path.basename(filename)),
+                                           doi, "paper", Config.PROJECT_NAME)
+                except (OSError, sqlite3.Error) as e:
+                    print(f"[内容索引警告] 登记失败: {filename}, {str(e)}")
             self.csv_manager.update_row_by_doi(doi, {
                 'DownloadStatus': 'Success',
                 'Filename': filename,
-                'DownloadURL': paper_url
+                'DownloadURL': url
             })
             return True
-        else:
-            self.csv_manager.update_row_by_doi(doi, {
-                'DownloadStatus': 'Failed',
-                'DownloadURL': paper_url
-            })
-            return False
+        return self._defer_failure(doi, domain, branch, url, attempt, self.file_downloader.last_failure)
+    
+    def _defer_failure(self, doi: str, domain: str, branch: str, url: Optional[str],
+                       attempt: int, failure: Optional[str]) -> bool:
+        """按失败类型登记延迟重试；达到该域名的最大尝试次数后标记为Failed"""
+        failure = failure or "timeout"
+        max_attempts = self.download_settings_manager.get_max_retries(domain)
+        if failure == "login_wall":
+            # 之前缓存的"已登录"探测结果已不可信，重试时必须重新登录
+            self.login_manager.session_probe.mark(domain, False)
+            if self.web_scraper.backend.headless:
+                max_attempts = attempt  # 无头模式无法登录，重试没有意义
+        entry = self.retry_queue.schedule(
+            doi, domain, failure, attempt, max_attempts,
+            self.download_settings_manager.get_retry_delay(domain), branch, url
+        )
+        self.csv_manager.update_row_by_doi(doi, {
+            'DownloadStatus': 'Retrying' if entry else 'Failed',
+            'DownloadURL': url or '',
+            'FailureReason': failure
+        })
+        if not entry:
+            print(f"[下载] 已尝试 {attempt} 次，放弃: {doi}")
+        return False
     
-    def _save_html(self, html: str, final_url: str, paper_id: str, doi: str) -> Optional[str]:
-        """保存HTML内容到文件"""
+    def _snapshot_filename(self, final_url: str, paper_id: str, doi: str) -> str:
+        """HTML快照文件名(不含扩展名)"""
         url_part = FileHandler.extract_main_domain(final_url) if final_url else f"doi_{doi.replace('/', '_')}"
-        filename = f"{url_part}_{paper_id}"
-        return FileHandler.save_html_content(html, filename)
+        return f"{url_part}_{paper_id}"
     
     def _print_progress(self, index: int, total: int, paper: Dict):
         """打印处理进度"""
@@ -1925,6 +2835,8 @@ class PaperProcessor:
         print(f"总用时: {str(elapsed).split('.')[0]}")
         if total > 0:
             print(f"平均每篇用时: {elapsed.total_seconds()/total:.1f}秒")
+        self.paper_extractor.auditor.print_summary()
+        self.circuit_breaker.print_summary()
         print(f"{'='*50}")
 
 
@@ -1941,5 +2853,6 @@ if __name__ == "__main__":
     except Exception as e:
         print(f"[错误] 程序运行出错: {str(e)}")
     finally:
+        processor.close()
         # 确保关闭所有浏览器进程
         ProcessManager.kill_browser_processes()
\ No newline at end of file
@@ -2,13 +2,31 @@ import os
 import re
 import csv
 import time
+import sqlite3
+import threading
 import pyautogui
 import pyperclip
 import webbrowser
-from urllib.parse import urlparse
+from urllib.parse import urlparse, unquote
 from datetime import datetime
+from concurrent.futures import ThreadPoolExecutor
 import json
 
+try:
+    import requests
+    from requests.adapters import HTTPAdapter
+except ImportError:  # 未安装requests时退回浏览器下载方案
+    requests = None
+
+from browser_backend import SeleniumBackend
+from paper_library import StagingArea, LibraryLayout, doi_filename
+from library_index import LibraryIndex
+from doi_index import DoiIndex
+import embedded_state
+
+# 补充材料的文件链接(如Frontiers的 /api/v4/articles/<id>/file/Data_Sheet_1.pdf/<id>/1)
+SUPPLEMENTARY_FILE_PATTERN = re.compile(r'/file/[^/?#]+_\d+\.|supplementa', re.IGNORECASE)
+
 # 全局配置
 CONFIG = {
     "DOWNLOAD_PATH": r"D:\LAPaperdownload\html",  # HTML保存路径
@@ -19,9 +37,123 @@ CONFIG = {
     "DELAY_BETWEEN_PAPERS": 5,  # 每篇论文间隔时间(秒)
     "PAGE_LOAD_TIMEOUT": 40,  # 页面加载超时时间(秒)
     "DOCUMENT_EXTENSIONS": ["pdf", "docx", "doc", "zip"],  # 支持的文档扩展名
-    "SI_DOWNLOAD_FOLDER": r"D:\LAPaperdownload\LAPaper"  # SI下载文件夹
+    "SI_DOWNLOAD_FOLDER": r"D:\LAPaperdownload\LAPaper",  # SI下载文件夹
+    "LIBRARY_INDEX_DB": r"D:\PaperLibrary\library.db",  # 各项目共享的内容索引(SHA-256)，为空时不使用
+    "PROJECT_NAME": "LAPaper",  # 登记到内容索引的项目名
+    "LIBRARY_LAYOUT": "prefix",  # SI库目录布局: flat/prefix(DOI前缀分片)/hash，已有平铺文件用migrate_library.py迁移
+    "SI_PARALLEL_DOWNLOAD": True,  # 是否通过HTTP并行下载全部SI文件
+    "SI_MAX_WORKERS": 4,  # SI并行下载线程数(同时也是连接池大小)
+    "SI_PER_DOMAIN_CONCURRENCY": 2,  # 每个域名同时下载的最大文件数
+    "SI_HTTP_TIMEOUT": 60,  # 单个SI文件HTTP请求超时时间(秒)
+    "SI_PRINT_TO_PDF": False,  # 需要打印保存的SI页面优先使用无头浏览器打印接口(需配置已登录的HEADLESS_PROFILE_DIR)
+    "SI_STAGED_DOWNLOAD": False,  # 直接下载的SI文件优先用无头浏览器下载到每个任务独立的暂存目录(需配置已登录的HEADLESS_PROFILE_DIR)
+    "SI_CAPTURE_HTML": False,  # 缺少HTML快照时用无头浏览器重新抓取论文页面(需配置已登录的HEADLESS_PROFILE_DIR)
+    "HEADLESS": True,  # 打印/下载使用的浏览器是否无头运行
+    "HEADLESS_PROFILE_DIR": ""  # 无头浏览器的用户目录(先用它登录一次机构账号)，为空时为不带Cookie的新会话
 }
 
+
+class SIParallelFetcher:
+    """SI并行下载类：复用HTTP连接池，按域名限制并发，一次下载所有SI文件"""
+    CONTENT_TYPE_EXTENSIONS = {
+        "application/pdf": "pdf",
+        "application/zip": "zip",
+        "application/x-zip-compressed": "zip",
+        "application/msword": "doc",
+        "application/vnd.openxmlformats-officedocument.wordprocessingml.document": "docx",
+        "application/vnd.ms-excel": "xls",
+        "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet": "xlsx",
+        "video/mp4": "mp4",
+    }
+
+    def __init__(self, download_folder, max_workers=4, per_domain_concurrency=2, timeout=60, layout=None):
+        self.download_folder = download_folder
+        self.layout = layout or LibraryLayout(download_folder, "flat")
+        self.max_workers = max_workers
+        self.per_domain_concurrency = per_domain_concurrency
+        self.timeout = timeout
+        self.domain_semaphores = {}
+        self.semaphore_lock = threading.Lock()
+        self.executor = ThreadPoolExecutor(max_workers=max_workers)
+
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=max_workers, pool_maxsize=max_workers * per_domain_concurrency)
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
+        self.session.headers.update({
+            "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 "
+                          "(KHTML, like Gecko) Chrome/124.0 Safari/537.36 Edg/124.0",
+            "Accept": "*/*",
+        })
+
+    def close(self):
+        """关闭线程池和连接池"""
+        self.executor.shutdown(wait=True)
+        self.session.close()
+
+    def _get_domain_semaphore(self, url):
+        """获取URL所属域名的并发信号量"""
+        domain = urlparse(url).netloc
+        with self.semaphore_lock:
+            if domain not in self.domain_semaphores:
+                self.domain_semaphores[domain] = threading.BoundedSemaphore(self.per_domain_concurrency)
+            return self.domain_semaphores[domain]
+
+    def _guess_extension(self, url, content_type):
+        """根据Content-Type或URL推断文件扩展名"""
+        content_type = (content_type or "").split(";")[0].strip().lower()
+        if content_type in self.CONTENT_TYPE_EXTENSIONS:
+            return self.CONTENT_TYPE_EXTENSIONS[content_type]
+        path = unquote(urlparse(url).path)
+        ext = os.path.splitext(path)[1].lstrip(".").lower()
+        if ext and len(ext) <= 5 and ext.isalnum():
+            return ext
+        return "bin"
+
+    def _fetch_one(self, doi, url, index):
+        """下载单个SI文件，返回保存后的文件名"""
+        with self._get_domain_semaphore(url):
+            try:
+                print(f"[SI并行下载] 开始下载 #{index}: {url}")
+                with self.session.get(url, stream=True, timeout=self.timeout, allow_redirects=True) as response:
+                    response.raise_for_status()
+                    content_type = response.headers.get("Content-Type", "")
+                    if "text/html" in content_type.lower():
+                        print(f"[SI并行下载警告] #{index} 返回的是网页而不是文件(可能需要登录): {response.url}")
+                        return None
+
+                    ext = self._guess_extension(response.url, content_type)
+                    name = doi_filename(doi, ext, f"_SI{index}")
+                    filename = self.layout.relative_path(doi, name)
+                    final_path = self.layout.path(doi, name)
+                    os.makedirs(os.path.dirname(final_path), exist_ok=True)
+                    part_path = final_path + ".part"
+                    with open(part_path, "wb") as f:
+                        for chunk in response.iter_content(chunk_size=1024 * 1024):
+                            if chunk:
+                                f.write(chunk)
+                    os.replace(part_path, final_path)
+                    print(f"[SI并行下载] 下载完成 #{index}: {filename}")
+                    return filename
+            except Exception as e:
+                print(f"[SI并行下载错误] #{index} 下载失败: {url}, 错误: {str(e)}")
+                return None
+
+    def fetch_all(self, doi, urls):
+        """并行下载所有SI文件，返回(成功文件名列表, 失败URL列表)"""
+        futures = [self.executor.submit(self._fetch_one, doi, url, index)
+                   for index, url in enumerate(urls, 1)]
+        filenames = []
+        failed_urls = []
+        for url, future in zip(urls, futures):
+            filename = future.result()
+            if filename:
+                filenames.append(filename)
+            else:
+                failed_urls.append(url)
+        return filenames, failed_urls
+
+
 class PaperProcessor:
     def __init__(self):
         self.screen_width, self.screen_height = pyautogui.size()
@@ -30,15 +162,34 @@ class PaperProcessor:
         self.start_time = datetime.now()
         self.csv_rows = []
         self.csv_fieldnames = []
+        self.csv_index = DoiIndex()  # 规范DOI键 -> 行
         self.last_extract_by_eid = False  # 新增实例变量跟踪eid模式
         self._last_is_full_supp = False  # 跟踪full#supplementary-material模式
+        self.headless_backend = None  # 打印接口和暂存下载使用的无头浏览器，首次需要时创建
+        self._headless_backend_failed = False
+        self.staging = StagingArea(CONFIG["SI_DOWNLOAD_FOLDER"])  # 每个下载任务独立的暂存目录
+        self.layout = LibraryLayout(CONFIG["SI_DOWNLOAD_FOLDER"], CONFIG["LIBRARY_LAYOUT"])  # 文件按DOI分片保存
+        self.library_index = LibraryIndex(CONFIG["LIBRARY_INDEX_DB"]) if CONFIG["LIBRARY_INDEX_DB"] else None
+        self.staging.cleanup()
+        
+        # SI并行下载器(需要requests)
+        self.si_fetcher = None
+        if CONFIG["SI_PARALLEL_DOWNLOAD"] and requests is not None:
+            self.si_fetcher = SIParallelFetcher(
+                CONFIG["SI_DOWNLOAD_FOLDER"],
+                max_workers=CONFIG["SI_MAX_WORKERS"],
+                per_domain_concurrency=CONFIG["SI_PER_DOMAIN_CONCURRENCY"],
+                timeout=CONFIG["SI_HTTP_TIMEOUT"],
+                layout=self.layout
+            )
         
         print(f"\n{'='*50}")
         print(f"论文处理程序启动 - {self.start_time.strftime('%Y-%m-%d %H:%M:%S')}")
         print(f"HTML保存路径: {CONFIG['DOWNLOAD_PATH']}")
-        print(f"SI下载文件夹: {CONFIG['SI_DOWNLOAD_FOLDER']}")
+        print(f"SI下载文件夹: {CONFIG['SI_DOWNLOAD_FOLDER']} (布局: {CONFIG['LIBRARY_LAYOUT']})")
         print(f"论文列表文件: {CONFIG['CSV_PATH']}")
         print(f"使用{'Selenium' if CONFIG['USE_SELENIUM'] else 'PyAutoGUI'}方案")
+        print(f"SI并行下载: {'开启' if self.si_fetcher else '关闭'}")
         print(f"目标文件类型: {', '.join(CONFIG['DOCUMENT_EXTENSIONS'])}")
         print(f"{'='*50}\n")
         
@@ -48,31 +199,26 @@ class PaperProcessor:
     
     def update_csv_column(self, doi, column, value):
         """按DOI查找并更新指定列"""
-        updated = False
-        for row in self.csv_rows:
-            # 安全处理DOI值
-            row_doi = row.get('DOI', '')
-            if isinstance(row_doi, str):
-                row_doi = row_doi.strip()
-            else:
-                row_doi = str(row_doi).strip() if row_doi is not None else ""
-                
-            if row_doi == doi:
-                row[column] = value
-                updated = True
-                break
-                
-        if updated:
+        self.update_csv_columns(doi, {column: value})
+
+    def update_csv_columns(self, doi, updates):
+        """按DOI查找并一次性更新多列"""
+        row = self.csv_index.get(doi)
+        if row is not None:
+            row.update(updates)
+            for column in updates:
+                if column not in self.csv_fieldnames:
+                    self.csv_fieldnames.append(column)
             try:
                 with open(CONFIG["CSV_PATH"], 'w', encoding='utf-8-sig', newline='') as f:
                     writer = csv.DictWriter(f, fieldnames=self.csv_fieldnames)
                     writer.writeheader()
                     writer.writerows(self.csv_rows)
-                print(f"[CSV] 已更新DOI={doi}的{column}列为: {value}")
+                print(f"[CSV] 已更新DOI={doi}的数据: {updates}")
             except Exception as e:
                 print(f"[CSV错误] 写回CSV失败: {str(e)}")
         else:
-            print(f"[CSV警告] 未找到DOI={doi}，无法更新{column}")
+            print(f"[CSV警告] 未找到DOI={doi}，无法更新{', '.join(updates)}")
     
     def get_csv_papers(self):
         """从CSV获取待处理论文列表"""
@@ -82,6 +228,7 @@ class PaperProcessor:
                 reader = csv.DictReader(f)
                 self.csv_fieldnames = list(reader.fieldnames) if reader.fieldnames else []
                 self.csv_rows = list(reader)
+                self.csv_index = DoiIndex(self.csv_rows)
                 
                 papers = []
                 found_start = False
@@ -105,12 +252,11 @@ class PaperProcessor:
                     if not doi:
                         print(f"[跳过] 第{i}行: 缺少DOI")
                         continue
-                        
-                    html_filename = row.get('HTMLFile', '')
-                    html_filename = html_filename.strip() if isinstance(html_filename, str) else ""
-                    if not html_filename:
-                        print(f"[跳过] 第{i}行: 缺少HTML文件名")
+                    if self.csv_index.get(doi) is not row:
+                        print(f"[跳过] 第{i}行: DOI与前面的行重复")
                         continue
+                        
+                    # 没有HTML快照的论文(模板分支下载)在处理时按需抓取
                     
                     # 找到第一个符合条件的论文
                     if not found_start:
@@ -180,10 +326,15 @@ class PaperProcessor:
             return 0
     
     def extract_si_url(self, txt_path, doi, domain):
-        """从HTML文件提取SI链接"""
+        """从HTML文件提取SI链接(仅返回首选的一个)"""
+        si_urls = self.extract_si_urls(txt_path, doi, domain)
+        return si_urls[0] if si_urls else None
+
+    def extract_si_urls(self, txt_path, doi, domain):
+        """从HTML文件提取所有SI链接，PDF链接排在最前"""
         if not os.path.exists(txt_path):
             print(f"[错误] HTML文件不存在: {txt_path}")
-            return None
+            return []
         
         print(f"[分析阶段] 正在从HTML提取SI文档链接: {txt_path}")
         try:
@@ -199,7 +350,7 @@ class PaperProcessor:
     
             if not isinstance(data, list):
                 print("[错误] JSON文件格式应为数组形式")
-                return None
+                return []
         
             # 查找匹配的关键词数组
             si_keywords = []
@@ -219,7 +370,7 @@ class PaperProcessor:
     
             if not si_keywords:
                 print(f"[分析阶段] 未找到匹配的SI关键词: {domain}")
-                return None
+                return []
     
             print(f"[分析阶段] 找到SI关键词: {si_keywords}")
 
@@ -234,7 +385,7 @@ class PaperProcessor:
                     print(f"[分析阶段] 关键词为doi，已替换为DOI/s格式: {si_keywords}")
                 else:
                     print("[警告] 关键词为doi但未提供有效论文DOI")
-                    return None
+                    return []
         
             # 从HTML文件读取内容
             with open(txt_path, 'r', encoding='utf-8') as f:
@@ -243,21 +394,53 @@ class PaperProcessor:
             # eid关键词特殊处理
             if is_eid:
                 self.last_extract_by_eid = True
-                eid_match = re.search(r'"eid":"([^"]+)"', content)
-                if not eid_match:
+                # 优先读取内嵌JSON状态中的附件列表，得到全部SI文件
+                states = list(embedded_state.iter_states(content, 'eid"'))
+                attachments = [a for a in embedded_state.attachment_eids(states) if self.is_document_link(a)]
+                if attachments:
+                    si_urls = [f"https://ars.els-cdn.com/content/image/{a}" for a in attachments]
+                    print(f"[分析阶段] 从附件列表得到 {len(si_urls)} 个SI链接")
+                    return si_urls
+                eid = embedded_state.find_value(states, "eid")
+                if not eid:
+                    eid_match = re.search(r'"eid":"([^"]+)"', content)
+                    eid = eid_match.group(1) if eid_match else None
+                if not eid:
                     print(f"[分析阶段] 未找到eid")
                     self.update_csv_column(doi, 'SIDownloadStatus', 'NOSI')
-                    return None
-                eid = eid_match.group(1)
+                    return []
+                # 没有附件列表时，收集页面中出现的全部 <eid>-mmcN.扩展名 附件
+                attachments = []
+                for name in re.findall(re.escape(eid) + r'-mmc\d+\.[A-Za-z0-9]+', content):
+                    if name not in attachments and self.is_document_link(name):
+                        attachments.append(name)
+                if attachments:
+                    si_urls = [f"https://ars.els-cdn.com/content/image/{a}" for a in attachments]
+                    print(f"[分析阶段] 从页面中的附件名得到 {len(si_urls)} 个SI链接")
+                    return si_urls
                 si_url = f"https://ars.els-cdn.com/content/image/{eid}-mmc1.pdf"
                 print(f"[分析阶段] 基于eid构建PDF链接: {si_url}")
-                return si_url
+                return [si_url]
     
             # 从HTML内容中提取所有URL
             urls = re.findall(r'href=[\'"]?([^\'" >]+)', content)
             print(f"[分析阶段] 共找到 {len(urls)} 个链接，正在筛选文档链接...")
 
             if is_full_supp:
+                # 快照中已有补充材料的文件链接时直接返回全部，交给并行下载
+                attachments = []
+                for url in urls:
+                    if isinstance(url, str) and SUPPLEMENTARY_FILE_PATTERN.search(url) and self.is_document_link(url):
+                        if url.startswith('//'):
+                            url = f"https:{url}"
+                        elif not url.startswith('http'):
+                            url = f"https://{domain}/{url.lstrip('/')}"
+                        if url not in attachments:
+                            attachments.append(url)
+                if attachments:
+                    print(f"[分析阶段] 从补充材料文件链接得到 {len(attachments)} 个SI链接")
+                    self._last_is_full_supp = False
+                    return attachments
                 valid_urls = []
                 for url in urls:
                     if not isinstance(url, str):
@@ -268,13 +451,13 @@ class PaperProcessor:
                 if not valid_urls:
                     print(f"[分析阶段] 未找到包含{si_keywords}的链接")
                     self.update_csv_column(doi, 'SIDownloadStatus', 'NOSI')
-                    return None
+                    return []
                 si_url = valid_urls[0]
                 if not si_url.startswith('http'):
                     si_url = f"https://{domain}/{si_url.lstrip('/')}"
                 print(f"[分析阶段] 最终选择的SI文档链接: {si_url}")
                 self._last_is_full_supp = True
-                return si_url
+                return [si_url]
             else:
                 self._last_is_full_supp = False
             
@@ -298,23 +481,162 @@ class PaperProcessor:
                 print(f"[分析阶段] 未找到包含{si_keywords}和文档扩展名的链接")
                 if si_keywords:
                     self.update_csv_column(doi, "SIDownloadStatus", 'NOSI')
-                return None
+                return []
         
-            # 优先返回PDF链接
-            pdf_url = next((u for u in valid_urls if u.lower().endswith('.pdf')), None)
-            si_url = pdf_url if pdf_url else valid_urls[0]
-    
-            # 确保URL完整
-            if not si_url.startswith('http'):
-                si_url = f"https://{domain}/{si_url.lstrip('/')}"
+            # PDF链接优先，其余按页面顺序，去重后补全URL
+            pdf_urls = [u for u in valid_urls if u.lower().endswith('.pdf')]
+            other_urls = [u for u in valid_urls if not u.lower().endswith('.pdf')]
+            si_urls = []
+            for si_url in pdf_urls + other_urls:
+                if si_url.startswith('//'):
+                    si_url = f"https:{si_url}"
+                elif not si_url.startswith('http'):
+                    si_url = f"https://{domain}/{si_url.lstrip('/')}"
+                if si_url not in si_urls:
+                    si_urls.append(si_url)
     
-            print(f"[分析阶段] 最终选择的SI文档链接: {si_url}")
-            return si_url
+            print(f"[分析阶段] 共选出 {len(si_urls)} 个SI文档链接，首选: {si_urls[0]}")
+            return si_urls
     
         except Exception as e:
             print(f"[错误] SI链接提取失败: {str(e)}")
-            return None
+            return []
     
+    def get_headless_backend(self):
+        """获取用于打印PDF和暂存下载的无头浏览器，无法创建时返回None"""
+        if self._headless_backend_failed:
+            return None
+        if self.headless_backend is None:
+            try:
+                self.headless_backend = SeleniumBackend(
+                    CONFIG["EDGE_DRIVER_PATH"],
+                    CONFIG["SI_DOWNLOAD_FOLDER"],
+                    headless=CONFIG["HEADLESS"],
+                    page_load_timeout=CONFIG["PAGE_LOAD_TIMEOUT"],
+                    user_data_dir=CONFIG["HEADLESS_PROFILE_DIR"] or None
+                )
+            except Exception as e:
+                print(f"[无头浏览器] 无法启动，使用桌面浏览器: {str(e)}")
+                self._headless_backend_failed = True
+                return None
+        return self.headless_backend
+
+    def print_si_to_pdf(self, doi, url):
+        """用浏览器原生打印接口把SI页面保存到暂存目录，完成后改名为<doi>.pdf"""
+        if not CONFIG["SI_PRINT_TO_PDF"]:
+            return None
+        backend = self.get_headless_backend()
+        if backend is None:
+            return None
+        new_filename = doi_filename(doi, ".pdf")
+        staging_dir = self.staging.create(doi)
+        start = time.time()
+        try:
+            if not backend.navigate(url):
+                print("[打印PDF] 页面打开失败，改用模拟打印")
+                return None
+            if backend.is_login_page():
+                print("[打印PDF] 无头浏览器打开的是登录/付费墙页面，改用桌面浏览器")
+                return None
+            if backend.is_blank_page():
+                print("[打印PDF] 页面没有可打印的内容(PDF查看器或空白页)，改用桌面浏览器")
+                return None
+            if backend.print_to_pdf(os.path.join(staging_dir, new_filename)):
+                print(f"[打印PDF] 已保存: {new_filename} (用时 {time.time() - start:.1f}秒)")
+                return self.staging.commit(staging_dir, new_filename, self.layout.relative_path(doi, new_filename))
+            print("[打印PDF] 打印失败，改用模拟打印")
+            return None
+        finally:
+            backend.close_page()
+            self.staging.discard(staging_dir)
+
+    def download_with_backend(self, doi, url, wait_time=40):
+        """无头浏览器下载到独立暂存目录，文件完整后以DOI命名移入SI文件夹"""
+        if not CONFIG["SI_STAGED_DOWNLOAD"]:
+            return None
+        backend = self.get_headless_backend()
+        if backend is None:
+            return None
+        staging_dir = self.staging.create(doi)
+        try:
+            if not backend.set_download_folder(staging_dir) or not backend.navigate(url):
+                return None
+            downloaded_file = backend.wait_for_download(staging_dir, set(), wait_time)
+            if not downloaded_file:
+                print("[暂存下载] 未检测到下载文件，改用桌面浏览器")
+                return None
+            new_filename = doi_filename(doi, os.path.splitext(downloaded_file)[1])
+            return self.staging.commit(staging_dir, downloaded_file, self.layout.relative_path(doi, new_filename))
+        finally:
+            backend.close_page()
+            self.staging.discard(staging_dir)
+
+    def capture_html(self, doi):
+        """用无头浏览器打开DOI页面并保存HTML快照(<域名>_<DOI>.txt)，写入CSV的HTMLFile列，返回快照路径"""
+        if not CONFIG["SI_CAPTURE_HTML"]:
+            return None
+        backend = self.get_headless_backend()
+        if backend is None:
+            return None
+        try:
+            if not backend.navigate(f"https://doi.org/{doi}"):
+                return None
+            if backend.is_login_page():
+                print("[HTML快照] 无头浏览器打开的是登录/付费墙页面，不保存快照")
+                return None
+            final_url = backend.get_current_url()
+            source = backend.get_page_source()
+            if not final_url or not source:
+                print("[HTML快照] 页面源码为空")
+                return None
+            filename = self.normalize_filename(f"{urlparse(final_url).netloc}_{doi_filename(doi, '.txt')}")
+            html_path = os.path.join(CONFIG["DOWNLOAD_PATH"], filename)
+            with open(html_path + ".part", 'w', encoding='utf-8') as f:
+                f.write(source)
+            os.replace(html_path + ".part", html_path)
+            print(f"[HTML快照] 已保存: {html_path} ({len(source)}字符)")
+            self.update_csv_column(doi, 'HTMLFile', html_path)
+            return html_path
+        except Exception as e:
+            print(f"[HTML快照错误] 抓取失败: {str(e)}")
+            return None
+        finally:
+            backend.close_page()
+
+    def link_si_from_library(self, doi):
+        """DOI的SI已在任一项目库中时硬链接到本项目库并更新CSV，返回是否已处理"""
+        if not self.library_index or not doi:
+            return False
+        sources = self.library_index.lookup(doi, "si")
+        if not sources:
+            return False
+        filenames = []
+        for source in sources:
+            name = os.path.basename(source)
+            target = self.layout.path(doi, name)
+            if os.path.abspath(source) != os.path.abspath(target):
+                if not self.library_index.link_into(source, target, doi, "si", CONFIG["PROJECT_NAME"]):
+                    return False
+            filenames.append(self.layout.relative_path(doi, name))
+        print(f"[内容索引] SI已在库中，直接链接 {len(filenames)} 个文件: {sources}")
+        self.update_csv_columns(doi, {
+            'SIDownloadStatus': 'SUCCESS',
+            'SIFilename': ';'.join(filenames),
+            'SIFileCount': str(len(filenames))
+        })
+        return True
+
+    def register_si_files(self, doi, filenames):
+        """把下载完成的SI文件登记到内容索引(内容相同的文件改为硬链接)"""
+        if not self.library_index:
+            return
+        for filename in filenames:
+            path = os.path.join(CONFIG["SI_DOWNLOAD_FOLDER"], *filename.split('/'))
+            try:
+                self.library_index.add(path, doi, "si", CONFIG["PROJECT_NAME"])
+            except (OSError, sqlite3.Error) as e:
+                print(f"[内容索引警告] 登记失败: {filename}, {str(e)}")
+
     def download_and_rename_file(self, doi, url, auto_download=False, wait_time=40):
         """下载并重命名文件"""
         if not doi or not url:
@@ -323,8 +645,9 @@ class PaperProcessor:
             
         print(f"[文件下载] 正在处理DOI: {doi}")
         
-        # 获取下载文件夹中的初始文件列表
+        # 获取下载文件夹中的初始文件列表(桌面浏览器无法指定下载目录)
         initial_files = set(os.listdir(CONFIG["SI_DOWNLOAD_FOLDER"]))
+        task_start = time.time()
 
         try:
             edge_path = r'C:\Program Files (x86)\Microsoft\Edge\Application\msedge.exe'
@@ -341,7 +664,7 @@ class PaperProcessor:
                 time.sleep(5)
                 pyautogui.press('enter')
                 time.sleep(5)
-                pyautogui.write("doi", interval=0.1)  # 输入文件名
+                pyautogui.write(self.normalize_filename(doi.replace('/', '_')), interval=0.1)  # 输入文件名
                 time.sleep(5)
                 pyautogui.press('enter')
                 time.sleep(2)
@@ -349,32 +672,7 @@ class PaperProcessor:
 
             time.sleep(wait_time)
 
-            # 获取下载后的文件列表
-            final_files = set(os.listdir(CONFIG["SI_DOWNLOAD_FOLDER"]))
-            new_files = final_files - initial_files
-            
-            if not new_files:
-                print("[警告] 未检测到新下载的文件")
-                return None
-            
-            # 获取最新下载的文件
-            downloaded_file = max(new_files, key=lambda f: os.path.getmtime(os.path.join(CONFIG["SI_DOWNLOAD_FOLDER"], f)))
-            original_path = os.path.join(CONFIG["SI_DOWNLOAD_FOLDER"], downloaded_file)
-            
-            # 根据DOI生成新文件名
-            safe_doi = self.normalize_filename(doi.replace('/', '_'))
-            file_ext = os.path.splitext(downloaded_file)[1]
-            new_filename = f"{safe_doi}{file_ext}"
-            new_path = os.path.join(CONFIG["SI_DOWNLOAD_FOLDER"], new_filename)
-            
-            # 重命名文件
-            try:
-                os.rename(original_path, new_path)
-                print(f"[文件下载] 文件已重命名为: {new_filename}")
-                return new_filename
-            except Exception as e:
-                print(f"[错误] 文件重命名失败: {str(e)}")
-                return None
+            return self.claim_downloaded_file(initial_files, task_start, doi)
         except Exception as e:
             print(f"[错误] 下载操作失败: {str(e)}")
             return None
@@ -387,6 +685,7 @@ class PaperProcessor:
             
         folder = CONFIG["SI_DOWNLOAD_FOLDER"]
         before = set(os.listdir(folder))
+        task_start = time.time()
         print(f"[自动操作] 正在查找并点击下载按钮: {button_image_path}")
         start_time = time.time()
         found = False
@@ -417,33 +716,28 @@ class PaperProcessor:
         # 检测新下载文件夹并重命名
         if found:
             print("[自动操作] 检测新下载文件夹并重命名...")
-            return self.rename_latest_downloaded_file_after(before, doi, wait_time=wait_time)
+            time.sleep(wait_time)
+            return self.claim_downloaded_file(before, task_start, doi)
         return None
 
-    def rename_latest_downloaded_file_after(self, before, doi, wait_time=50):
-        """重命名最新下载的文件"""
+    def claim_downloaded_file(self, before, since, doi):
+        """桌面浏览器下载的退路：取任务开始后出现的最新完整文件，以DOI命名"""
         if not doi:
             return None
             
         folder = CONFIG["SI_DOWNLOAD_FOLDER"]
-        time.sleep(wait_time)
-        after = set(os.listdir(folder))
-        new_files = after - before
-        
-        if not new_files:
+        downloaded_file = StagingArea.claim_new_file(folder, before, since)
+        if not downloaded_file:
             print("[警告] 未检测到新下载的文件")
             return None
             
         try:
-            downloaded_file = max(new_files, key=lambda f: os.path.getmtime(os.path.join(folder, f)))
-            original_path = os.path.join(folder, downloaded_file)
-            safe_doi = self.normalize_filename(doi.replace('/', '_'))
-            file_ext = os.path.splitext(downloaded_file)[1]
-            new_filename = f"{safe_doi}{file_ext}"
-            new_path = os.path.join(folder, new_filename)
-            os.rename(original_path, new_path)
+            new_filename = doi_filename(doi, os.path.splitext(downloaded_file)[1])
+            new_path = self.layout.path(doi, new_filename)
+            os.makedirs(os.path.dirname(new_path), exist_ok=True)
+            os.replace(os.path.join(folder, downloaded_file), new_path)
             print(f"[文件下载] 文件已重命名为: {new_filename}")
-            return new_filename
+            return self.layout.relative_path(doi, new_filename)
         except Exception as e:
             print(f"[错误] 文件重命名失败: {str(e)}")
             return None
@@ -468,10 +762,16 @@ class PaperProcessor:
                 return self.click_download_button_and_close(r"E:\SIdownload\download.png", doi, wait_time=20)
 
             elif need_download:
+                printed = self.print_si_to_pdf(doi, url)
+                if printed:
+                    return printed
                 print("[浏览器操作] 需要下载文件，等待页面加载...")
                 time.sleep(CONFIG["PAGE_LOAD_TIMEOUT"])
                 return self.download_and_rename_file(doi, url, auto_download=False)
             else:
+                staged = self.download_with_backend(doi, url)
+                if staged:
+                    return staged
                 print("[浏览器操作] 不需要下载文件，等待页面加载...")
                 time.sleep(CONFIG["PAGE_LOAD_TIMEOUT"])
                 return self.download_and_rename_file(doi, url, auto_download=True)
@@ -504,23 +804,33 @@ class PaperProcessor:
         title = paper.get('Title', '无标题')
         title = title[:50] if isinstance(title, str) else "无标题"
         
-        # 每次处理新论文时重置eid标志
+        # 每次处理新论文时重置eid和full#supplementary-material标志
         self.last_extract_by_eid = False
+        self._last_is_full_supp = False
         
         self.print_progress(index, total, title)
         print(f"[处理开始] DOI: {doi}")
 
-        # 获取HTML文件路径
+        # 其它项目已下载过该DOI的SI时直接链接过来(PARTIAL的论文要重新下载缺少的文件)
+        status = paper.get('SIDownloadStatus', '')
+        status = status.strip().upper() if isinstance(status, str) else ""
+        if status != "PARTIAL" and self.link_si_from_library(doi):
+            return True
+
+        # 获取HTML文件路径，论文阶段未保存快照时按需抓取
         html_filename = paper.get('HTMLFile', '')
         html_filename = html_filename.strip() if isinstance(html_filename, str) else ""
-        if not html_filename:
-            print("[跳过] 缺少HTML文件名")
-            return False
-            
-        html_path = os.path.join(CONFIG["DOWNLOAD_PATH"], html_filename)
-        if not os.path.exists(html_path):
-            print(f"[跳过] HTML文件不存在: {html_path}")
-            return False
+        html_path = os.path.join(CONFIG["DOWNLOAD_PATH"], html_filename) if html_filename else ""
+        if not html_path or not os.path.exists(html_path):
+            reason = "缺少HTML文件名" if not html_filename else f"HTML文件不存在: {html_path}"
+            if not CONFIG["SI_CAPTURE_HTML"]:
+                print(f"[跳过] 缺少HTML快照: {reason}")
+                return False
+            print(f"[HTML快照] {reason}，重新抓取页面")
+            html_filename = html_path = self.capture_html(doi)
+            if not html_path:
+                print("[跳过] 无法获取HTML快照")
+                return False
         
         # 从HTML文件名中提取域名
         try:
@@ -542,13 +852,31 @@ class PaperProcessor:
             return False
 
         # 提取SI文档链接
-        si_url = self.extract_si_url(html_path, doi, domain)
-        if not si_url:
+        si_urls = self.extract_si_urls(html_path, doi, domain)
+        if not si_urls:
             print("[跳过] 未找到有效SI文档链接")
             self.update_csv_column(doi, 'SIDownloadStatus', 'NOSI')
             return False
 
-        print(f"[成功] 找到SI文档链接: {si_url}")
+        si_url = si_urls[0]
+        print(f"[成功] 找到 {len(si_urls)} 个SI文档链接: {si_urls}")
+
+        # 直接文档链接：并行下载全部SI文件
+        if self.si_fetcher and not self._last_is_full_supp:
+            filenames, failed_urls = self.si_fetcher.fetch_all(doi, si_urls)
+            if not failed_urls:
+                # 只登记完整的SI集合，否则其它项目(或下次运行)会把不完整的集合直接链接为SUCCESS
+                self.register_si_files(doi, filenames)
+            if filenames:
+                self.update_csv_columns(doi, {
+                    'SIDownloadStatus': 'SUCCESS' if not failed_urls else 'PARTIAL',
+                    'SIFilename': ';'.join(filenames),
+                    'SIFileCount': str(len(filenames))
+                })
+                if failed_urls:
+                    print(f"[SI并行下载] {len(failed_urls)} 个文件下载失败，下次运行时重试: {failed_urls}")
+                return not failed_urls
+            print("[SI并行下载] 全部文件下载失败，回退到浏览器下载方案")
 
         # 获取下载标志并下载文件
         need_download = self.get_download_flag(domain)
@@ -558,6 +886,7 @@ class PaperProcessor:
         
         # 更新CSV状态
         if result_filename:
+            self.register_si_files(doi, [result_filename])
             # 更新SIDownloadStatus为SUCCESS
             self.update_csv_column(doi, 'SIDownloadStatus', 'SUCCESS')
             # 更新SIFilename为下载的文件名
@@ -589,6 +918,13 @@ class PaperProcessor:
                 print(f"\n[等待] 暂停 {CONFIG['DELAY_BETWEEN_PAPERS']} 秒...")
                 time.sleep(CONFIG["DELAY_BETWEEN_PAPERS"])
         
+        if self.si_fetcher:
+            self.si_fetcher.close()
+        if self.headless_backend:
+            self.headless_backend.quit()
+        if self.library_index:
+            self.library_index.close()
+        
         elapsed = datetime.now() - self.start_time
         print(f"\n{'='*50}")
         print(f"[处理完成] 成功处理 {success_count}/{total} 篇论文")
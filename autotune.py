@@ -0,0 +1,126 @@
+import os
+import sys
+import json
+import math
+import shutil
+import argparse
+from datetime import datetime
+
+from run_trace import percentile
+
+# 全局配置
+CONFIG = {
+    "STATS_JSON": r"D:\Paperdownload-xzq\DownloadStats.json",  # Paperdownload记录的下载统计
+    "SETTINGS_JSON": r"D:\Paperdownload-xzq\DownloadSettings.json",  # 待调整的下载设置
+    "MIN_SAMPLES": 5,  # 样本数少于该值的域名不调整
+    "DELAY_MARGIN": 1.25,  # ctrl_s_delay = p95耗时 * 余量 + 固定余量
+    "DELAY_PADDING": 2,  # 固定余量(秒)
+    "MIN_DELAY": 5,  # 等待时间下限(秒)
+    "MAX_DELAY": 120,  # 等待时间上限(秒)
+    "RETRY_COVERAGE": 0.95,  # max_retries取覆盖95%成功下载所需的尝试次数
+    "MIN_RETRY_RATE": 0.05,  # 重试成功率低于该值时不再重试
+}
+
+
+def propose_domain(current, stats):
+    """根据一个域名的统计数据给出新设置，返回(新设置, 说明列表)"""
+    proposed = dict(current)
+    notes = []
+    samples = stats.get("time_to_file", [])
+
+    # 1. ctrl_s_delay: 文件出现耗时的p95加余量
+    if current.get("use_ctrl_s") and len(samples) >= CONFIG["MIN_SAMPLES"]:
+        p95 = percentile(samples, 95)
+        delay = math.ceil(p95 * CONFIG["DELAY_MARGIN"] + CONFIG["DELAY_PADDING"])
+        proposed["ctrl_s_delay"] = max(CONFIG["MIN_DELAY"], min(CONFIG["MAX_DELAY"], delay))
+        notes.append(f"耗时p50={percentile(samples, 50):.1f}s p95={p95:.1f}s (n={len(samples)})")
+
+    # 2. max_retries: 按各次尝试的成功分布
+    attempts = {int(k): v for k, v in stats.get("attempts", {}).items()}
+    successes = {n: counts.get("success", 0) for n, counts in attempts.items()}
+    total_success = sum(successes.values())
+    retried = sum(counts.get("success", 0) + counts.get("failed", 0) for n, counts in attempts.items() if n > 1)
+    retry_success = sum(count for n, count in successes.items() if n > 1)
+    if total_success + retried >= CONFIG["MIN_SAMPLES"]:
+        if retried and retry_success / retried < CONFIG["MIN_RETRY_RATE"]:
+            proposed["max_retries"] = 1
+            notes.append(f"重试成功率 {retry_success}/{retried}，取消重试")
+        elif total_success:
+            covered = 0
+            for n in sorted(successes):
+                covered += successes[n]
+                if covered >= total_success * CONFIG["RETRY_COVERAGE"]:
+                    proposed["max_retries"] = max(1, n)
+                    break
+            notes.append(f"成功分布(第n次尝试): {dict(sorted(successes.items()))}")
+
+    # 3. retry_delay: 仍需重试时，不超过文件出现耗时的p50
+    if proposed.get("max_retries", 1) > 1 and len(samples) >= CONFIG["MIN_SAMPLES"]:
+        p50 = math.ceil(percentile(samples, 50))
+        proposed["retry_delay"] = max(CONFIG["MIN_DELAY"], min(current.get("retry_delay", p50), p50))
+
+    branches = stats.get("branches", {})
+    if branches:
+        notes.append("分支成功率: " + ", ".join(
+            f"{name} {c.get('success', 0)}/{c.get('success', 0) + c.get('failed', 0)}" for name, c in branches.items()
+        ))
+    return proposed, notes
+
+
+def autotune(stats_path, settings_path, apply=False):
+    """对比统计数据和当前设置，打印建议；apply为True时写回DownloadSettings.json"""
+    if not os.path.exists(stats_path):
+        print(f"[自动调优] 统计文件不存在: {stats_path}")
+        return False
+    with open(stats_path, 'r', encoding='utf-8-sig') as f:
+        domain_stats = json.load(f).get("domains", {})
+    with open(settings_path, 'r', encoding='utf-8-sig') as f:
+        settings = json.load(f)
+
+    default = settings.get("default", {})
+    domains = settings.setdefault("domains", {})
+    changed = 0
+
+    print(f"\n{'='*50}")
+    print(f"[自动调优] 统计域名数: {len(domain_stats)}")
+    for domain in sorted(domain_stats):
+        current = dict(default)
+        current.update(domains.get(domain, {}))
+        proposed, notes = propose_domain(current, domain_stats[domain])
+        diff = {k: (current.get(k), v) for k, v in proposed.items() if current.get(k) != v}
+
+        print(f"\n[域名] {domain}")
+        for note in notes:
+            print(f"  {note}")
+        if not diff:
+            print("  设置无需调整" if notes else f"  样本不足({CONFIG['MIN_SAMPLES']}个以上才调整)")
+            continue
+        for key, (old, new) in diff.items():
+            print(f"  {key}: {old} -> {new}")
+        changed += 1
+        if apply:
+            entry = domains.setdefault(domain, dict(current))
+            entry.update({key: new for key, (old, new) in diff.items()})
+
+    print(f"\n[自动调优] 共 {changed} 个域名有调整建议")
+    if apply and changed:
+        backup = f"{settings_path}.{datetime.now().strftime('%Y%m%d_%H%M%S')}.bak"
+        shutil.copy2(settings_path, backup)
+        with open(settings_path, 'w', encoding='utf-8-sig') as f:
+            json.dump(settings, f, ensure_ascii=False, indent=4)
+        print(f"[自动调优] 已写入 {settings_path} (原文件备份: {backup})")
+    elif changed:
+        print("[自动调优] 仅为建议，使用 --apply 写入配置")
+    print(f"{'='*50}")
+    return True
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="根据下载统计调整DownloadSettings.json")
+    parser.add_argument("--apply", action="store_true", help="将建议写入DownloadSettings.json")
+    parser.add_argument("--stats", default=CONFIG["STATS_JSON"], help="下载统计文件")
+    parser.add_argument("--settings", default=CONFIG["SETTINGS_JSON"], help="下载设置文件")
+    parser.add_argument("--min-samples", type=int, default=CONFIG["MIN_SAMPLES"], help="调整所需的最少样本数")
+    args = parser.parse_args()
+    CONFIG["MIN_SAMPLES"] = args.min_samples
+    sys.exit(0 if autotune(args.stats, args.settings, args.apply) else 1)
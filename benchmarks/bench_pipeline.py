@@ -0,0 +1,295 @@
+"""离线流水线基准测试
+
+启动本地出版商替身服务器，用HTTP后端(不启动浏览器)跑一遍Paperdownload，
+再用生成的HTML快照跑SIdownload，报告 papers/hour、各阶段耗时(p50/p95)和内存。
+
+用法:
+    python benchmarks/bench_pipeline.py --papers 10 --parallel 4 --fail html=0.05,error=0.02
+    python benchmarks/bench_pipeline.py --keep  # 保留临时目录以便查看CSV和trace
+"""
+import os
+import sys
+import csv
+import json
+import time
+import shutil
+import argparse
+import tempfile
+import tracemalloc
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+import run_trace
+from standin_server import PUBLISHERS, StandinCluster, parse_fail_rates
+
+try:
+    import psutil
+except ImportError:
+    psutil = None
+
+# 各替身出版商在流水线中的配置: (分支direct值, 正文关键词, SI关键词)
+PUBLISHER_RULES = {
+    "acs": ("1", ["openPDF"], ["suppl_file"]),
+    "wiley": ("0", ["epdf"], ["-sup-", "SuppMat"]),
+    "springer": ("0", ["/pdf/"], ["_MOESM"]),
+    "sciencedirect": ("0", ["md5"], None),  # SI走els-cdn固定域名，无法替身
+    "rsc": ("0", ["articlepdf"], ["suppdata"]),
+}
+
+
+def write_json(path, data):
+    with open(path, 'w', encoding='utf-8') as f:
+        json.dump(data, f, ensure_ascii=False, indent=2)
+
+
+def build_workspace(root, cluster, papers_per_publisher):
+    """生成以替身netloc为键的临时配置和论文CSV"""
+    state = cluster.state
+    paths = {
+        "root": root,
+        "html": os.path.join(root, "html"),
+        "papers": os.path.join(root, "papers"),
+        "si": os.path.join(root, "si"),
+        "traces": os.path.join(root, "traces"),
+        "csv": os.path.join(root, "papers.csv"),
+        "paper_keywords": os.path.join(root, "Paperkeyword.json"),
+        "si_keywords": os.path.join(root, "SIkeyword.json"),
+        "branch": os.path.join(root, "DomainBranch.json"),
+        "templates": os.path.join(root, "DownloadTemplates.json"),
+        "settings": os.path.join(root, "DownloadSettings.json"),
+        "login": os.path.join(root, "LoginConfig.json"),
+        "flows": os.path.join(root, "LoginFlows.json"),
+        "clicks": os.path.join(root, "ClickPositions.json"),
+        "stats": os.path.join(root, "DownloadStats.json"),
+        "retry": os.path.join(root, "RetryQueue.json"),
+        "slow_pages": os.path.join(root, "slow_pages.jsonl"),
+        "library": os.path.join(root, "library.db"),
+        "inflight": os.path.join(root, "inflight"),
+    }
+    for key in ("html", "papers", "si", "traces"):
+        os.makedirs(paths[key], exist_ok=True)
+
+    branch, templates, domains, paper_keywords, si_keywords = [], {}, {}, [], []
+    for name, (direct, keywords, si) in PUBLISHER_RULES.items():
+        netloc = state.netloc(name)
+        branch.append({"domain": netloc, "direct": direct})
+        paper_keywords.append({"url": state.base(name), "login": "0", "keywords": keywords})
+        if si:
+            si_keywords.append({"url": state.base(name), "download": "0", "keywords": si})
+        domains[netloc] = {"use_ctrl_s": False, "ctrl_s_delay": 5, "max_retries": 2, "retry_delay": 1}
+    templates[state.netloc("acs")] = f"{state.base('acs')}/doi/pdf/{{doi}}"
+
+    write_json(paths["branch"], branch)
+    write_json(paths["templates"], templates)
+    write_json(paths["settings"], {"default": {"use_ctrl_s": False, "ctrl_s_delay": 5, "max_retries": 2,
+                                               "retry_delay": 1}, "domains": domains})
+    write_json(paths["paper_keywords"], paper_keywords)
+    write_json(paths["si_keywords"], si_keywords)
+    write_json(paths["login"], [])
+    write_json(paths["flows"], {})
+
+    dois = []
+    with open(paths["csv"], 'w', encoding='utf-8-sig', newline='') as f:
+        writer = csv.DictWriter(f, fieldnames=["Key", "DOI", "Title", "DownloadStatus"])
+        writer.writeheader()
+        for index in range(1, papers_per_publisher + 1):
+            for name in PUBLISHERS:
+                doi = cluster.doi_for(name, index)
+                dois.append(doi)
+                writer.writerow({"Key": f"{name}{index:05d}", "DOI": doi,
+                                 "Title": f"Stand-in {name} {index}", "DownloadStatus": ""})
+    return paths, dois
+
+
+def configure_paperdownload(paths, cluster, parallel, timeout):
+    import Paperdownload
+    config = Paperdownload.Config
+    config.DOWNLOAD_PATH = paths["html"]
+    config.JSON_PATH = paths["paper_keywords"]
+    config.DOMAIN_BRANCH_JSON = paths["branch"]
+    config.DOWNLOAD_TEMPLATE_JSON = paths["templates"]
+    config.DOWNLOAD_SETTINGS_JSON = paths["settings"]
+    config.LOGIN_CONFIG_JSON = paths["login"]
+    config.LOGIN_FLOW_JSON = paths["flows"]
+    config.CLICK_POSITION_JSON = paths["clicks"]
+    config.DOWNLOAD_STATS_JSON = paths["stats"]
+    config.RETRY_QUEUE_JSON = paths["retry"]
+    config.RETRY_DRAIN_WAIT = 30
+    config.SLOW_PAGE_LOG = paths["slow_pages"]
+    config.LIBRARY_INDEX_DB = paths["library"]
+    config.SINGLEFLIGHT_DIR = paths["inflight"]
+    config.CSV_PATH = paths["csv"]
+    config.PAPER_DOWNLOAD_FOLDER = paths["papers"]
+    config.PHOTOS_PATH = paths["root"]
+    config.HTTP_BACKEND = True
+    config.HTTP_URL_MAP = {
+        "doi.org": cluster.state.base("doi"),
+        "www.sciencedirect.com": cluster.state.base("sciencedirect"),
+    }
+    config.PARALLEL_PAGES = parallel
+    config.DELAY_BETWEEN_PAPERS = 0
+    config.PAGE_LOAD_TIMEOUT = timeout
+    config.ENABLE_TRACE = False  # 由基准测试自己开启追踪，以便读取span记录
+    return Paperdownload
+
+
+def configure_sidownload(paths, timeout):
+    import SIdownload
+    SIdownload.CONFIG.update({
+        "DOWNLOAD_PATH": paths["html"],
+        "JSON_PATH": paths["si_keywords"],
+        "CSV_PATH": paths["csv"],
+        "SI_DOWNLOAD_FOLDER": paths["si"],
+        "DELAY_BETWEEN_PAPERS": 0,
+        "PAGE_LOAD_TIMEOUT": timeout,
+        "SI_HTTP_TIMEOUT": timeout,
+        "SI_PRINT_TO_PDF": False,
+        "SI_STAGED_DOWNLOAD": False,
+        "SI_CAPTURE_HTML": False,
+        "LIBRARY_INDEX_DB": paths["library"],
+    })
+    return SIdownload
+
+
+def rss_mb():
+    if psutil is None:
+        return None
+    return psutil.Process().memory_info().rss / (1 << 20)
+
+
+def stage_metrics(records, elapsed, ok, total, summary_path):
+    """汇总一个阶段的吞吐量和span耗时"""
+    stages = {}
+    for record in records:
+        stages.setdefault(record["name"], []).append(record["dur"])
+    return {
+        "papers": total,
+        "succeeded": ok,
+        "elapsed_s": round(elapsed, 2),
+        "papers_per_hour": round(total / elapsed * 3600, 1) if elapsed else None,
+        "stages": {
+            name: {"count": len(durations),
+                   "p50_s": round(run_trace.percentile(durations, 50), 3),
+                   "p95_s": round(run_trace.percentile(durations, 95), 3)}
+            for name, durations in sorted(stages.items())
+        },
+        "trace_summary": summary_path,
+    }
+
+
+def count_status(csv_path, column, success_values):
+    with open(csv_path, 'r', encoding='utf-8-sig') as f:
+        return sum(1 for row in csv.DictReader(f) if row.get(column, '').strip().upper() in success_values)
+
+
+def bench_paperdownload(paths, cluster, parallel, timeout):
+    Paperdownload = configure_paperdownload(paths, cluster, parallel, timeout)
+    tracer = run_trace.start(paths["traces"], "paperdownload")
+    processor = Paperdownload.PaperProcessor()
+    start = time.perf_counter()
+    try:
+        processor.run()
+    finally:
+        elapsed = time.perf_counter() - start
+        records = list(tracer.records)
+        processor.close()
+    total = sum(1 for r in records if r["name"] == "paper")
+    ok = count_status(paths["csv"], "DownloadStatus", {"SUCCESS"})
+    return stage_metrics(records, elapsed, ok, total, tracer.summary_path)
+
+
+def bench_sidownload(paths, timeout):
+    try:
+        SIdownload = configure_sidownload(paths, timeout)
+    except Exception as e:  # SIdownload在无桌面环境下导入pyautogui会失败
+        print(f"[基准测试] 无法导入SIdownload，跳过SI阶段: {str(e)}")
+        return None
+    if SIdownload.requests is None:
+        print("[基准测试] 未安装requests，SI并行下载不可用，跳过SI阶段")
+        return None
+
+    tracer = run_trace.start(paths["traces"], "sidownload")
+    processor = SIdownload.PaperProcessor()
+    papers = processor.get_csv_papers()
+    start = time.perf_counter()
+    try:
+        for index, paper in enumerate(papers, 1):
+            run_trace.set_context(doi=paper.get("DOI", ""))
+            with run_trace.span("si_paper"):
+                processor.process_paper(paper, index, len(papers))
+        if processor.si_fetcher:
+            processor.si_fetcher.close()
+    finally:
+        elapsed = time.perf_counter() - start
+        records = list(tracer.records)
+        run_trace.stop()
+    ok = count_status(paths["csv"], "SIDownloadStatus", {"SUCCESS", "PARTIAL"})
+    return stage_metrics(records, elapsed, ok, len(papers), tracer.summary_path)
+
+
+def print_report(results):
+    print(f"\n{'='*50}")
+    print("[基准测试结果]")
+    for name, metrics in results["pipelines"].items():
+        if not metrics:
+            print(f"\n{name}: 跳过")
+            continue
+        print(f"\n{name}: {metrics['succeeded']}/{metrics['papers']} 成功, 用时 {metrics['elapsed_s']} 秒, "
+              f"{metrics['papers_per_hour']} papers/hour")
+        for stage, values in metrics["stages"].items():
+            print(f"  {stage:<22} n={values['count']:<5} p50={values['p50_s']:<8} p95={values['p95_s']}")
+    memory = results["memory"]
+    print(f"\n内存: Python分配峰值 {memory['tracemalloc_peak_mb']} MB"
+          + (f", 进程RSS {memory['rss_mb']} MB" if memory['rss_mb'] is not None else ""))
+    print(f"{'='*50}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="离线流水线基准测试")
+    parser.add_argument("--papers", type=int, default=5, help="每个出版商的论文数")
+    parser.add_argument("--parallel", type=int, default=1, help="并行页面数")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--latency", type=float, default=0.2, help="落地页延迟(秒)")
+    parser.add_argument("--pdf-latency", type=float, default=0.5, help="PDF下载延迟(秒)")
+    parser.add_argument("--pdf-kb", type=int, default=200, help="PDF大小(KB)")
+    parser.add_argument("--fail", default="", help="失败率，如 slow=0.02,html=0.05,error=0.02,truncated=0.01")
+    parser.add_argument("--timeout", type=int, default=10, help="页面/下载超时(秒)，slow失败模式会超过它")
+    parser.add_argument("--skip-si", action="store_true", help="只测Paperdownload")
+    parser.add_argument("--output", help="结果JSON输出路径")
+    parser.add_argument("--keep", action="store_true", help="保留临时工作目录")
+    args = parser.parse_args()
+
+    cluster = StandinCluster(args.port, latency=args.latency, pdf_latency=args.pdf_latency,
+                             fail_rates=parse_fail_rates(args.fail), pdf_kb=args.pdf_kb,
+                             slow_seconds=args.timeout + 5).start()
+    root = tempfile.mkdtemp(prefix="paper_bench_")
+    tracemalloc.start()
+    try:
+        paths, dois = build_workspace(root, cluster, args.papers)
+        print(f"[基准测试] 工作目录: {root}, 共 {len(dois)} 篇论文")
+        results = {
+            "args": vars(args),
+            "pipelines": {"Paperdownload": bench_paperdownload(paths, cluster, args.parallel, args.timeout)},
+        }
+        if not args.skip_si:
+            results["pipelines"]["SIdownload"] = bench_sidownload(paths, args.timeout)
+        _, peak = tracemalloc.get_traced_memory()
+        results["memory"] = {"tracemalloc_peak_mb": round(peak / (1 << 20), 2),
+                             "rss_mb": round(rss_mb(), 1) if psutil else None}
+        results["server_requests"] = dict(cluster.state.counts)
+        print_report(results)
+        if args.output:
+            write_json(args.output, results)
+            print(f"[基准测试] 结果已写入: {args.output}")
+    finally:
+        tracemalloc.stop()
+        cluster.stop()
+        if args.keep:
+            print(f"[基准测试] 已保留工作目录: {root}")
+        else:
+            shutil.rmtree(root, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,292 @@
+"""本地出版商替身服务器
+
+每个出版商绑定一个独立的回环地址(127.0.1.x)和同一个端口，这样各出版商的
+netloc互不相同，可以像真实域名一样写入DomainBranch/DownloadTemplates/关键词配置。
+
+模拟内容:
+    - doi.org: /<doi> 按DOI前缀302跳转到对应出版商的落地页
+    - ACS / Wiley / Springer / ScienceDirect(md5+pid) / RSC 形状的落地页(含SI链接)
+    - 直接返回PDF的下载地址，可配置延迟
+    - 失败模式: 超时(slow)、返回登录页而非PDF(html)、503(error)、截断的PDF(truncated)
+
+单独运行: python benchmarks/standin_server.py --port 8765
+"""
+import re
+import sys
+import time
+import random
+import hashlib
+import argparse
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlparse, parse_qs, quote, unquote
+
+# 出版商名 -> 回环地址、DOI前缀
+PUBLISHERS = {
+    "acs": {"host": "127.0.1.11", "prefix": "10.1021"},
+    "wiley": {"host": "127.0.1.12", "prefix": "10.1002"},
+    "springer": {"host": "127.0.1.13", "prefix": "10.1007"},
+    "sciencedirect": {"host": "127.0.1.14", "prefix": "10.1016"},
+    "rsc": {"host": "127.0.1.15", "prefix": "10.1039"},
+}
+DOI_HOST = "127.0.1.10"
+
+LOGIN_WALL = b"<html><head><title>Sign in</title></head><body><form action='/login'>Institutional login required</form></body></html>"
+
+
+def pii_for(doi):
+    """由DOI生成稳定的ScienceDirect风格PII"""
+    return "S" + hashlib.md5(doi.encode()).hexdigest()[:16].upper()
+
+
+class StandinState:
+    """服务器共享状态：延迟、失败率和请求计数"""
+    def __init__(self, port, latency=0.2, pdf_latency=0.5, fail_rates=None, pdf_kb=200,
+                 slow_seconds=60, seed=0):
+        self.port = port
+        self.latency = latency
+        self.pdf_latency = pdf_latency
+        self.fail_rates = fail_rates or {}  # 失败模式 -> 概率
+        self.pdf_kb = pdf_kb
+        self.slow_seconds = slow_seconds
+        self.random = random.Random(seed)
+        self.lock = threading.Lock()
+        self.counts = {}
+
+    def netloc(self, publisher):
+        host = DOI_HOST if publisher == "doi" else PUBLISHERS[publisher]["host"]
+        return f"{host}:{self.port}"
+
+    def base(self, publisher):
+        return f"http://{self.netloc(publisher)}"
+
+    def count(self, key):
+        with self.lock:
+            self.counts[key] = self.counts.get(key, 0) + 1
+
+    def pick_failure(self):
+        """按配置的概率抽取本次下载的失败模式，None表示正常"""
+        with self.lock:
+            roll = self.random.random()
+        for mode, rate in self.fail_rates.items():
+            if roll < rate:
+                return mode
+            roll -= rate
+        return None
+
+    def pdf_bytes(self, label):
+        body = b"%PDF-1.4\n% " + label.encode("utf-8", "replace") + b"\n"
+        padding = max(0, self.pdf_kb * 1024 - len(body) - 6)
+        return body + b"0" * padding + b"\n%%EOF"
+
+
+def landing_page(state, publisher, doi):
+    """生成与已保存快照形状一致的落地页"""
+    base = state.base(publisher)
+    title = f"<title>Stand-in article {doi}</title>"
+    if publisher == "acs":
+        return (f"<html><head>{title}</head><body>"
+                f"<a class=\"button_primary pdf-button\" href=\"{base}/doi/pdf/{doi}\">PDF</a>"
+                f"<a href=\"{base}/doi/suppl/{doi}/suppl_file/{doi.split('/')[-1]}_si_001.pdf\">SI</a>"
+                f"<a href=\"{base}/doi/suppl/{doi}/suppl_file/{doi.split('/')[-1]}_si_002.zip\">SI data</a>"
+                f"</body></html>")
+    if publisher == "wiley":
+        return (f"<html><head>{title}</head><body>"
+                f"<a href=\"{base}/doi/epdf/{doi}\">ePDF</a>"
+                f"<a href=\"{base}/action/downloadSupplement?doi={quote(doi)}&file=adma-sup-0001-SuppMat.pdf\">Supporting Information</a>"
+                f"</body></html>")
+    if publisher == "springer":
+        return (f"<html><head>{title}"
+                f"<meta name=\"citation_pdf_url\" content=\"{base}/content/pdf/{doi}.pdf\">"
+                f"</head><body><a href=\"{base}/content/pdf/{doi}.pdf\">Download PDF</a>"
+                f"<a href=\"{base}/esm/art%3A{quote(doi, safe='')}/MediaObjects/12345_2024_1_MOESM1_ESM.pdf\">ESM 1</a>"
+                f"</body></html>")
+    if publisher == "sciencedirect":
+        pii = pii_for(doi)
+        md5 = hashlib.md5(("md5" + doi).encode()).hexdigest()
+        return (f"<html><head>{title}</head><body><script type=\"application/json\">"
+                f"{{\"article\":{{\"pdfDownload\":{{\"urlMetadata\":{{\"queryParams\":"
+                f"{{\"md5\":\"{md5}\",\"pid\":\"1-s2.0-{pii}-main.pdf\"}},\"pii\":\"{pii}\"}}}},"
+                f"\"eid\":\"1-s2.0-{pii}\"}}}}</script></body></html>")
+    if publisher == "rsc":
+        article = doi.split('/')[-1].lower()
+        return (f"<html><head>{title}</head><body>"
+                f"<a href=\"{base}/en/content/articlepdf/2024/xx/{article}\">Download this article</a>"
+                f"<a href=\"{base}/suppdata/xx/{article}/{article}1.pdf\">Supplementary information</a>"
+                f"</body></html>")
+    raise KeyError(publisher)
+
+
+class StandinHandler(BaseHTTPRequestHandler):
+    """按Host(回环地址)分派到各出版商"""
+    protocol_version = "HTTP/1.1"
+    server_version = "StandinPublisher/1.0"
+
+    def log_message(self, format, *args):
+        pass
+
+    @property
+    def state(self) -> StandinState:
+        return self.server.state
+
+    def _publisher(self):
+        host = self.server.server_address[0]
+        if host == DOI_HOST:
+            return "doi"
+        for name, info in PUBLISHERS.items():
+            if info["host"] == host:
+                return name
+        return None
+
+    def _send(self, status, body=b"", content_type="text/html; charset=utf-8", headers=None, declared_length=None):
+        self.send_response(status)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(declared_length if declared_length is not None else len(body)))
+        for key, value in (headers or {}).items():
+            self.send_header(key, value)
+        self.end_headers()
+        if self.command != "HEAD":
+            try:
+                self.wfile.write(body)
+            except (BrokenPipeError, ConnectionResetError):
+                pass
+        if declared_length is not None:
+            self.close_connection = True
+
+    def do_HEAD(self):
+        self.do_GET()
+
+    def do_GET(self):
+        publisher = self._publisher()
+        path = unquote(urlparse(self.path).path)
+        query = parse_qs(urlparse(self.path).query)
+        self.state.count(f"{publisher}:{'doc' if self._is_document(publisher, path) else 'page'}")
+
+        if publisher == "doi":
+            return self._redirect_doi(path.lstrip('/'))
+        if publisher is None:
+            return self._send(404, b"unknown host")
+
+        if self._is_document(publisher, path):
+            return self._serve_document(publisher, path, query)
+
+        time.sleep(self.state.latency)
+        doi = self._landing_doi(publisher, path)
+        if not doi:
+            return self._send(404, b"<html><body>Not found</body></html>")
+        self._send(200, landing_page(self.state, publisher, doi).encode("utf-8"))
+
+    def _redirect_doi(self, doi):
+        for name, info in PUBLISHERS.items():
+            if doi.startswith(info["prefix"] + "/"):
+                if name == "sciencedirect":
+                    target = f"{self.state.base(name)}/science/article/pii/{pii_for(doi)}?doi={quote(doi)}"
+                elif name == "rsc":
+                    target = f"{self.state.base(name)}/en/content/articlelanding/2024/xx/{doi.split('/')[-1]}?doi={quote(doi)}"
+                else:
+                    target = f"{self.state.base(name)}/doi/{doi}"
+                return self._send(302, b"", headers={"Location": target})
+        self._send(404, b"DOI not found")
+
+    def _landing_doi(self, publisher, path):
+        if publisher in ("sciencedirect", "rsc"):
+            doi = parse_qs(urlparse(self.path).query).get("doi", [None])[0]
+            return doi
+        match = re.match(r"^/doi/(?:abs/|full/)?(10\..+)$", path)
+        return match.group(1) if match else None
+
+    @staticmethod
+    def _is_document(publisher, path):
+        return bool(re.search(r"(/doi/pdf/|/doi/epdf/|/content/pdf/|/pdfft|/articlepdf/|/suppl_file/|"
+                              r"/downloadSupplement|_ESM\.|/suppdata/)", path))
+
+    def _serve_document(self, publisher, path, query):
+        failure = self.state.pick_failure()
+        time.sleep(self.state.pdf_latency)
+        if failure == "slow":
+            time.sleep(self.state.slow_seconds)
+        if failure == "error":
+            return self._send(503, b"<html><body>Service unavailable</body></html>")
+        if failure == "html":
+            return self._send(200, LOGIN_WALL)
+
+        segments = path.rstrip('/').split('/')
+        # ScienceDirect的pdfft地址以PII区分文章
+        filename = query.get("file", [segments[-2] if segments[-1] == "pdfft" else segments[-1]])[0]
+        if filename.endswith(".zip"):
+            body, content_type = b"PK\x05\x06" + b"\x00" * 18, "application/zip"
+        else:
+            body, content_type = self.state.pdf_bytes(path), "application/pdf"
+            if not filename.lower().endswith(".pdf"):
+                filename += ".pdf"
+        headers = {"Content-Disposition": f"attachment; filename=\"{filename}\""}
+        if failure == "truncated":
+            return self._send(200, body[:len(body) // 3], content_type, headers, declared_length=len(body))
+        self._send(200, body, content_type, headers)
+
+
+class StandinCluster:
+    """在各出版商的回环地址上启动替身服务器"""
+    def __init__(self, port=8765, **state_options):
+        self.state = StandinState(port, **state_options)
+        self.servers = []
+        self.threads = []
+
+    def start(self):
+        for host in [DOI_HOST] + [info["host"] for info in PUBLISHERS.values()]:
+            server = ThreadingHTTPServer((host, self.state.port), StandinHandler)
+            server.daemon_threads = True
+            server.state = self.state
+            thread = threading.Thread(target=server.serve_forever, daemon=True)
+            thread.start()
+            self.servers.append(server)
+            self.threads.append(thread)
+        print(f"[替身服务器] 已启动 {len(self.servers)} 个出版商替身，端口 {self.state.port}")
+        return self
+
+    def stop(self):
+        for server in self.servers:
+            server.shutdown()
+            server.server_close()
+        self.servers = []
+
+    def doi_for(self, publisher, index):
+        """生成属于某出版商的DOI"""
+        prefix = PUBLISHERS[publisher]["prefix"]
+        suffixes = {
+            "acs": f"acs.bench.{index:05d}",
+            "wiley": f"adma.2024{index:05d}",
+            "springer": f"s10853-024-{index:05d}-x",
+            "sciencedirect": f"j.bench.2024.{index:06d}",
+            "rsc": f"D4XX{index:05d}A",
+        }
+        return f"{prefix}/{suffixes[publisher]}"
+
+
+def parse_fail_rates(text):
+    """解析 'slow=0.02,html=0.05' 形式的失败率"""
+    rates = {}
+    for part in filter(None, (text or "").split(",")):
+        mode, rate = part.split("=")
+        rates[mode.strip()] = float(rate)
+    return rates
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="本地出版商替身服务器")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--latency", type=float, default=0.2, help="落地页延迟(秒)")
+    parser.add_argument("--pdf-latency", type=float, default=0.5, help="PDF下载延迟(秒)")
+    parser.add_argument("--fail", default="", help="失败率，如 slow=0.02,html=0.05,error=0.02,truncated=0.01")
+    parser.add_argument("--pdf-kb", type=int, default=200)
+    args = parser.parse_args()
+    cluster = StandinCluster(args.port, latency=args.latency, pdf_latency=args.pdf_latency,
+                             fail_rates=parse_fail_rates(args.fail), pdf_kb=args.pdf_kb).start()
+    for name in PUBLISHERS:
+        print(f"  {name:<14} {cluster.state.base(name)}  例: {cluster.state.base('doi')}/{cluster.doi_for(name, 1)}")
+    try:
+        while True:
+            time.sleep(1)
+    except KeyboardInterrupt:
+        cluster.stop()
+        sys.exit(0)
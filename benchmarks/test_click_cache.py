@@ -0,0 +1,85 @@
+"""保存控件的点击位置缓存: 首次全屏查找模板，之后只在缓存框附近校验
+
+运行:
+    python -m pytest benchmarks/test_click_cache.py
+"""
+import os
+import sys
+import json
+from collections import namedtuple
+
+import pytest
+
+REPO_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, REPO_DIR)
+
+Paperdownload = pytest.importorskip("Paperdownload")
+
+Box = namedtuple("Box", "left top width height")
+Point = namedtuple("Point", "x y")
+
+
+class FakeScreen:
+    """屏幕上在固定位置显示保存控件，记录每次查找的区域"""
+
+    def __init__(self, box):
+        self.box = box
+        self.regions = []
+
+    def size(self):
+        return 1920, 1080
+
+    def locateOnScreen(self, image_path, region=None, confidence=None):
+        self.regions.append(region)
+        if self.box is None:
+            return None
+        if region:
+            left, top, width, height = region
+            if not (left <= self.box.left and self.box.left + self.box.width <= left + width
+                    and top <= self.box.top and self.box.top + self.box.height <= top + height):
+                return None
+        return self.box
+
+    def center(self, box):
+        return Point(box.left + box.width // 2, box.top + box.height // 2)
+
+
+@pytest.fixture
+def screen(monkeypatch, tmp_path):
+    screen = FakeScreen(Box(400, 300, 40, 20))
+    monkeypatch.setattr(Paperdownload, "pyautogui", screen)
+    (tmp_path / "save_control.png").write_bytes(b"")
+    return screen
+
+
+def make_manager(tmp_path):
+    cache = Paperdownload.ClickPositionCache(str(tmp_path / "ClickPositions.json"))
+    cache.load()
+    return Paperdownload.DomainClickManager(cache, str(tmp_path))
+
+
+def test_save_control_learned_and_verified(screen, tmp_path):
+    assert make_manager(tmp_path).get_click_position("pubs.acs.org") == (420, 310)
+    assert screen.regions == [None]  # 首次全屏查找
+    with open(tmp_path / "ClickPositions.json", encoding="utf-8-sig") as f:
+        saved = json.load(f)
+    assert saved["1920x1080"]["pubs.acs.org"]["save_control.png"]["box"] == [400, 300, 440, 320]
+
+    # 新会话: 只在缓存框附近的小区域校验
+    assert make_manager(tmp_path).get_click_position("pubs.acs.org") == (420, 310)
+    assert screen.regions[1] == (390, 290, 60, 40)
+    assert len(screen.regions) == 2
+
+
+def test_stale_position_relearned(screen, tmp_path):
+    make_manager(tmp_path).get_click_position("pubs.acs.org")
+    screen.box = Box(800, 500, 40, 20)  # 控件移动了
+    assert make_manager(tmp_path).get_click_position("pubs.acs.org") == (820, 510)
+    assert screen.regions[1:] == [(390, 290, 60, 40), None]
+
+
+def test_fallback_without_template(screen, tmp_path):
+    os.remove(tmp_path / "save_control.png")
+    assert make_manager(tmp_path).get_click_position("pubs.acs.org") == (700, 150)
+    assert make_manager(tmp_path).get_click_position("ieeexplore.ieee.org") == (960, 540)
+    assert screen.regions == []
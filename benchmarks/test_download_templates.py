@@ -0,0 +1,38 @@
+"""下载模板: DownloadTemplates.json 中的改写规则
+
+运行:
+    python -m pytest benchmarks/test_download_templates.py
+"""
+import os
+import sys
+
+import pytest
+
+REPO_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, REPO_DIR)
+
+Paperdownload = pytest.importorskip("Paperdownload")
+
+STAMP = "https://ieeexplore.ieee.org/stamp/stamp.jsp?tp=&arnumber="
+
+
+@pytest.fixture(scope="module")
+def templates():
+    manager = Paperdownload.DownloadTemplateManager(os.path.join(REPO_DIR, "DownloadTemplates.json"))
+    manager.load_templates()
+    return manager
+
+
+@pytest.mark.parametrize("doi, final_url, arnumber", [
+    ("10.1109/5.771073", "https://ieeexplore.ieee.org/document/771073", "771073"),
+    ("10.1109/TPAMI.2019.2913372", None, "2913372"),
+    # DOI后缀不带点: 从文章页URL取arnumber
+    ("10.1109/JPROC1999771073", "https://ieeexplore.ieee.org/document/771073/", "771073"),
+])
+def test_ieee_arnumber(templates, doi, final_url, arnumber):
+    assert templates.get_download_url("ieeexplore.ieee.org", doi, final_url) == STAMP + arnumber
+
+
+def test_ieee_without_arnumber(templates):
+    assert templates.get_download_url("ieeexplore.ieee.org", "10.1109/JPROC1999771073",
+                                      "https://ieeexplore.ieee.org/search/searchresult.jsp") is None
@@ -0,0 +1,231 @@
+"""链接提取热点的微基准(pytest-benchmark)
+
+语料: PAPER_HTML_CORPUS 环境变量指定的目录，默认 Paperdownload.Config.DOWNLOAD_PATH
+(已保存的 <域名>_<Key>.txt 快照)。目录不存在时按Paperkeyword.json/SIkeyword.json
+中的每个域名生成合成页面(约1.5MB，含大量class/href属性)。
+Config.SLOW_PAGE_LOG(或 PAPER_SLOW_PAGE_LOG)中记录的超预算页面会自动加入语料。
+
+运行:
+    python -m pytest benchmarks --benchmark-only
+    python -m pytest benchmarks --benchmark-only --benchmark-autosave   # 保存结果，之后用 --benchmark-compare 比较
+每个用例的 extra_info 中记录单次调用的Python内存分配峰值(peak_kb)和页面大小(page_kb)。
+"""
+import os
+import re
+import sys
+import json
+import tempfile
+import tracemalloc
+
+import pytest
+
+pytest.importorskip("pytest_benchmark")
+
+REPO_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, REPO_DIR)
+
+Paperdownload = pytest.importorskip("Paperdownload")
+try:
+    import SIdownload
+except Exception:  # 无桌面环境下导入pyautogui会失败
+    SIdownload = None
+
+PAPER_KEYWORD_JSON = os.environ.get("PAPER_KEYWORD_JSON", os.path.join(REPO_DIR, "Paperkeyword.json"))
+SI_KEYWORD_JSON = os.environ.get("SI_KEYWORD_JSON", os.path.join(REPO_DIR, "SIkeyword.json"))
+CORPUS_DIR = os.environ.get("PAPER_HTML_CORPUS", Paperdownload.Config.DOWNLOAD_PATH)
+SLOW_PAGE_LOG = os.environ.get("PAPER_SLOW_PAGE_LOG", Paperdownload.Config.SLOW_PAGE_LOG)
+MAX_FILES_PER_DOMAIN = int(os.environ.get("PAPER_BENCH_MAX_FILES", "3"))
+BENCH_DOI = "10.1000/bench.0001"
+
+
+def load_keyword_domains(path):
+    with open(path, 'r', encoding='utf-8-sig') as f:
+        return [(item["url"], item.get("keywords", [])) for item in json.load(f) if "url" in item]
+
+
+def synthetic_page(domain, keywords, filler_blocks=12000):
+    """生成一个带目标链接的大页面，填充内容模仿出版商页面的属性密度"""
+    keyword = keywords[0] if keywords else "pdf"
+    filler = "".join(
+        f'<div class="ref-item c{i}" data-ref="{i}"><span class="label">[{i}]</span>'
+        f'<a class="ref-link" title="reference {i}" href="/doi/ref/{i}">Ref {i}</a></div>\n'
+        for i in range(filler_blocks)
+    )
+    if keyword == "md5":
+        target = ('<script>{"article":{"pdfDownload":{"urlMetadata":{"queryParams":'
+                  '{"md5":"0123456789abcdef0123456789abcdef","pid":"1-s2.0-S0000000000000001-main.pdf"},'
+                  '"pii":"S0000000000000001"}}},"eid":"1-s2.0-S0000000000000001"}</script>')
+    elif keyword == "pdf":
+        target = f'<a class="pdf download-link" href="https://{domain}/article/download/1/pdf">PDF</a>'
+    elif keyword == "downloadpdf":
+        target = f'<meta name="citation_pdf_url" content="https://{domain}/downloadpdf/journals/1.pdf">'
+    elif keyword == "doi":
+        target = f'<a href="https://{domain}/{BENCH_DOI}/s1">Supplementary</a>'
+    else:
+        target = f'<a href="https://{domain}/content/{keyword.strip("/")}/article_{keyword.strip("/")}1.pdf">Download</a>'
+    half = len(filler) // 2
+    return f"<html><head><title>{domain}</title></head><body>{filler[:half]}{target}{filler[half:]}</body></html>"
+
+
+def build_corpus(tmp_root):
+    """返回 {域名: [快照路径]}"""
+    corpus = {}
+    if os.path.isdir(CORPUS_DIR):
+        for entry in sorted(os.scandir(CORPUS_DIR), key=lambda e: -e.stat().st_size):
+            if entry.is_file() and entry.name.endswith(".txt"):
+                domain = entry.name.split('_')[0]
+                files = corpus.setdefault(domain, [])
+                if len(files) < MAX_FILES_PER_DOMAIN:
+                    files.append(entry.path)
+    if corpus:
+        return corpus
+
+    os.makedirs(tmp_root, exist_ok=True)
+    for path in (PAPER_KEYWORD_JSON, SI_KEYWORD_JSON):
+        for domain, keywords in load_keyword_domains(path):
+            if domain in corpus:
+                continue
+            page_path = os.path.join(tmp_root, f"{domain}_synthetic.txt")
+            with open(page_path, 'w', encoding='utf-8') as f:
+                f.write(synthetic_page(domain, keywords))
+            corpus[domain] = [page_path]
+    return corpus
+
+
+def load_slow_pages():
+    """提取审计记录的超预算页面 {域名: [路径]}"""
+    slow = {}
+    if not os.path.exists(SLOW_PAGE_LOG):
+        return slow
+    with open(SLOW_PAGE_LOG, 'r', encoding='utf-8') as f:
+        for line in f:
+            record = json.loads(line)
+            page = record.get("page")
+            if page and os.path.exists(page):
+                pages = slow.setdefault(f"slow:{record.get('domain')}", [])
+                if page not in pages:
+                    pages.append(page)
+    return slow
+
+
+CORPUS = build_corpus(os.path.join(tempfile.gettempdir(), "paper_bench_corpus"))
+CORPUS.update(load_slow_pages())
+
+
+def corpus_cases(domains):
+    cases = []
+    for domain in domains:
+        for path in CORPUS.get(domain, []):
+            cases.append(pytest.param(domain, path, id=f"{domain}:{os.path.basename(path)}"))
+    return cases
+
+
+PAPER_CASES = corpus_cases(sorted({d for d, _ in load_keyword_domains(PAPER_KEYWORD_JSON)}))
+SI_CASES = corpus_cases(sorted({d for d, _ in load_keyword_domains(SI_KEYWORD_JSON)}))
+PAGE_CASES = corpus_cases(sorted(CORPUS))
+
+
+def read_page(path):
+    with open(path, 'r', encoding='utf-8') as f:
+        return f.read()
+
+
+def record_memory(benchmark, func, *args):
+    """单独执行一次，记录Python内存分配峰值"""
+    tracemalloc.start()
+    try:
+        func(*args)
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    benchmark.extra_info["peak_kb"] = round(peak / 1024, 1)
+
+
+@pytest.fixture(scope="module")
+def paper_extractor():
+    return Paperdownload.PaperExtractor(PAPER_KEYWORD_JSON)
+
+
+@pytest.fixture(scope="module")
+def si_processor():
+    if SIdownload is None:
+        pytest.skip("SIdownload无法导入")
+    SIdownload.CONFIG["JSON_PATH"] = SI_KEYWORD_JSON
+    processor = SIdownload.PaperProcessor.__new__(SIdownload.PaperProcessor)  # 跳过构造中的屏幕/目录初始化
+    processor.csv_rows = []
+    processor.csv_fieldnames = []
+    processor.last_extract_by_eid = False
+    processor._last_is_full_supp = False
+    return processor
+
+
+# ---- 端到端: 各域名的完整提取流程 ----
+
+@pytest.mark.parametrize("domain,path", PAPER_CASES)
+def test_paper_extract_url(benchmark, paper_extractor, domain, path):
+    benchmark.group = "paper:extract_paper_url"
+    benchmark.extra_info["page_kb"] = round(os.path.getsize(path) / 1024, 1)
+    record_memory(benchmark, paper_extractor.extract_paper_url, path, BENCH_DOI)
+    benchmark(paper_extractor.extract_paper_url, path, BENCH_DOI)
+
+
+@pytest.mark.parametrize("domain,path", SI_CASES)
+def test_si_extract_urls(benchmark, si_processor, domain, path):
+    benchmark.group = "si:extract_si_urls"
+    benchmark.extra_info["page_kb"] = round(os.path.getsize(path) / 1024, 1)
+    record_memory(benchmark, si_processor.extract_si_urls, path, BENCH_DOI, domain)
+    benchmark(si_processor.extract_si_urls, path, BENCH_DOI, domain)
+
+
+# ---- 单个提取策略: 在所有页面上运行，暴露最坏情况 ----
+
+@pytest.mark.parametrize("domain,path", PAGE_CASES)
+def test_strategy_pdf_class_href(benchmark, paper_extractor, domain, path):
+    content = read_page(path)
+    benchmark.group = "strategy:pdf(class+href)"
+    benchmark.extra_info["page_kb"] = round(len(content) / 1024, 1)
+    record_memory(benchmark, paper_extractor._special_extraction_for_pdf_keyword, content, ["pdf"])
+    benchmark(paper_extractor._special_extraction_for_pdf_keyword, content, ["pdf"])
+
+
+@pytest.mark.parametrize("domain,path", PAGE_CASES)
+def test_strategy_md5(benchmark, paper_extractor, domain, path):
+    content = read_page(path)
+    benchmark.group = "strategy:md5+pid"
+    benchmark.extra_info["page_kb"] = round(len(content) / 1024, 1)
+    record_memory(benchmark, paper_extractor._special_extraction_for_md5_keyword, content, ["md5"])
+    benchmark(paper_extractor._special_extraction_for_md5_keyword, content, ["md5"])
+
+
+@pytest.mark.parametrize("domain,path", PAGE_CASES)
+def test_strategy_href_findall(benchmark, domain, path):
+    content = read_page(path)
+    pattern = re.compile(r'href=[\'"]?([^\'" >]+)')
+    benchmark.group = "strategy:href findall"
+    benchmark.extra_info["page_kb"] = round(len(content) / 1024, 1)
+    record_memory(benchmark, pattern.findall, content)
+    benchmark(pattern.findall, content)
+
+
+@pytest.mark.parametrize("domain,path", PAGE_CASES)
+def test_strategy_content_findall(benchmark, domain, path):
+    content = read_page(path)
+    pattern = re.compile(r'content=[\'"]?([^\'" >]+)')
+    benchmark.group = "strategy:content= findall(downloadpdf)"
+    benchmark.extra_info["page_kb"] = round(len(content) / 1024, 1)
+    record_memory(benchmark, pattern.findall, content)
+    benchmark(pattern.findall, content)
+
+
+@pytest.mark.parametrize("domain,path", PAGE_CASES)
+def test_strategy_head_meta(benchmark, paper_extractor, domain, path):
+    """快速路径只读取页面头部，耗时应与页面大小无关"""
+    def head_meta():
+        with open(path, 'r', encoding='utf-8') as f:
+            chunks = iter(lambda: f.read(paper_extractor.HEAD_CHUNK_SIZE), "")
+            return paper_extractor._meta_pdf_url(chunks, domain, ["pdf"])
+
+    benchmark.group = "strategy:head meta(citation_pdf_url)"
+    benchmark.extra_info["page_kb"] = round(os.path.getsize(path) / 1024, 1)
+    record_memory(benchmark, head_meta)
+    benchmark(head_meta)
@@ -0,0 +1,54 @@
+"""论文链接提取: ScienceDirect内嵌状态中的md5/pid下载参数
+
+运行:
+    python -m pytest benchmarks/test_paper_extraction.py
+"""
+import os
+import sys
+import json
+
+import pytest
+
+REPO_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, REPO_DIR)
+
+Paperdownload = pytest.importorskip("Paperdownload")
+
+PII = "S0142961224001234"
+
+
+def pdf_download(md5, pid):
+    return {"isPdfFullText": False, "path": "science/article/pii", "pdfExtension": "/pdfft",
+            "urlMetadata": {"queryParams": {"md5": md5, "pid": pid}, "pii": PII}}
+
+
+def sciencedirect_page(downloads):
+    """按ScienceDirect页面的结构生成内嵌状态: 附件和正文各有一组下载参数"""
+    state = {
+        "article": {
+            "pii": PII,
+            "eid": f"1-s2.0-{PII}",
+            "title": {"content": [{"#name": "title", "_": "Stand-in article"}]},
+            "attachments": [{"pdfDownload": downloads[0]}],
+            "pdfDownload": downloads[1],
+        },
+        "authors": {"content": [{"#name": "author-group"}]},
+    }
+    return ('<html><head><title>Stand-in article - ScienceDirect</title></head><body>'
+            f'<script type="application/json" data-iso-key="_0">{json.dumps(state)}</script>'
+            '</body></html>')
+
+
+@pytest.fixture(scope="module")
+def extractor():
+    return Paperdownload.PaperExtractor(os.path.join(REPO_DIR, "Paperkeyword.json"))
+
+
+@pytest.mark.parametrize("main_first", [True, False])
+def test_md5_prefers_main_pdf(extractor, main_first):
+    downloads = [pdf_download("0" * 32, f"1-s2.0-{PII}-mmc1.pdf"),
+                 pdf_download("a" * 32, f"1-s2.0-{PII}-main.pdf")]
+    page = sciencedirect_page(downloads[::-1] if main_first else downloads)
+    url = extractor._special_extraction_for_md5_keyword(page, ["md5"])
+    assert url == (f"https://www.sciencedirect.com/science/article/pii/{PII}/pdfft"
+                   f"?md5={'a' * 32}&pid=1-s2.0-{PII}-main.pdf")
@@ -0,0 +1,81 @@
+"""默认配置下两个阶段的衔接: 论文阶段保存的HTML快照要能让SI阶段处理每一篇论文
+
+运行:
+    python -m pytest benchmarks/test_pipeline_defaults.py
+"""
+import os
+import sys
+import csv
+import socket
+
+import pytest
+
+REPO_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, REPO_DIR)
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+Paperdownload = pytest.importorskip("Paperdownload")
+import bench_pipeline
+from standin_server import StandinCluster
+
+
+def free_port():
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def read_rows(csv_path):
+    with open(csv_path, 'r', encoding='utf-8-sig') as f:
+        return list(csv.DictReader(f))
+
+
+@pytest.fixture
+def workspace(tmp_path):
+    cluster = StandinCluster(free_port(), latency=0, pdf_latency=0).start()
+    saved = dict(vars(Paperdownload.Config))
+    try:
+        paths, _ = bench_pipeline.build_workspace(str(tmp_path), cluster, 1)
+        yield cluster, paths
+    finally:
+        for name, value in saved.items():
+            if not name.startswith('__'):
+                setattr(Paperdownload.Config, name, value)
+        cluster.stop()
+
+
+def test_default_config_keeps_snapshots_for_si_stage(workspace):
+    cluster, paths = workspace
+    bench_pipeline.configure_paperdownload(paths, cluster, 1, 10)
+    processor = Paperdownload.PaperProcessor()
+    try:
+        processor.run()
+    finally:
+        processor.close()
+
+    rows = read_rows(paths["csv"])
+    direct_rows = [row for row in rows if row["DOI"] == cluster.doi_for("acs", 1)]
+    assert direct_rows and direct_rows[0]["DownloadStatus"] == "Success"  # 模板分支(direct=1)
+    for row in rows:
+        if row["DownloadStatus"] == "Success":
+            assert row.get("HTMLFile") and os.path.exists(row["HTMLFile"]), row["DOI"]
+
+    try:
+        import SIdownload
+    except Exception:  # 无桌面环境下导入pyautogui会失败
+        pytest.skip("SIdownload无法导入")
+    assert not SIdownload.CONFIG["SI_CAPTURE_HTML"]  # 默认不在SI阶段补抓快照
+    saved = dict(SIdownload.CONFIG)
+    try:
+        bench_pipeline.configure_sidownload(paths, 10)
+        si_processor = SIdownload.PaperProcessor()
+        papers = si_processor.get_csv_papers()
+        for index, paper in enumerate(papers, 1):
+            si_processor.process_paper(paper, index, len(papers))
+        if si_processor.si_fetcher:
+            si_processor.si_fetcher.close()
+    finally:
+        SIdownload.CONFIG.clear()
+        SIdownload.CONFIG.update(saved)
+    statuses = {row["DOI"]: row.get("SIDownloadStatus", "") for row in read_rows(paths["csv"])}
+    assert statuses[cluster.doi_for("acs", 1)], "direct=1的论文在SI阶段被跳过"
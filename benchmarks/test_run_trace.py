@@ -0,0 +1,29 @@
+"""run_trace.percentile 的最近秩百分位数
+
+运行:
+    python -m pytest benchmarks/test_run_trace.py
+"""
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from run_trace import percentile
+
+
+@pytest.mark.parametrize("values, p, expected", [
+    ([], 50, 0.0),
+    ([7], 95, 7),
+    ([1, 2], 50, 1),
+    ([1, 2, 3], 50, 2),
+    ([1, 2, 3, 4], 50, 2),
+    (list(range(1, 21)), 95, 19),
+    (list(range(1, 21)), 100, 20),
+    (list(range(1, 21)), 0, 1),
+    (list(range(1, 101)), 95, 95),
+    ([5, 1, 4, 2, 3], 50, 3),
+])
+def test_percentile_nearest_rank(values, p, expected):
+    assert percentile(values, p) == expected
@@ -0,0 +1,92 @@
+"""SessionProbe 对本地替身服务器和合成Cookie数据库的检查
+
+运行:
+    python -m pytest benchmarks/test_session_probe.py
+"""
+import os
+import sys
+import time
+import socket
+import sqlite3
+
+import pytest
+
+REPO_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, REPO_DIR)
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+Paperdownload = pytest.importorskip("Paperdownload")
+from standin_server import StandinCluster
+
+SessionProbe = Paperdownload.SessionProbe
+
+
+def free_port():
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+@pytest.fixture
+def cluster(request):
+    cluster = StandinCluster(free_port(), latency=0, pdf_latency=0, fail_rates=getattr(request, "param", None))
+    cluster.start()
+    yield cluster
+    cluster.stop()
+
+
+def head_probe(cluster):
+    return {"type": "head", "url": f"{cluster.state.base('acs')}/doi/pdf/{{doi}}",
+            "expect_status": 200, "expect_content_type": "pdf"}
+
+
+def test_head_probe_entitled(cluster, tmp_path):
+    probe = SessionProbe(str(tmp_path))
+    assert probe.is_logged_in("pubs.acs.org", head_probe(cluster), cluster.doi_for("acs", 1))
+
+
+@pytest.mark.parametrize("cluster", [{"html": 1.0}], indirect=True)
+def test_head_probe_login_wall(cluster, tmp_path):
+    probe = SessionProbe(str(tmp_path))
+    assert not probe.is_logged_in("pubs.acs.org", head_probe(cluster), cluster.doi_for("acs", 1))
+
+
+def test_head_probe_needs_doi(cluster, tmp_path):
+    assert not SessionProbe(str(tmp_path)).is_logged_in("pubs.acs.org", head_probe(cluster))
+
+
+def write_cookies(profile, rows):
+    db_path = os.path.join(profile, "Cookies")
+    conn = sqlite3.connect(db_path)
+    conn.execute("CREATE TABLE cookies (host_key TEXT, name TEXT, expires_utc INTEGER)")
+    conn.executemany("INSERT INTO cookies VALUES (?, ?, ?)", rows)
+    conn.commit()
+    conn.close()
+
+
+def chrome_time(offset):
+    return int((time.time() + offset + SessionProbe.CHROME_EPOCH_OFFSET) * 1_000_000)
+
+
+def test_cookie_probe(tmp_path):
+    write_cookies(str(tmp_path), [
+        (".acs.org", "session", 0),  # 会话Cookie
+        ("pubs.acs.org", "persistent", chrome_time(3600)),
+        ("pubs.acs.org", "expired", chrome_time(-3600)),
+        ("xyzacs.org", "other", chrome_time(3600)),
+    ])
+    probe = SessionProbe(str(tmp_path))
+    cookie = {"type": "cookie", "host": "acs.org"}
+    assert probe._probe_cookie(dict(cookie, names=["session", "persistent"]))
+    assert not probe._probe_cookie(dict(cookie, names=["expired"]))
+    assert not probe._probe_cookie(dict(cookie, names=["other"]))
+
+
+def test_probe_list_and_cache(cluster, tmp_path):
+    write_cookies(str(tmp_path), [])
+    probe = SessionProbe(str(tmp_path), ttl=60)
+    probes = [{"type": "cookie", "host": "acs.org", "names": ["session"]}, head_probe(cluster)]
+    assert probe.is_logged_in("pubs.acs.org", probes, cluster.doi_for("acs", 1))
+    # 遇到登录墙后记为未登录，TTL内不再相信之前的探测结果
+    probe.mark("pubs.acs.org", False)
+    assert not probe.is_logged_in("pubs.acs.org", probes, cluster.doi_for("acs", 1))
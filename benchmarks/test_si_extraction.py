@@ -0,0 +1,116 @@
+"""SI链接提取: eid和full#supplementary-material模式要返回全部附件
+
+运行:
+    python -m pytest benchmarks/test_si_extraction.py
+"""
+import os
+import sys
+import json
+import socket
+
+import pytest
+
+REPO_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, REPO_DIR)
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from standin_server import StandinCluster
+
+try:
+    import SIdownload
+except Exception:  # 无桌面环境下导入pyautogui会失败
+    SIdownload = None
+
+DOI = "10.1016/j.example.2024.01.001"
+EID = "1-s2.0-S0000000000000001"
+
+
+@pytest.fixture
+def si_processor(tmp_path, monkeypatch):
+    if SIdownload is None:
+        pytest.skip("SIdownload无法导入")
+    keywords = tmp_path / "SIkeyword.json"
+    keywords.write_text(json.dumps([
+        {"url": "www.sciencedirect.com", "download": "1", "keywords": ["eid"]},
+        {"url": "www.frontiersin.org", "download": "0", "keywords": ["full#supplementary-material"]},
+    ]), encoding="utf-8")
+    monkeypatch.setitem(SIdownload.CONFIG, "JSON_PATH", str(keywords))
+    processor = SIdownload.PaperProcessor.__new__(SIdownload.PaperProcessor)  # 跳过构造中的屏幕/目录初始化
+    processor.csv_rows = []
+    processor.csv_fieldnames = []
+    processor.last_extract_by_eid = False
+    processor._last_is_full_supp = False
+    processor.update_csv_column = lambda *args: None
+    return processor
+
+
+def write_page(tmp_path, html):
+    path = tmp_path / "page.txt"
+    path.write_text(html, encoding="utf-8")
+    return str(path)
+
+
+def test_eid_without_attachment_list(si_processor, tmp_path):
+    page = write_page(tmp_path, (
+        f'<script>var x = {{"eid":"{EID}"}};</script>'
+        f'<a href="https://ars.els-cdn.com/content/image/{EID}-mmc1.pdf">S1</a>'
+        f'<a href="https://ars.els-cdn.com/content/image/{EID}-mmc2.docx">S2</a>'
+        f'<img src="https://ars.els-cdn.com/content/image/{EID}-gr1.jpg">'
+        f'<a href="https://ars.els-cdn.com/content/image/{EID}-mmc1.pdf">S1 again</a>'
+    ))
+    urls = si_processor.extract_si_urls(page, DOI, "sciencedirect.com")
+    assert urls == [f"https://ars.els-cdn.com/content/image/{EID}-mmc1.pdf",
+                    f"https://ars.els-cdn.com/content/image/{EID}-mmc2.docx"]
+
+
+def test_eid_guess_when_page_lists_nothing(si_processor, tmp_path):
+    page = write_page(tmp_path, f'<script>var x = {{"eid":"{EID}"}};</script>')
+    urls = si_processor.extract_si_urls(page, DOI, "sciencedirect.com")
+    assert urls == [f"https://ars.els-cdn.com/content/image/{EID}-mmc1.pdf"]
+
+
+def test_full_supp_returns_every_file(si_processor, tmp_path):
+    base = "https://www.frontiersin.org/api/v4/articles/1234567/file"
+    page = write_page(tmp_path, (
+        '<a href="/articles/10.3389/fbioe.2024.1234567/full#supplementary-material">SI</a>'
+        '<a href="/articles/10.3389/fbioe.2024.1234567/pdf">PDF</a>'
+        f'<a href="{base}/Data_Sheet_1.pdf/1234567/1">Data Sheet 1</a>'
+        f'<a href="{base}/Table_1.docx/1234567/1">Table 1</a>'
+    ))
+    urls = si_processor.extract_si_urls(page, DOI, "frontiersin.org")
+    assert urls == [f"{base}/Data_Sheet_1.pdf/1234567/1", f"{base}/Table_1.docx/1234567/1"]
+    assert not si_processor._last_is_full_supp  # 文件链接走并行下载
+
+
+def test_full_supp_falls_back_to_section_page(si_processor, tmp_path):
+    page = write_page(tmp_path, '<a href="/articles/10.3389/x/full#supplementary-material">SI</a>')
+    urls = si_processor.extract_si_urls(page, DOI, "frontiersin.org")
+    assert urls == ["https://frontiersin.org/articles/10.3389/x/full#supplementary-material"]
+    assert si_processor._last_is_full_supp
+
+
+def test_parallel_fetcher_uses_library_filenames(tmp_path):
+    if SIdownload is None or SIdownload.requests is None:
+        pytest.skip("SIdownload或requests不可用")
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        port = sock.getsockname()[1]
+    cluster = StandinCluster(port, latency=0, pdf_latency=0).start()
+    try:
+        doi = cluster.doi_for("acs", 1)
+        base, suffix = cluster.state.base("acs"), doi.split('/')[-1]
+        urls = [f"{base}/doi/suppl/{doi}/suppl_file/{suffix}_si_001.pdf",
+                f"{base}/doi/suppl/{doi}/suppl_file/{suffix}_si_002.zip"]
+        layout = SIdownload.LibraryLayout(str(tmp_path), "prefix")
+        fetcher = SIdownload.SIParallelFetcher(str(tmp_path), layout=layout)
+        try:
+            filenames, failed_urls = fetcher.fetch_all(doi, urls)
+        finally:
+            fetcher.close()
+    finally:
+        cluster.stop()
+    assert not failed_urls
+    for index, filename in enumerate(filenames, 1):
+        ext = os.path.splitext(filename)[1]
+        assert filename == layout.relative_path(doi, SIdownload.doi_filename(doi, ext, f"_SI{index}"))
+        assert os.path.exists(layout.path(doi, os.path.basename(filename)))
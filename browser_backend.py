@@ -0,0 +1,472 @@
+import os
+import re
+import time
+import base64
+import threading
+import subprocess
+import urllib.request
+import urllib.error
+from abc import ABC, abstractmethod
+from queue import Queue
+from typing import Dict, Iterator, List, Optional, Set
+from urllib.parse import urlparse, unquote
+
+try:
+    import pyautogui
+    import pyperclip
+except Exception:  # Linux无桌面环境时导入会失败，只能使用无头后端
+    pyautogui = None
+    pyperclip = None
+
+try:
+    from selenium import webdriver
+    from selenium.webdriver.edge.service import Service
+    from selenium.webdriver.edge.options import Options
+    from selenium.common.exceptions import TimeoutException, WebDriverException
+except ImportError:
+    webdriver = None
+
+
+EDGE_PATH = r"C:\Program Files (x86)\Microsoft\Edge\Application\msedge.exe"
+PARTIAL_DOWNLOAD_SUFFIXES = (".crdownload", ".part", ".tmp")
+SOURCE_CHUNK_SIZE = 1 << 20  # 页面源码分块写入的大小(字符)
+# 登录/机构认证页面: 只匹配URL中完整的路径段或主机名段，不匹配 dissolution、/authors/ 等
+LOGIN_URL_PATTERN = re.compile(
+    r'(?:^|[/.?&=_-])(?:login|showlogin|signin|sign-in|sso|ssostart|shibboleth|wayf|idp|auth)(?:[/.?&=_-]|$)', re.I)
+LOGIN_TITLE_PATTERN = re.compile(r'sign\s*in|log\s*in|login|access denied', re.I)
+
+# 在页面内把doctype+outerHTML序列化到window变量，返回长度(UTF-16码元)
+SERIALIZE_SOURCE_SCRIPT = """
+var d = document;
+window.__snapshotSource = (d.doctype ? new XMLSerializer().serializeToString(d.doctype) + "\\n" : "")
+    + d.documentElement.outerHTML;
+return window.__snapshotSource.length;
+"""
+# 读取[start, start+size)一块，不拆开代理对；返回[块, 下一块起点]
+READ_SOURCE_CHUNK_SCRIPT = """
+var s = window.__snapshotSource, start = arguments[0], end = Math.min(s.length, start + arguments[1]);
+var code = s.charCodeAt(end - 1);
+if (end < s.length && end - 1 > start && code >= 0xD800 && code <= 0xDBFF) { end -= 1; }
+return [s.substring(start, end), end];
+"""
+# 页面没有可打印的内容: 没有body、文档本身是PDF(查看器外壳)、内嵌PDF查看器，或body中没有文字
+BLANK_PAGE_SCRIPT = """
+var b = document.body;
+if (!b || document.contentType === "application/pdf") { return true; }
+if (b.querySelector('embed[type="application/pdf"], embed[type="application/x-google-chrome-pdf"]')) { return true; }
+return !(b.innerText || "").trim();
+"""
+
+
+class BrowserBackend(ABC):
+    """浏览器后端接口：导航、获取URL/源码、打印PDF、等待下载和截图"""
+    name = "base"
+    headless = False           # 是否不占用桌面
+    uses_desktop_browser = False  # 是否由系统中的桌面Edge打开页面(另开msedge进程，结束后关闭全部msedge进程)
+    supports_print_to_pdf = False
+
+    @abstractmethod
+    def navigate(self, url: str) -> bool:
+        """打开URL并等待页面加载"""
+
+    @abstractmethod
+    def get_current_url(self) -> Optional[str]:
+        """获取当前页面URL"""
+
+    @abstractmethod
+    def get_page_source(self) -> Optional[str]:
+        """获取当前页面HTML源码"""
+
+    def iter_page_source(self, chunk_size: int = SOURCE_CHUNK_SIZE) -> Iterator[str]:
+        """按块返回当前页面源码，便于直接写入快照文件
+        
+        默认实现只是把get_page_source()得到的完整字符串切块，整页仍在内存中；能在浏览器侧分块读取的后端应覆盖此方法"""
+        html = self.get_page_source()
+        if not html:
+            return
+        for start in range(0, len(html), chunk_size):
+            yield html[start:start + chunk_size]
+
+    def get_head_source(self) -> Optional[str]:
+        """只获取当前页面<head>部分的源码，不能低成本获取时(如需要复制整个源码)返回None"""
+        return None
+
+    def print_to_pdf(self, output_path: str) -> bool:
+        """将当前页面打印为PDF，不支持时返回False"""
+        return False
+
+    def is_login_page(self) -> bool:
+        """当前页面是否为登录/付费墙页面(按URL路径段和页面标题判断)"""
+        parsed = urlparse(self.get_current_url() or "")
+        if LOGIN_URL_PATTERN.search(parsed.netloc + parsed.path):
+            return True
+        title = re.search(r'<title[^>]*>([^<]*)', self.get_head_source() or "", re.I)
+        return bool(title and LOGIN_TITLE_PATTERN.search(title.group(1)))
+
+    def is_blank_page(self) -> bool:
+        """当前页面是否没有可打印的内容(空白页或PDF查看器外壳)，不能判断时返回False"""
+        return False
+
+    @abstractmethod
+    def screenshot(self, output_path: str) -> bool:
+        """保存当前页面截图"""
+
+    def close_page(self):
+        """关闭当前页面"""
+        pass
+
+    def set_download_folder(self, folder: str) -> bool:
+        """修改下载目录，后端不支持时返回False(桌面浏览器使用用户设置的下载目录)"""
+        return False
+
+    def quit(self):
+        """释放浏览器资源"""
+        pass
+
+    def wait_for_download(self, folder: str, initial_files: Set[str], timeout: float,
+                          extensions: Optional[List[str]] = None, poll_interval: float = 1.0) -> Optional[str]:
+        """轮询下载目录直到出现新的完整文件或超时，返回文件名"""
+        deadline = time.time() + timeout
+        while True:
+            new_files = set(os.listdir(folder)) - initial_files
+            for filename in sorted(new_files):
+                if filename.lower().endswith(PARTIAL_DOWNLOAD_SUFFIXES):
+                    continue
+                ext = filename.split('.')[-1].lower()
+                if extensions is None or ext in extensions:
+                    return filename
+            if time.time() >= deadline:
+                return None
+            time.sleep(poll_interval)
+
+
+class PyAutoGUIBackend(BrowserBackend):
+    """桌面Edge + 键盘鼠标模拟的后端(原有方案)"""
+    name = "pyautogui"
+    uses_desktop_browser = True
+
+    def __init__(self, page_load_timeout: int = 40, edge_path: str = EDGE_PATH):
+        self.page_load_timeout = page_load_timeout
+        self.edge_path = edge_path
+
+    def navigate(self, url: str) -> bool:
+        try:
+            print("[PyAutoGUI] 启动Edge浏览器...")
+            subprocess.Popen([self.edge_path, url], stdout=subprocess.PIPE, stderr=subprocess.PIPE)
+            print(f"[PyAutoGUI] 等待页面加载({self.page_load_timeout}秒)...")
+            time.sleep(self.page_load_timeout)
+            return True
+        except Exception as e:
+            print(f"[PyAutoGUI错误] 浏览器操作失败: {str(e)}")
+            return False
+
+    def get_current_url(self) -> Optional[str]:
+        try:
+            print("[PyAutoGUI] 获取当前URL...")
+            pyautogui.hotkey('alt', 'd')
+            time.sleep(1)
+            pyautogui.hotkey('ctrl', 'a')
+            time.sleep(1)
+            pyautogui.hotkey('ctrl', 'c')
+            time.sleep(2)
+            return pyperclip.paste().strip()
+        except Exception as e:
+            print(f"[PyAutoGUI错误] 获取URL失败: {str(e)}")
+            return None
+
+    def get_page_source(self) -> Optional[str]:
+        try:
+            print("[PyAutoGUI] 获取页面源代码...")
+            pyautogui.hotkey('ctrl', 'u')
+            time.sleep(10)
+            pyautogui.hotkey('ctrl', 'a')
+            time.sleep(1)
+            pyautogui.hotkey('ctrl', 'c')
+            time.sleep(3)
+            return pyperclip.paste()
+        except Exception as e:
+            print(f"[PyAutoGUI错误] 获取源码失败: {str(e)}")
+            return None
+
+    def screenshot(self, output_path: str) -> bool:
+        try:
+            pyautogui.screenshot(output_path)
+            return True
+        except Exception as e:
+            print(f"[PyAutoGUI错误] 截图失败: {str(e)}")
+            return False
+
+    def close_page(self):
+        try:
+            print("[PyAutoGUI] 关闭标签页...")
+            pyautogui.hotkey('ctrl', 'w')
+            time.sleep(2)
+        except Exception as e:
+            print(f"[PyAutoGUI警告] 关闭标签页失败: {str(e)}")
+
+
+class SeleniumBackend(BrowserBackend):
+    """Selenium驱动的(无头)Edge后端，通过DevTools协议完成打印和下载"""
+    name = "selenium"
+    supports_print_to_pdf = True
+
+    def __init__(self, driver_path: Optional[str] = None, download_folder: Optional[str] = None,
+                 headless: bool = True, page_load_timeout: int = 40, window_size: str = "1920,1080",
+                 user_data_dir: Optional[str] = None):
+        if webdriver is None:
+            raise RuntimeError("未安装selenium，无法使用Selenium后端")
+        self.headless = headless
+        self.page_load_timeout = page_load_timeout
+        self.download_folder = download_folder
+
+        options = Options()
+        if headless:
+            options.add_argument("--headless=new")
+        options.add_argument("--disable-gpu")
+        options.add_argument(f"--window-size={window_size}")
+        if user_data_dir:
+            # 使用保存了登录Cookie的独立用户目录(不能与正在运行的桌面Edge共用同一目录)
+            options.add_argument(f"--user-data-dir={user_data_dir}")
+        if download_folder:
+            options.add_experimental_option("prefs", {
+                "download.default_directory": download_folder,
+                "download.prompt_for_download": False,
+                "plugins.always_open_pdf_externally": True,
+            })
+
+        service = Service(driver_path) if driver_path and os.path.exists(driver_path) else Service()
+        self.driver = webdriver.Edge(service=service, options=options)
+        self.driver.set_page_load_timeout(page_load_timeout)
+        if download_folder:
+            self.set_download_folder(download_folder)
+
+    def set_download_folder(self, folder: str) -> bool:
+        """修改浏览器下载目录"""
+        self.download_folder = folder
+        try:
+            self.driver.execute_cdp_cmd("Page.setDownloadBehavior", {"behavior": "allow", "downloadPath": folder})
+            return True
+        except WebDriverException as e:
+            print(f"[Selenium错误] 设置下载目录失败: {str(e)}")
+            return False
+
+    def navigate(self, url: str) -> bool:
+        try:
+            self.driver.get(url)
+            return True
+        except TimeoutException:
+            # 页面未完全加载(广告/统计脚本等)，继续使用已加载的内容
+            print(f"[Selenium] 页面加载超过{self.page_load_timeout}秒，使用当前已加载内容")
+            return True
+        except WebDriverException as e:
+            print(f"[Selenium错误] 打开URL失败: {str(e)}")
+            return False
+
+    def get_current_url(self) -> Optional[str]:
+        try:
+            return self.driver.current_url
+        except WebDriverException as e:
+            print(f"[Selenium错误] 获取URL失败: {str(e)}")
+            return None
+
+    def get_page_source(self) -> Optional[str]:
+        # 优先通过DevTools直接读取整个文档的outerHTML(含doctype)，不经过剪贴板
+        try:
+            root = self.driver.execute_cdp_cmd("DOM.getDocument", {"depth": 0})["root"]
+            return self.driver.execute_cdp_cmd("DOM.getOuterHTML", {"nodeId": root["nodeId"]})["outerHTML"]
+        except Exception as e:
+            print(f"[Selenium警告] DevTools读取源码失败，改用page_source: {str(e)}")
+        try:
+            return self.driver.page_source
+        except WebDriverException as e:
+            print(f"[Selenium错误] 获取源码失败: {str(e)}")
+            return None
+
+    def iter_page_source(self, chunk_size: int = SOURCE_CHUNK_SIZE) -> Iterator[str]:
+        """在页面内序列化一次源码，再按块取回：Python侧和每次WebDriver响应都只有一块的大小"""
+        try:
+            length = self.driver.execute_script(SERIALIZE_SOURCE_SCRIPT)
+        except WebDriverException as e:
+            print(f"[Selenium警告] 页面内序列化源码失败，改为整页读取: {str(e)}")
+            yield from super().iter_page_source(chunk_size)
+            return
+        try:
+            start = 0
+            while start < length:
+                chunk, start = self.driver.execute_script(READ_SOURCE_CHUNK_SCRIPT, start, chunk_size)
+                yield chunk
+        finally:
+            try:
+                self.driver.execute_script("delete window.__snapshotSource;")
+            except WebDriverException:
+                pass
+
+    def get_head_source(self) -> Optional[str]:
+        try:
+            return self.driver.execute_script("return document.head ? document.head.outerHTML : null")
+        except WebDriverException as e:
+            print(f"[Selenium警告] 读取页面头部失败: {str(e)}")
+            return None
+
+    def is_blank_page(self) -> bool:
+        try:
+            return bool(self.driver.execute_script(BLANK_PAGE_SCRIPT))
+        except WebDriverException as e:
+            print(f"[Selenium警告] 检查页面内容失败: {str(e)}")
+            return False
+
+    def print_to_pdf(self, output_path: str) -> bool:
+        try:
+            result = self.driver.execute_cdp_cmd("Page.printToPDF", {"printBackground": True})
+            with open(output_path, "wb") as f:
+                f.write(base64.b64decode(result["data"]))
+            return True
+        except Exception as e:
+            print(f"[Selenium错误] 打印PDF失败: {str(e)}")
+            return False
+
+    def screenshot(self, output_path: str) -> bool:
+        try:
+            return self.driver.save_screenshot(output_path)
+        except WebDriverException as e:
+            print(f"[Selenium错误] 截图失败: {str(e)}")
+            return False
+
+    def close_page(self):
+        try:
+            self.driver.get("about:blank")
+        except WebDriverException:
+            pass
+
+    def quit(self):
+        try:
+            self.driver.quit()
+        except Exception:
+            pass
+
+
+class HTTPBackend(BrowserBackend):
+    """不启动浏览器的HTTP后端：跟随跳转获取页面源码，文档类响应直接写入下载目录
+
+    只能处理静态页面，主要用于基准测试(本地出版商替身服务器)。
+    url_map 可把真实域名映射到替身地址，如 {"www.sciencedirect.com": "http://127.0.1.14:8765"}
+    """
+    name = "http"
+    headless = True
+    USER_AGENT = ("Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 "
+                  "(KHTML, like Gecko) Chrome/124.0 Safari/537.36 Edg/124.0")
+
+    def __init__(self, download_folder: Optional[str] = None, timeout: float = 40,
+                 url_map: Optional[Dict[str, str]] = None):
+        self.download_folder = download_folder
+        self.timeout = timeout
+        self.url_map = url_map or {}
+        self.current_url = None
+        self.page_source = None
+
+    def _map_url(self, url: str) -> str:
+        parsed = urlparse(url)
+        target = self.url_map.get(parsed.netloc)
+        if target:
+            return target.rstrip('/') + url[len(f"{parsed.scheme}://{parsed.netloc}"):]
+        return url
+
+    def navigate(self, url: str) -> bool:
+        self.current_url = None
+        self.page_source = None
+        request = urllib.request.Request(self._map_url(url), headers={"User-Agent": self.USER_AGENT})
+        try:
+            with urllib.request.urlopen(request, timeout=self.timeout) as response:
+                self.current_url = response.geturl()
+                content_type = response.headers.get("Content-Type", "")
+                if "html" in content_type or "text/plain" in content_type or not self.download_folder:
+                    charset = response.headers.get_content_charset() or "utf-8"
+                    self.page_source = response.read().decode(charset, "replace")
+                else:
+                    self._save_download(response)
+            return True
+        except urllib.error.HTTPError as e:
+            print(f"[HTTP错误] 打开URL失败: HTTP {e.code} {url}")
+            self.current_url = e.geturl()
+            return False
+        except Exception as e:
+            print(f"[HTTP错误] 打开URL失败: {str(e)}")
+            return False
+
+    def _save_download(self, response):
+        """像浏览器下载一样把文档写入下载目录(先写.part再改名)"""
+        disposition = response.headers.get("Content-Disposition", "")
+        filename = None
+        if "filename=" in disposition:
+            filename = disposition.split("filename=")[-1].strip().strip('"')
+        if not filename:
+            filename = unquote(urlparse(response.geturl()).path.rstrip('/').split('/')[-1]) or "download"
+        filename = os.path.basename(filename)
+        path = os.path.join(self.download_folder, filename)
+        temp_path = path + ".part"
+        expected = response.headers.get("Content-Length")
+        size = 0
+        with open(temp_path, "wb") as f:
+            while True:
+                chunk = response.read(1 << 16)
+                if not chunk:
+                    break
+                f.write(chunk)
+                size += len(chunk)
+        if expected and size < int(expected):
+            os.remove(temp_path)
+            raise IOError(f"下载不完整({size}/{expected}字节): {filename}")
+        os.replace(temp_path, path)
+        print(f"[HTTP] 已下载: {filename} ({size}字节)")
+
+    def get_current_url(self) -> Optional[str]:
+        return self.current_url
+
+    def get_page_source(self) -> Optional[str]:
+        return self.page_source
+
+    def get_head_source(self) -> Optional[str]:
+        if not self.page_source:
+            return None
+        end = self.page_source.find("</head")
+        return self.page_source[:end] if end >= 0 else None
+
+    def set_download_folder(self, folder: str) -> bool:
+        self.download_folder = folder
+        return True
+
+    def screenshot(self, output_path: str) -> bool:
+        return False
+
+    def close_page(self):
+        self.current_url = None
+        self.page_source = None
+
+
+class BrowserBackendPool:
+    """无头后端池：在一台机器上并行驱动多个页面"""
+    def __init__(self, factory, size: int):
+        self.factory = factory
+        self.size = size
+        self.backends: List[BrowserBackend] = []
+        self.available: Queue = Queue()
+        self.lock = threading.Lock()
+
+    def acquire(self) -> BrowserBackend:
+        """取出一个空闲后端，不足时按需创建"""
+        with self.lock:
+            if self.available.empty() and len(self.backends) < self.size:
+                backend = self.factory()
+                self.backends.append(backend)
+                return backend
+        return self.available.get()
+
+    def release(self, backend: BrowserBackend):
+        """归还后端"""
+        self.available.put(backend)
+
+    def close(self):
+        """关闭池中所有后端"""
+        for backend in self.backends:
+            backend.quit()
+        self.backends = []
@@ -0,0 +1,104 @@
+import time
+import threading
+from datetime import datetime
+from typing import Dict, List, Optional
+
+CLOSED = "closed"
+OPEN = "open"
+HALF_OPEN = "half_open"
+
+
+class DomainCircuitBreaker:
+    """按域名的熔断器：连续失败达到阈值后断开，冷却期内该域名的论文直接暂缓；
+    冷却结束进入半开状态，只放行一篇论文探测，成功则恢复，失败则加倍冷却时间后再次断开"""
+
+    def __init__(self, threshold: int = 3, cooldown: float = 600, max_cooldown: float = 3600):
+        self.threshold = threshold  # 连续失败多少次后断开
+        self.cooldown = cooldown  # 首次断开的冷却时间(秒)
+        self.max_cooldown = max_cooldown  # 多次探测失败后的冷却上限(秒)
+        self.domains: Dict[str, Dict] = {}
+        self.transitions: List[Dict] = []  # 状态变化记录，供运行摘要输出
+        self.lock = threading.Lock()
+
+    def _domain(self, domain: str) -> Dict:
+        return self.domains.setdefault(domain or "unknown", {
+            "state": CLOSED, "failures": 0, "opened_at": 0.0, "cooldown": self.cooldown, "probing": False,
+        })
+
+    def blocked(self, domain: str) -> bool:
+        """该域名当前是否不接受新请求(不占用半开探测名额)"""
+        with self.lock:
+            entry = self.domains.get(domain)
+            if not entry or entry["state"] == CLOSED:
+                return False
+            if entry["state"] == HALF_OPEN:
+                return entry["probing"]
+            return time.time() < entry["opened_at"] + entry["cooldown"]
+
+    def allow(self, domain: str) -> bool:
+        """请求放行；冷却结束的断开域名转为半开，并把本次请求作为探测"""
+        with self.lock:
+            entry = self._domain(domain)
+            if entry["state"] == CLOSED:
+                return True
+            if entry["state"] == OPEN:
+                if time.time() < entry["opened_at"] + entry["cooldown"]:
+                    return False
+                self._transition(domain, entry, HALF_OPEN, "冷却结束，放行一篇论文探测")
+            if entry["probing"]:
+                return False
+            entry["probing"] = True
+            return True
+
+    def retry_at(self, domain: str) -> float:
+        """暂缓的论文应在何时重新尝试"""
+        with self.lock:
+            entry = self.domains.get(domain)
+            if not entry or entry["state"] == CLOSED:
+                return time.time()
+            if entry["state"] == HALF_OPEN:
+                return time.time() + min(entry["cooldown"], 60)  # 等待探测结果
+            return entry["opened_at"] + entry["cooldown"]
+
+    def record(self, domain: str, success: bool):
+        """记录该域名一篇论文的结果"""
+        with self.lock:
+            entry = self._domain(domain)
+            entry["probing"] = False
+            if success:
+                entry["failures"] = 0
+                entry["cooldown"] = self.cooldown
+                if entry["state"] != CLOSED:
+                    self._transition(domain, entry, CLOSED, "探测成功，恢复处理")
+                return
+            entry["failures"] += 1
+            if entry["state"] == HALF_OPEN:
+                entry["cooldown"] = min(self.max_cooldown, entry["cooldown"] * 2)
+                entry["opened_at"] = time.time()
+                self._transition(domain, entry, OPEN, f"探测失败，{entry['cooldown']:.0f}秒后再次探测")
+            elif entry["state"] == CLOSED and entry["failures"] >= self.threshold:
+                entry["opened_at"] = time.time()
+                self._transition(domain, entry, OPEN,
+                                 f"连续失败{entry['failures']}次，{entry['cooldown']:.0f}秒后探测")
+
+    def _transition(self, domain: str, entry: Dict, state: str, reason: str):
+        print(f"[熔断] {domain}: {entry['state']} -> {state} ({reason})")
+        self.transitions.append({
+            "time": datetime.now().strftime("%H:%M:%S"),
+            "domain": domain,
+            "from": entry["state"],
+            "to": state,
+            "reason": reason,
+        })
+        entry["state"] = state
+
+    def print_summary(self):
+        """输出状态变化和当前未恢复的域名"""
+        if not self.transitions:
+            return
+        print(f"[熔断] 状态变化 {len(self.transitions)} 次:")
+        for record in self.transitions:
+            print(f"  {record['time']} {record['domain']}: {record['from']} -> {record['to']} ({record['reason']})")
+        not_closed = {d: e["state"] for d, e in self.domains.items() if e["state"] != CLOSED}
+        if not_closed:
+            print(f"[熔断] 未恢复的域名: {', '.join(f'{d}({s})' for d, s in not_closed.items())}")
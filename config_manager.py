@@ -25,6 +25,7 @@ class PaperAutomationConsole:
         self.json_files = {
             "paper": "Paperkeyword.json",
             "login": "LoginConfig.json",
+            "flows": "LoginFlows.json",
             "si": "SIkeyword.json",
             "settings": "DownloadSettings.json",
             "templates": "DownloadTemplates.json",
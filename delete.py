@@ -2,6 +2,10 @@ import csv
 import os
 import sys
 
+from paper_library import LibraryLayout
+
+LIBRARY_LAYOUT = "prefix"  # 与SIdownload.py中的LIBRARY_LAYOUT一致
+
 def delete_success_files(csv_path):
     """
     读取CSV文件并删除成功下载的文件
@@ -19,6 +23,7 @@ def delete_success_files(csv_path):
     if not os.path.exists(lapaper_dir):
         os.makedirs(lapaper_dir)
         print(f"已创建LAPaper文件夹: {lapaper_dir}")
+    layout = LibraryLayout(lapaper_dir, LIBRARY_LAYOUT)
 
     try:
         with open(csv_path, mode='r', encoding='utf-8-sig') as file:
@@ -41,9 +46,12 @@ def delete_success_files(csv_path):
                 # 处理非完整路径的情况
                 original_filename = filename  # 保存原始文件名用于错误报告
                 
+                # 按DOI分片直接定位(CSV中记录的相对路径/分片目录/迁移前的平铺位置)，不需要列出整个文件夹
+                located = layout.locate(row.get('DOI', '').strip(), filename)
+                
                 # 尝试在多个位置查找文件
                 possible_paths = [
-                    file_in_lapaper,  # 首选位置：LAPaper文件夹内
+                    located or file_in_lapaper,  # 首选位置：LAPaper文件夹内
                     os.path.join(csv_dir, filename),  # CSV文件所在目录
                     os.path.join(os.getcwd(), filename),  # 当前工作目录
                     os.path.join(os.path.expanduser("~"), "Downloads", filename)  # 用户下载目录
@@ -0,0 +1,111 @@
+import os
+import csv
+import re
+from typing import Dict, Iterable, List, Optional
+from urllib.parse import unquote
+
+# DOI常见的前缀写法: doi:xxx、https://doi.org/xxx、http://dx.doi.org/xxx、info:doi/xxx
+DOI_PREFIX_PATTERN = re.compile(r'^(?:https?://(?:dx\.)?doi\.org/|doi:\s*|info:doi/)', re.IGNORECASE)
+TRAILING_PUNCTUATION = ".,;:'\""
+CLOSING_BRACKETS = {')': '(', ']': '[', '>': '<', '}': '{'}
+
+
+def doi_key(doi) -> str:
+    """DOI的规范键：去掉前缀和空白、百分号解码、去掉结尾标点(不成对的括号)并转小写(DOI不区分大小写)；无效值返回空字符串"""
+    if doi is None:
+        return ""
+    key = unquote(str(doi)).strip()
+    while True:
+        stripped = DOI_PREFIX_PATTERN.sub("", key).strip()
+        if stripped == key:
+            break
+        key = stripped
+    start = key.find("10.")
+    if start > 0 and not key[:start].strip("([{<'\" "):
+        key = key[start:]  # 去掉DOI前的括号、引号
+    while key:
+        last = key[-1]
+        if last in TRAILING_PUNCTUATION or last.isspace():
+            key = key[:-1]
+        elif last in CLOSING_BRACKETS and key.count(last) > key.count(CLOSING_BRACKETS[last]):
+            key = key[:-1]  # 句末的括号，DOI内成对的括号保留
+        else:
+            break
+    return key.lower()
+
+
+class DoiIndex:
+    """按规范DOI键索引CSV行，查找和去重都是O(1)；同一DOI的多种写法只保留第一行"""
+
+    def __init__(self, rows: Optional[Iterable[Dict]] = None, column: str = 'DOI'):
+        self.column = column
+        self.rows: Dict[str, Dict] = {}
+        self.duplicates: List[Dict] = []  # 与已有行DOI相同的行
+        for row in rows or []:
+            self.add(row)
+
+    def add(self, row: Dict) -> bool:
+        """登记一行，DOI为空或已存在时返回False"""
+        key = doi_key(row.get(self.column))
+        if not key:
+            return False
+        if key in self.rows:
+            self.duplicates.append(row)
+            return False
+        self.rows[key] = row
+        return True
+
+    def get(self, doi) -> Optional[Dict]:
+        return self.rows.get(doi_key(doi))
+
+    def __contains__(self, doi) -> bool:
+        return doi_key(doi) in self.rows
+
+    def __len__(self) -> int:
+        return len(self.rows)
+
+
+class GlobalDoiIndex:
+    """所有项目论文列表的DOI汇总索引：规范DOI键 -> 包含该DOI的CSV文件"""
+
+    def __init__(self, csv_paths: Iterable[str], column: str = 'DOI'):
+        self.column = column
+        self.projects: Dict[str, List[str]] = {}
+        for csv_path in csv_paths:
+            self.load(csv_path)
+
+    def load(self, csv_path: str):
+        if not os.path.exists(csv_path):
+            print(f"[DOI索引警告] 项目列表不存在: {csv_path}")
+            return
+        try:
+            with open(csv_path, 'r', encoding='utf-8-sig', newline='') as f:
+                reader = csv.reader(f)
+                header = next(reader, [])
+                column = header.index(self.column) if self.column in header else 0
+                for row in reader:
+                    key = doi_key(row[column]) if len(row) > column else ""
+                    if key:
+                        paths = self.projects.setdefault(key, [])
+                        if csv_path not in paths:
+                            paths.append(csv_path)
+        except Exception as e:
+            print(f"[DOI索引警告] 读取项目列表失败 {csv_path}: {str(e)}")
+
+    def add(self, doi, csv_path: str):
+        key = doi_key(doi)
+        if not key:
+            return
+        paths = self.projects.setdefault(key, [])
+        if csv_path not in paths:
+            paths.append(csv_path)
+
+    def lookup(self, doi) -> List[str]:
+        """包含该DOI的项目列表"""
+        return self.projects.get(doi_key(doi), [])
+
+    def __contains__(self, doi) -> bool:
+        return doi_key(doi) in self.projects
+
+    def __len__(self) -> int:
+        return len(self.projects)
@@ -6,6 +6,8 @@ import traceback
 from typing import List, Optional, Dict
 from datetime import datetime
 
+from doi_index import doi_key
+
 # 配置参数
 OUTPUT_FOLDER = r"D:\Paperdownload\RSS"
 CSV_FILE = r"D:\Paperdownload\LAsPaperDoi.csv"
@@ -49,15 +51,15 @@ def update_doi_csv(dois: List[str]) -> Optional[Dict]:
     """更新CSV文件中的DOI记录，只写入不存在的纯DOI号"""
     try:
         existing_dois = set()
-        # 读取现有CSV文件中的所有DOI
+        # 读取现有CSV文件中的所有DOI(规范键)
         if os.path.exists(CSV_FILE):
             with open(CSV_FILE, 'r', encoding='utf-8') as f:
                 reader = csv.reader(f)
                 next(reader)  # 跳过标题行
-                existing_dois = {row[0].lower().strip() for row in reader if row and row[0]}
+                existing_dois = {doi_key(row[0]) for row in reader if row and doi_key(row[0])}
         
         # 首先对当前提取的DOI列表去重
-        unique_dois = list({doi.lower().strip() for doi in dois})
+        unique_dois = list(dict.fromkeys(key for key in map(doi_key, dois) if key))
         if len(unique_dois) < len(dois):
             logger.info(f"注意：当前提取的DOI中有 {len(dois)-len(unique_dois)} 个重复值已被过滤")
         
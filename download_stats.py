@@ -0,0 +1,68 @@
+import os
+import json
+import threading
+from datetime import datetime
+from typing import Dict, Optional
+
+
+class DownloadStatsCollector:
+    """下载统计类：按域名记录文件出现耗时、各分支成功/失败次数和重试结果，持久化到JSON"""
+    MAX_SAMPLES = 500  # 每个域名保留的最近耗时样本数
+
+    def __init__(self, json_path: str):
+        self.json_path = json_path
+        self.stats: Dict[str, Dict] = {}
+        self.lock = threading.Lock()
+
+    def load(self):
+        """加载已有统计"""
+        try:
+            if os.path.exists(self.json_path):
+                with open(self.json_path, 'r', encoding='utf-8-sig') as f:
+                    self.stats = json.load(f).get("domains", {})
+                print(f"[下载统计] 已加载 {len(self.stats)} 个域名的统计数据")
+            else:
+                print(f"[下载统计] 统计文件不存在，将在首次下载后创建: {self.json_path}")
+        except Exception as e:
+            print(f"[下载统计警告] 统计文件读取失败，重新开始统计: {str(e)}")
+            self.stats = {}
+
+    def _domain(self, domain: str) -> Dict:
+        return self.stats.setdefault(domain or "unknown", {
+            "branches": {},         # 分支 -> {"success": n, "failed": n}
+            "attempts": {},         # 第n次尝试 -> {"success": n, "failed": n}
+            "time_to_file": [],     # 保存操作后到文件出现的秒数
+            "print_to_pdf": [],     # 浏览器打印PDF的秒数
+        })
+
+    def record_attempt(self, domain: str, attempt: int, success: bool,
+                       time_to_file: Optional[float] = None, method: str = "save"):
+        """记录单次下载尝试"""
+        with self.lock:
+            entry = self._domain(domain)
+            counts = entry["attempts"].setdefault(str(attempt), {"success": 0, "failed": 0})
+            counts["success" if success else "failed"] += 1
+            if success and time_to_file is not None:
+                key = "print_to_pdf" if method == "print" else "time_to_file"
+                samples = entry[key]
+                samples.append(round(time_to_file, 2))
+                del samples[:-self.MAX_SAMPLES]
+
+    def record_result(self, domain: str, branch: str, success: bool):
+        """记录一篇论文在某分支(template/keyword)的最终结果并保存"""
+        with self.lock:
+            entry = self._domain(domain)
+            counts = entry["branches"].setdefault(branch, {"success": 0, "failed": 0})
+            counts["success" if success else "failed"] += 1
+            entry["updated"] = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+            self._save()
+
+    def _save(self):
+        try:
+            temp_path = self.json_path + ".tmp"
+            with open(temp_path, 'w', encoding='utf-8') as f:
+                json.dump({"domains": self.stats}, f, ensure_ascii=False, indent=2)
+            os.replace(temp_path, self.json_path)
+        except Exception as e:
+            print(f"[下载统计警告] 统计保存失败: {str(e)}")
+
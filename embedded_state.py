@@ -0,0 +1,93 @@
+import re
+import json
+from typing import Any, Dict, Iterator, List, Optional
+
+try:
+    import orjson  # 可选，解析大段JSON更快
+except ImportError:
+    orjson = None
+
+# 页面内嵌的应用状态: <script type="application/json">{...}</script> 或 window.__PRELOADED_STATE__ = {...};
+JSON_SCRIPT_PATTERN = re.compile(r'<script\b[^>]*\btype\s*=\s*["\']application/(?:ld\+)?json["\'][^>]*>', re.IGNORECASE)
+STATE_ASSIGNMENT_PATTERN = re.compile(r'(?:window\.)?__(?:PRELOADED|INITIAL)_STATE__\s*=\s*')
+_decoder = json.JSONDecoder()
+
+
+def _loads(text: str) -> Any:
+    return orjson.loads(text) if orjson is not None else json.loads(text)
+
+
+def iter_states(content: str, marker: Optional[str] = None) -> Iterator[Any]:
+    """依次返回页面中内嵌的JSON状态对象；指定marker时只解析包含该字符串的片段"""
+    for match in JSON_SCRIPT_PATTERN.finditer(content):
+        end = content.find("</script", match.end())
+        if end < 0:
+            continue
+        text = content[match.end():end].strip()
+        if not text or (marker and marker not in text):
+            continue
+        try:
+            yield _loads(text)
+        except ValueError:
+            continue
+    for match in STATE_ASSIGNMENT_PATTERN.finditer(content):
+        # 赋值语句没有明确的结束标记，用raw_decode只解析一个完整的JSON值
+        end = content.find("</script", match.end())
+        if marker and marker not in content[match.end():end if end >= 0 else len(content)]:
+            continue
+        try:
+            state, _ = _decoder.raw_decode(content, match.end())
+            yield state
+        except ValueError:
+            continue
+
+
+def iter_dicts(obj: Any) -> Iterator[Dict]:
+    """遍历JSON对象中的全部字典(非递归，避免深层嵌套时栈溢出)"""
+    stack = [obj]
+    while stack:
+        item = stack.pop()
+        if isinstance(item, dict):
+            yield item
+            stack.extend(item.values())
+        elif isinstance(item, list):
+            stack.extend(item)
+
+
+def find_value(states: List[Any], key: str) -> Optional[Any]:
+    """在状态对象中查找第一个非空的key字段"""
+    for state in states:
+        for item in iter_dicts(state):
+            value = item.get(key)
+            if value:
+                return value
+    return None
+
+
+def pdf_download_entries(states: List[Any]) -> List[Dict[str, str]]:
+    """ScienceDirect式的PDF下载参数: 含queryParams.md5/pid的urlMetadata，返回[{md5, pid, pii}]"""
+    entries = []
+    for state in states:
+        for item in iter_dicts(state):
+            params = item.get("queryParams")
+            if not isinstance(params, dict) or not params.get("md5") or not params.get("pid"):
+                continue
+            entries.append({
+                "md5": str(params["md5"]),
+                "pid": str(params["pid"]),
+                "pii": str(item.get("pii") or params.get("pii") or find_value([state], "pii") or ""),
+            })
+    return entries
+
+
+def attachment_eids(states: List[Any]) -> List[str]:
+    """ScienceDirect式附件列表中的非图片附件(attachment-eid，如 1-s2.0-S...-mmc1.pdf)"""
+    eids = []
+    for state in states:
+        for item in iter_dicts(state):
+            eid = item.get("attachment-eid")
+            if not eid or str(item.get("attachment-type", "")).upper().startswith("IMAGE"):
+                continue
+            if eid not in eids:
+                eids.append(str(eid))
+    return eids
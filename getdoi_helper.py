@@ -12,11 +12,14 @@ import traceback  # 添加traceback用于详细错误日志
 from typing import List, Optional, Dict
 from datetime import datetime, timedelta
 
+from doi_index import doi_key, GlobalDoiIndex
+
 # 配置参数
 WEBSITE_URL = "https://pubmed.ncbi.nlm.nih.gov/"
 SEARCH_QUERY = "((Silk fibroin[Title/Abstract] OR SF[Title/Abstract] OR PEG[Title/Abstract] OR Polyethylene glycol[Title/Abstract]) AND (Hydrogel[Title/Abstract] OR Tissue engineering[Title/Abstract] OR adhesive[Title/Abstract] OR adhesion[Title/Abstract])) NOT (review[Publication Type])"
 OUTPUT_FOLDER = r"D:\Paperdownload\RSS"
 CSV_FILE = r"D:\Paperdownload\PaperDoi.csv"
+PROJECT_CSV_FILES = []  # 其他项目的论文列表CSV，已在其中的DOI照常加入本项目并提示，下载时可直接链接已有文件，如 [r"D:\Paperdownload-xzq\PaperDoi-xzq.csv"]
 BROWSER_PATH = r"C:\Program Files (x86)\Microsoft\Edge\Application\msedge.exe"
 RSS_PNG = r"D:\Paperdownload\photos\RSS.png"
 CREATE_PNG = r"D:\Paperdownload\photos\create.png"
@@ -80,15 +83,15 @@ def update_doi_csv(dois: List[str]) -> Optional[Dict]:
     """更新CSV文件中的DOI记录，只写入不存在的纯DOI号"""
     try:
         existing_dois = set()
-        # 读取现有CSV文件中的所有DOI
+        # 读取现有CSV文件中的所有DOI(规范键)
         if os.path.exists(CSV_FILE):
             with open(CSV_FILE, 'r', encoding='utf-8') as f:
                 reader = csv.reader(f)
                 next(reader)  # 跳过标题行
-                existing_dois = {row[0].lower().strip() for row in reader if row and row[0]}
+                existing_dois = {doi_key(row[0]) for row in reader if row and doi_key(row[0])}
         
         # 首先对当前提取的DOI列表去重
-        unique_dois = list({doi.lower().strip() for doi in dois})
+        unique_dois = list(dict.fromkeys(key for key in map(doi_key, dois) if key))
         if len(unique_dois) < len(dois):
             logger.info(f"注意：当前提取的DOI中有 {len(dois)-len(unique_dois)} 个重复值已被过滤")
         
@@ -96,6 +99,12 @@ def update_doi_csv(dois: List[str]) -> Optional[Dict]:
         new_dois = [doi for doi in unique_dois 
                    if doi not in existing_dois]
         
+        # 其他项目中已有的DOI照常加入，下载时由内容索引直接链接已有文件
+        other_projects = GlobalDoiIndex(PROJECT_CSV_FILES)
+        shared_dois = [doi for doi in new_dois if doi in other_projects]
+        for doi in shared_dois:
+            logger.info(f"DOI {doi} 已在其他项目中: {', '.join(other_projects.lookup(doi))}")
+        
         if new_dois:
             # 写入新DOI（只包含DOI号，不包含"doi:"前缀）
             with open(CSV_FILE, 'a', newline='', encoding='utf-8') as f:
@@ -114,6 +123,7 @@ def update_doi_csv(dois: List[str]) -> Optional[Dict]:
             "total_extracted": len(dois),
             "duplicates_in_current": len(dois) - len(unique_dois),
             "new_dois_added": len(new_dois),
+            "shared_with_other_projects": len(shared_dois),
             "existing_dois": len(existing_dois)
         }
     except Exception as e:
@@ -289,7 +299,7 @@ def main():
                                     logger.info(f"\n从HTML内容中找到 {len(dois)} 个DOI")
                                     
                                     # 检查当前提取的DOI是否有重复
-                                    unique_dois = set(dois)
+                                    unique_dois = set(map(doi_key, dois))
                                     if len(unique_dois) < len(dois):
                                         logger.info(f"警告：当前提取的DOI中有 {len(dois)-len(unique_dois)} 个重复值")
                                     
@@ -300,6 +310,7 @@ def main():
                                         logger.info(f"- 本次提取DOI总数: {stats['total_extracted']}")
                                         logger.info(f"- 本次提取中的重复DOI: {stats['duplicates_in_current']}")
                                         logger.info(f"- 新增DOI数量: {stats['new_dois_added']}")
+                                        logger.info(f"- 其中已在其他项目中: {stats['shared_with_other_projects']}")
                                         logger.info(f"- 已有DOI总数: {stats['existing_dois']}")
                                         
                                         # 如果有新DOI，则运行下一个程序
@@ -0,0 +1,187 @@
+import os
+import sys
+import shutil
+import sqlite3
+import hashlib
+import argparse
+import threading
+from datetime import datetime
+from typing import Dict, List, Optional
+
+from paper_library import LibraryLayout
+from doi_index import doi_key
+
+# 全局配置
+CONFIG = {
+    "DB_PATH": r"D:\PaperLibrary\library.db",  # 所有项目共享的内容索引
+}
+
+HASH_CHUNK_SIZE = 1 << 20
+
+
+def file_sha256(path: str) -> str:
+    """分块计算文件SHA-256"""
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(HASH_CHUNK_SIZE), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def link_or_copy(source: str, target: str) -> str:
+    """在target处创建source的硬链接，跨卷等无法链接时复制；返回 link/copy"""
+    os.makedirs(os.path.dirname(target), exist_ok=True)
+    temp_path = target + ".link"
+    if os.path.exists(temp_path):
+        os.remove(temp_path)
+    try:
+        os.link(source, temp_path)
+        method = "link"
+    except OSError:
+        shutil.copy2(source, temp_path)
+        method = "copy"
+    os.replace(temp_path, target)
+    return method
+
+
+class LibraryIndex:
+    """跨项目的内容寻址文件索引(SHA-256 + 大小)：
+    下载完成的文件登记到索引，内容相同的文件改为硬链接；任何项目库中已有的DOI可直接链接过来，不再重新下载"""
+
+    def __init__(self, db_path: str):
+        self.db_path = db_path
+        self.lock = threading.Lock()
+        os.makedirs(os.path.dirname(os.path.abspath(db_path)), exist_ok=True)
+        self.conn = sqlite3.connect(db_path, check_same_thread=False)
+        self.conn.executescript("""
+            CREATE TABLE IF NOT EXISTS files (
+                path TEXT PRIMARY KEY,
+                sha256 TEXT NOT NULL,
+                size INTEGER NOT NULL,
+                doi TEXT,
+                kind TEXT,
+                project TEXT,
+                added TEXT
+            );
+            CREATE INDEX IF NOT EXISTS files_content ON files (sha256, size);
+            CREATE INDEX IF NOT EXISTS files_doi ON files (doi, kind);
+        """)
+        self.conn.commit()
+
+    def close(self):
+        self.conn.close()
+
+    def add(self, path: str, doi: Optional[str], kind: str, project: str = "") -> Dict:
+        """登记一个已下载的文件；已有相同内容的文件时把本文件替换为指向它的硬链接"""
+        path = os.path.abspath(path)
+        doi = doi_key(doi) or None
+        size = os.path.getsize(path)
+        sha256 = file_sha256(path)
+        result = {"sha256": sha256, "size": size, "deduplicated": False}
+        with self.lock:
+            for (existing,) in self.conn.execute(
+                    "SELECT path FROM files WHERE sha256 = ? AND size = ? AND path != ?", (sha256, size, path)):
+                if not os.path.exists(existing):
+                    continue
+                if not os.path.samefile(existing, path):
+                    try:
+                        os.link(existing, path + ".link")
+                        os.replace(path + ".link", path)
+                        result["deduplicated"] = True
+                        print(f"[内容索引] 与已有文件内容相同，改为硬链接: {existing}")
+                    except OSError:
+                        pass  # 不同卷无法硬链接，保留副本
+                break
+            self.conn.execute(
+                "INSERT OR REPLACE INTO files (path, sha256, size, doi, kind, project, added) VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (path, sha256, size, doi, kind, project, datetime.now().strftime("%Y-%m-%d %H:%M:%S")))
+            self.conn.commit()
+        return result
+
+    def lookup(self, doi: str, kind: str) -> List[str]:
+        """某DOI在任一项目库中已有的文件路径(已删除的记录会被清理)"""
+        with self.lock:
+            rows = self.conn.execute(
+                "SELECT path FROM files WHERE doi = ? AND kind = ? ORDER BY path", (doi_key(doi), kind)).fetchall()
+            paths, missing = [], []
+            for (path,) in rows:
+                (paths if os.path.exists(path) else missing).append(path)
+            if missing:
+                self.conn.executemany("DELETE FROM files WHERE path = ?", [(p,) for p in missing])
+                self.conn.commit()
+        # 同一内容只返回一份
+        unique, seen = [], set()
+        for path in paths:
+            stat = os.stat(path)
+            key = (stat.st_dev, stat.st_ino) if stat.st_ino else path
+            if key not in seen:
+                seen.add(key)
+                unique.append(path)
+        return unique
+
+    def link_into(self, source: str, target: str, doi: str, kind: str, project: str = "") -> Optional[str]:
+        """把索引中的文件链接到本项目库的target位置并登记，返回 link/copy"""
+        try:
+            method = link_or_copy(source, target)
+        except OSError as e:
+            print(f"[内容索引错误] 链接文件失败: {str(e)}")
+            return None
+        try:
+            self.add(target, doi, kind, project)
+        except (OSError, sqlite3.Error) as e:
+            print(f"[内容索引警告] 文件已链接，登记失败: {target}, {str(e)}")
+        return method
+
+    def scan(self, root: str, kind: str, project: str = "") -> Dict[str, int]:
+        """登记库文件夹中的全部文件(由文件名推DOI)，并对内容重复的文件做硬链接去重"""
+        counts = {"files": 0, "deduplicated": 0, "bytes_saved": 0}
+        for entry in LibraryLayout(root).iter_files():
+            if entry.name.endswith((".part", ".tmp", ".crdownload", ".link", ".invalid")):
+                continue
+            result = self.add(entry.path, doi_from_filename(entry.name), kind, project)
+            counts["files"] += 1
+            if result["deduplicated"]:
+                counts["deduplicated"] += 1
+                counts["bytes_saved"] += result["size"]
+        return counts
+
+    def stats(self) -> Dict[str, int]:
+        with self.lock:
+            files, total, unique = self.conn.execute(
+                "SELECT COUNT(*), COALESCE(SUM(size), 0), COUNT(DISTINCT sha256) FROM files").fetchone()
+        return {"files": files, "bytes": total, "unique_contents": unique}
+
+
+def doi_from_filename(filename: str) -> Optional[str]:
+    """由DOI派生的文件名还原DOI(前缀中的第一个_为/，去掉_pdf/_SIn后缀)，无法识别时返回None"""
+    stem = os.path.splitext(filename)[0]
+    registrant, _, suffix = stem.partition('_')
+    if not registrant.startswith("10.") or not suffix:
+        return None
+    if suffix.endswith("_pdf"):
+        suffix = suffix[:-len("_pdf")]
+    head, _, last = suffix.rpartition('_SI')
+    if head and last.isdigit():
+        suffix = head
+    return f"{registrant}/{suffix}"
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="跨项目的PDF/SI内容索引：登记已有文件并用硬链接去重")
+    parser.add_argument("--db", default=CONFIG["DB_PATH"], help="索引数据库")
+    parser.add_argument("--scan", nargs="*", default=[], help="要登记的库文件夹")
+    parser.add_argument("--kind", default="paper", choices=["paper", "si"], help="文件类型")
+    parser.add_argument("--project", default="", help="项目名")
+    args = parser.parse_args()
+
+    index = LibraryIndex(args.db)
+    for folder in args.scan:
+        print(f"[内容索引] 正在登记: {folder}")
+        counts = index.scan(folder, args.kind, args.project)
+        print(f"[内容索引] 文件 {counts['files']} 个，去重 {counts['deduplicated']} 个，"
+              f"节省 {counts['bytes_saved'] / (1024 * 1024):.1f} MB")
+    stats = index.stats()
+    print(f"[内容索引] 索引共 {stats['files']} 个文件，{stats['unique_contents']} 种内容，"
+          f"{stats['bytes'] / (1024 * 1024):.1f} MB")
+    index.close()
+    sys.exit(0)
@@ -0,0 +1,152 @@
+import os
+import csv
+import sys
+import shutil
+import argparse
+from datetime import datetime
+from concurrent.futures import ThreadPoolExecutor
+
+from paper_library import LibraryLayout
+
+# 全局配置
+CONFIG = {
+    "FOLDER": r"D:\Paperdownload-xzq\Paper-xzq",  # 待迁移的库文件夹(Paper或SI)
+    "CSV_PATH": r"D:\Paperdownload-xzq\PaperDoi_updated-xzq_failed-1.csv",  # 记录文件名的论文列表CSV
+    "LAYOUT": "prefix",  # 目标布局: flat/prefix/hash，需与Paperdownload/SIdownload中的LIBRARY_LAYOUT一致
+    "COLUMNS": ["Filename", "SIFilename"],  # 保存文件名的列(多个文件用;分隔)
+    "WORKERS": 8,  # 并行移动文件的线程数
+}
+
+
+def load_csv(csv_path):
+    with open(csv_path, 'r', encoding='utf-8-sig', newline='') as f:
+        reader = csv.DictReader(f)
+        return list(reader.fieldnames or []), list(reader)
+
+
+def index_rows(rows, columns):
+    """文件名(不含目录) -> DOI"""
+    doi_by_name = {}
+    for row in rows:
+        doi = row.get('DOI', '').strip()
+        for column in columns:
+            for name in filter(None, (row.get(column) or '').split(';')):
+                doi_by_name[name.replace('\\', '/').split('/')[-1]] = doi
+    return doi_by_name
+
+
+def plan_moves(layout, doi_by_name):
+    """计算需要移动的文件: [(当前路径, 目标相对路径)]、已在正确位置的文件{文件名: 相对路径}和无法确定位置的文件"""
+    moves, in_place, unknown = [], {}, []
+    for entry in layout.iter_files():
+        if entry.name.endswith((".part", ".tmp", ".crdownload")):
+            continue
+        doi = doi_by_name.get(entry.name)
+        if doi:
+            target = layout.relative_path(doi, entry.name)
+        elif layout.scheme == "prefix" and LibraryLayout.shard_from_filename(entry.name):
+            target = f"{LibraryLayout.shard_from_filename(entry.name)}/{entry.name}"
+        elif layout.scheme == "flat":
+            target = entry.name
+        else:
+            unknown.append(entry.path)  # 不在CSV中且文件名不是DOI形式
+            continue
+        target_path = os.path.join(layout.root, *target.split('/'))
+        if os.path.normcase(os.path.abspath(entry.path)) != os.path.normcase(os.path.abspath(target_path)):
+            moves.append((entry.path, target))
+        else:
+            in_place[entry.name] = target
+    return moves, in_place, unknown
+
+
+def move_file(root, source, target):
+    """把文件移动到目标分片，返回(目标相对路径, 错误信息)"""
+    target_path = os.path.join(root, *target.split('/'))
+    try:
+        os.makedirs(os.path.dirname(target_path), exist_ok=True)
+        if os.path.exists(target_path):
+            return target, "目标已存在"
+        os.replace(source, target_path)
+        return target, None
+    except OSError as e:
+        return target, str(e)
+
+
+def update_csv(csv_path, fieldnames, rows, columns, new_paths):
+    """把CSV中的文件名改为新的相对路径，原文件备份为.bak"""
+    updated = 0
+    for row in rows:
+        for column in columns:
+            value = row.get(column)
+            if not value:
+                continue
+            parts = [new_paths.get(name.replace('\\', '/').split('/')[-1], name) for name in value.split(';')]
+            new_value = ';'.join(parts)
+            if new_value != value:
+                row[column] = new_value
+                updated += 1
+    if not updated:
+        return 0
+    backup = f"{csv_path}.{datetime.now().strftime('%Y%m%d_%H%M%S')}.bak"
+    shutil.copy2(csv_path, backup)
+    temp_path = csv_path + ".tmp"
+    with open(temp_path, 'w', encoding='utf-8-sig', newline='') as f:
+        writer = csv.DictWriter(f, fieldnames=fieldnames)
+        writer.writeheader()
+        writer.writerows(rows)
+    os.replace(temp_path, csv_path)
+    print(f"[迁移] CSV已更新 {updated} 个单元格 (原文件备份: {backup})")
+    return updated
+
+
+def migrate(folder, csv_path, scheme, columns, workers, dry_run=False):
+    """把库文件夹迁移到指定布局并更新CSV中的文件路径"""
+    layout = LibraryLayout(folder, scheme)
+    fieldnames, rows = load_csv(csv_path) if csv_path and os.path.exists(csv_path) else ([], [])
+    doi_by_name = index_rows(rows, columns)
+    print(f"\n{'='*50}")
+    print(f"[迁移] 文件夹: {folder} -> 布局 {scheme}")
+    print(f"[迁移] CSV中记录的文件: {len(doi_by_name)}")
+
+    moves, in_place, unknown = plan_moves(layout, doi_by_name)
+    print(f"[迁移] 需要移动 {len(moves)} 个文件")
+    if unknown:
+        print(f"[迁移警告] {len(unknown)} 个文件不在CSV中且无法从文件名推出DOI，保持不动")
+    if dry_run:
+        for source, target in moves[:20]:
+            print(f"  {os.path.relpath(source, folder)} -> {target}")
+        print("[迁移] 仅预览，未移动文件")
+        print(f"{'='*50}")
+        return True
+
+    new_paths, errors = dict(in_place), []
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        results = executor.map(lambda move: (move[0], move_file(folder, *move)), moves)
+        for done, (source, (target, error)) in enumerate(results, 1):
+            if error:
+                errors.append((source, error))
+            else:
+                new_paths[os.path.basename(source)] = target
+            if done % 1000 == 0:
+                print(f"[迁移] 已处理 {done}/{len(moves)}")
+
+    print(f"[迁移] 已移动 {len(new_paths) - len(in_place)} 个文件，失败 {len(errors)} 个")
+    for source, error in errors[:20]:
+        print(f"  {source}: {error}")
+    if rows and new_paths:
+        update_csv(csv_path, fieldnames, rows, columns, new_paths)
+    print(f"{'='*50}")
+    return not errors
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="把平铺的Paper/SI文件夹迁移为按DOI分片的目录布局")
+    parser.add_argument("--folder", default=CONFIG["FOLDER"], help="库文件夹")
+    parser.add_argument("--csv", default=CONFIG["CSV_PATH"], help="论文列表CSV(文件名列会改为新路径)")
+    parser.add_argument("--layout", default=CONFIG["LAYOUT"], choices=LibraryLayout.SCHEMES, help="目标布局")
+    parser.add_argument("--columns", default=",".join(CONFIG["COLUMNS"]), help="保存文件名的列，逗号分隔")
+    parser.add_argument("--workers", type=int, default=CONFIG["WORKERS"], help="并行线程数")
+    parser.add_argument("--dry-run", action="store_true", help="只显示迁移计划")
+    args = parser.parse_args()
+    ok = migrate(args.folder, args.csv, args.layout, args.columns.split(','), args.workers, args.dry_run)
+    sys.exit(0 if ok else 1)
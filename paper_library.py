@@ -0,0 +1,159 @@
+import os
+import re
+import time
+import hashlib
+import shutil
+import tempfile
+from typing import List, Optional, Set
+
+from browser_backend import PARTIAL_DOWNLOAD_SUFFIXES
+
+STAGING_DIR_NAME = ".staging"
+MTIME_TOLERANCE = 2  # 修改时间精度容差(秒)，FAT/exFAT为2秒
+
+
+def safe_doi(doi: str) -> str:
+    """DOI转为可用作文件名的形式"""
+    return re.sub(r'[\\/*?:"<>|]', "_", doi.strip().replace('/', '_'))
+
+
+def doi_filename(doi: str, ext: str, suffix: str = "") -> str:
+    """由DOI生成最终文件名，如 10.1021/xx -> 10.1021_xx_pdf.pdf"""
+    ext = ext if not ext or ext.startswith('.') else f".{ext}"
+    return f"{safe_doi(doi)}{suffix}{ext.lower()}"
+
+
+class LibraryLayout:
+    """论文/SI库的目录布局：按DOI分片保存，路径由DOI直接计算，不需要列出整个目录
+
+    flat:   <root>/<文件名>
+    prefix: <root>/<DOI前缀>/<后缀前两位>/<文件名>，如 10.1021/ac/10.1021_acsnano.3c09034_pdf.pdf
+    hash:   <root>/<sha1前两位>/<sha1第3-4位>/<文件名>，适合单一出版商占绝大多数的库
+    CSV中保存相对root的路径(统一用'/')。
+    """
+    SCHEMES = ("flat", "prefix", "hash")
+
+    def __init__(self, root: str, scheme: str = "prefix"):
+        if scheme not in self.SCHEMES:
+            raise ValueError(f"未知的目录布局: {scheme}，可选: {', '.join(self.SCHEMES)}")
+        self.root = root
+        self.scheme = scheme
+
+    def shard(self, doi: str) -> str:
+        """DOI所在分片的相对目录，flat布局为空字符串"""
+        key = safe_doi(doi)
+        if self.scheme == "prefix":
+            return self.shard_from_filename(key) or "_other"
+        if self.scheme == "hash":
+            digest = hashlib.sha1(key.lower().encode("utf-8")).hexdigest()
+            return f"{digest[:2]}/{digest[2:4]}"
+        return ""
+
+    @staticmethod
+    def shard_from_filename(filename: str) -> Optional[str]:
+        """prefix布局下由DOI派生的文件名推出分片(文件名以 <前缀>_<后缀> 开头)，不是DOI文件名时返回None"""
+        registrant, _, suffix = filename.partition('_')
+        if not re.match(r'^10\.\d+$', registrant):
+            return None
+        head = re.sub(r'[^0-9a-z]', '', suffix.lower())[:2] or "_"
+        return f"{registrant}/{head}"
+
+    def relative_path(self, doi: str, filename: str) -> str:
+        """文件在库中的相对路径(写入CSV)"""
+        shard = self.shard(doi)
+        return f"{shard}/{filename}" if shard else filename
+
+    def path(self, doi: str, filename: str) -> str:
+        """文件在库中的绝对路径"""
+        return os.path.join(self.root, *self.relative_path(doi, filename).split('/'))
+
+    def locate(self, doi: Optional[str], stored_name: str) -> Optional[str]:
+        """按CSV中记录的文件名查找文件: 记录的相对路径 -> 当前布局下的分片 -> 迁移前的平铺位置"""
+        if not stored_name:
+            return None
+        stored_name = stored_name.replace('\\', '/')
+        base_name = stored_name.split('/')[-1]
+        if os.path.isabs(stored_name):
+            candidates = [stored_name]
+        else:
+            candidates = [os.path.join(self.root, *stored_name.split('/'))]
+        if doi:
+            candidates.append(self.path(doi, base_name))
+        elif self.scheme == "prefix" and self.shard_from_filename(base_name):
+            candidates.append(os.path.join(self.root, *self.shard_from_filename(base_name).split('/'), base_name))
+        candidates.append(os.path.join(self.root, base_name))
+        for candidate in candidates:
+            if os.path.isfile(candidate):
+                return candidate
+        return None
+
+    def iter_files(self):
+        """递归遍历库中的文件(跳过暂存目录)，返回os.DirEntry"""
+        stack = [self.root]
+        while stack:
+            with os.scandir(stack.pop()) as entries:
+                for entry in entries:
+                    if entry.is_dir(follow_symlinks=False):
+                        if entry.name != STAGING_DIR_NAME:
+                            stack.append(entry.path)
+                    elif entry.is_file():
+                        yield entry
+
+
+class StagingArea:
+    """下载暂存区：每个下载任务使用独立的暂存目录，浏览器只往该目录下载；
+    确认文件完整后原子改名到目标文件夹，文件归属不依赖共享目录前后对比"""
+
+    def __init__(self, final_folder: str, root: Optional[str] = None):
+        self.final_folder = final_folder
+        # 暂存目录放在目标文件夹内，保证与目标在同一文件系统，os.replace为原子操作
+        self.root = root or os.path.join(final_folder, STAGING_DIR_NAME)
+        os.makedirs(self.root, exist_ok=True)
+
+    def create(self, label: str) -> str:
+        """为一个任务创建暂存目录"""
+        return tempfile.mkdtemp(prefix=f"{safe_doi(label)[:60]}_", dir=self.root)
+
+    def commit(self, staging_dir: str, filename: str, target_name: str) -> Optional[str]:
+        """把暂存目录中的文件原子移动到目标文件夹(target_name可为分片相对路径)，返回target_name"""
+        source = os.path.join(staging_dir, filename)
+        target = os.path.join(self.final_folder, *target_name.split('/'))
+        try:
+            os.makedirs(os.path.dirname(target), exist_ok=True)
+            os.replace(source, target)
+            print(f"[文件归档] {filename} -> {target_name}")
+            return target_name
+        except OSError as e:
+            print(f"[文件归档错误] 移动文件失败: {str(e)}")
+            return None
+
+    def discard(self, staging_dir: str):
+        """删除任务的暂存目录(包括迟到的下载)"""
+        if staging_dir and os.path.dirname(staging_dir) == self.root:
+            shutil.rmtree(staging_dir, ignore_errors=True)
+
+    def cleanup(self, max_age: float = 3600):
+        """清理之前运行遗留的暂存目录(浏览器仍在写入时可能无法立即删除)"""
+        now = time.time()
+        removed = 0
+        for entry in os.scandir(self.root):
+            if entry.is_dir() and now - entry.stat().st_mtime > max_age:
+                shutil.rmtree(entry.path, ignore_errors=True)
+                removed += 1
+        if removed:
+            print(f"[文件归档] 已清理 {removed} 个遗留暂存目录")
+
+    @staticmethod
+    def claim_new_file(folder: str, before: Set[str], since: float,
+                       extensions: Optional[List[str]] = None) -> Optional[str]:
+        """无法指定下载目录时(桌面浏览器)的退路：在共享目录中找任务开始后出现的最新完整文件"""
+        candidates = []
+        for name in set(os.listdir(folder)) - before:
+            if name.lower().endswith(PARTIAL_DOWNLOAD_SUFFIXES):
+                continue
+            if extensions and name.split('.')[-1].lower() not in extensions:
+                continue
+            path = os.path.join(folder, name)
+            if os.path.isfile(path) and os.path.getmtime(path) >= since - MTIME_TOLERANCE:
+                candidates.append((os.path.getmtime(path), name))
+        return max(candidates)[1] if candidates else None
@@ -0,0 +1,216 @@
+import os
+import io
+import csv
+import sys
+import shutil
+import argparse
+from contextlib import redirect_stdout
+from datetime import datetime
+from urllib.parse import urlparse
+from concurrent.futures import ProcessPoolExecutor
+
+from doi_index import DoiIndex
+
+# 全局配置(为空的项使用Paperdownload.Config / SIdownload.CONFIG中的值)
+CONFIG = {
+    "STAGE": "paper",  # 回放阶段: paper(论文PDF链接) / si(SI链接)
+    "STATUS": {"paper": "Failed", "si": "NOSI"},  # 默认回放的行状态
+    "CSV_PATH": "",  # 论文列表CSV
+    "HTML_PATH": "",  # HTML快照文件夹(HTMLFile为相对文件名时)
+    "JSON_PATH": "",  # 关键词json路径
+    "WORKERS": os.cpu_count() or 4,  # 并行提取的进程数
+}
+
+STATUS_COLUMNS = {"paper": "DownloadStatus", "si": "SIDownloadStatus"}
+
+_extractor = None  # 每个工作进程各自的提取器
+_verbose = False
+
+
+def stage_defaults(stage):
+    """各阶段的默认CSV、快照文件夹和关键词json(只在用到时导入对应脚本)"""
+    if stage == "si":
+        import SIdownload
+        return SIdownload.CONFIG["CSV_PATH"], SIdownload.CONFIG["DOWNLOAD_PATH"], SIdownload.CONFIG["JSON_PATH"]
+    import Paperdownload
+    return Paperdownload.Config.CSV_PATH, Paperdownload.Config.DOWNLOAD_PATH, Paperdownload.Config.JSON_PATH
+
+
+def _init_worker(stage, json_path, verbose):
+    """工作进程初始化: 创建提取器"""
+    global _extractor, _verbose
+    _verbose = verbose
+    if stage == "si":
+        import SIdownload
+
+        class _SIExtractor(SIdownload.PaperProcessor):
+            """只做链接提取的SI处理器：不启动浏览器，也不回写CSV"""
+
+            def __init__(self):
+                self.csv_rows = []
+                self.csv_fieldnames = []
+                self.csv_index = DoiIndex()
+                self.last_extract_by_eid = False
+                self._last_is_full_supp = False
+
+            def update_csv_columns(self, doi, updates):
+                pass  # 结果由主进程统一写回
+
+        SIdownload.CONFIG["JSON_PATH"] = json_path
+        _extractor = _SIExtractor()
+    else:
+        import Paperdownload
+        Paperdownload.Config.JSON_PATH = json_path
+        _extractor = Paperdownload.PaperExtractor(json_path)
+
+
+def _extract(stage, doi, html_path):
+    """在工作进程中提取一篇论文的链接，返回(DOI, 链接列表, 错误信息)"""
+    output = sys.stdout if _verbose else io.StringIO()
+    try:
+        with redirect_stdout(output):
+            if stage == "si":
+                domain = os.path.splitext(os.path.basename(html_path))[0].split('_')[0]
+                _extractor.last_extract_by_eid = False
+                _extractor._last_is_full_supp = False
+                urls = _extractor.extract_si_urls(html_path, doi, domain)
+            else:
+                url = _extractor.extract_paper_url(html_path, doi)
+                urls = [url] if url else []
+        return doi, urls, None
+    except Exception as e:
+        return doi, [], str(e)
+
+
+def select_rows(rows, stage, status, html_dir):
+    """按状态筛选有HTML快照的行，返回[(DOI, 快照路径)]和缺少快照的行数"""
+    index = DoiIndex()
+    tasks, missing = [], 0
+    for row in rows:
+        if (row.get(STATUS_COLUMNS[stage]) or '').strip().upper() != status.upper():
+            continue
+        if not index.add(row):
+            continue  # 无DOI或DOI重复
+        html_file = (row.get('HTMLFile') or '').strip()
+        html_path = os.path.join(html_dir, html_file) if html_file else ""
+        if not html_path or not os.path.exists(html_path):
+            missing += 1
+            continue
+        tasks.append((row['DOI'].strip(), html_path))
+    return tasks, missing
+
+
+def write_csv(csv_path, fieldnames, rows):
+    """原子写回CSV，原文件备份为.bak"""
+    backup = f"{csv_path}.{datetime.now().strftime('%Y%m%d_%H%M%S')}.bak"
+    shutil.copy2(csv_path, backup)
+    temp_path = csv_path + ".tmp"
+    with open(temp_path, 'w', encoding='utf-8-sig', newline='') as f:
+        writer = csv.DictWriter(f, fieldnames=fieldnames)
+        writer.writeheader()
+        writer.writerows(rows)
+    os.replace(temp_path, csv_path)
+    print(f"[回放] CSV已更新 (原文件备份: {backup})")
+
+
+def queue_papers(found, index):
+    """论文阶段: 新找到链接的论文加入重试队列直接下载，CSV标记为Retrying"""
+    import Paperdownload
+    from retry_queue import RetryQueue
+
+    queue = RetryQueue(Paperdownload.Config.RETRY_QUEUE_JSON, Paperdownload.Config.RETRY_MAX_DELAY)
+    queue.load()
+    settings = Paperdownload.DownloadSettingsManager(Paperdownload.Config.DOWNLOAD_SETTINGS_JSON)
+    items = []
+    for doi, urls in found.items():
+        if doi in queue:
+            print(f"[回放] 已在重试队列中，跳过: {doi}")
+            continue
+        domain = urlparse(urls[0]).netloc
+        items.append({
+            "doi": doi,
+            "domain": domain,
+            "url": urls[0],
+            "branch": "keyword",
+            "failure": "replay",
+            "max_attempts": settings.get_max_retries(domain),
+        })
+        index.get(doi).update({'DownloadStatus': 'Retrying', 'FailureReason': 'replay', 'DownloadURL': urls[0]})
+    if items:
+        queue.enqueue(items)
+        print(f"[回放] {len(items)} 篇论文已加入重试队列，下次运行Paperdownload时直接下载: {Paperdownload.Config.RETRY_QUEUE_JSON}")
+    return len(items)
+
+
+def reset_si(found, index):
+    """SI阶段: 新找到链接的论文恢复为待处理，下次运行时按快照重新提取"""
+    for doi in found:
+        index.get(doi).update({'SIDownloadStatus': ''})
+    print(f"[回放] {len(found)} 篇论文已恢复为待处理，下次运行SIdownload时重新下载")
+    return len(found)
+
+
+def replay(stage, status, csv_path, html_dir, json_path, workers, dry_run=False, verbose=False):
+    """用当前规则重新提取已保存快照中的链接，只把现在能找到链接的论文重新排入下载"""
+    with open(csv_path, 'r', encoding='utf-8-sig', newline='') as f:
+        reader = csv.DictReader(f)
+        fieldnames, rows = list(reader.fieldnames or []), list(reader)
+    tasks, missing = select_rows(rows, stage, status, html_dir)
+    print(f"\n{'='*50}")
+    print(f"[回放] 阶段: {stage}，状态: {status}，关键词: {json_path}")
+    print(f"[回放] 待回放 {len(tasks)} 篇，缺少HTML快照 {missing} 篇")
+
+    found, errors = {}, []
+    if tasks:
+        with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker,
+                                 initargs=(stage, json_path, verbose)) as executor:
+            results = executor.map(_extract, [stage] * len(tasks), *zip(*tasks), chunksize=8)
+            for done, (doi, urls, error) in enumerate(results, 1):
+                if error:
+                    errors.append((doi, error))
+                elif urls:
+                    found[doi] = urls
+                    print(f"[回放] 找到链接 {doi}: {urls[0]}{f' 等{len(urls)}个' if len(urls) > 1 else ''}")
+                if done % 500 == 0:
+                    print(f"[回放] 已处理 {done}/{len(tasks)}")
+
+    print(f"[回放] 扫描 {len(tasks)} 篇，找到链接 {len(found)} 篇，出错 {len(errors)} 篇")
+    for doi, error in errors[:20]:
+        print(f"  {doi}: {error}")
+    if found and not dry_run:
+        index = DoiIndex(rows)
+        if stage == "si":
+            reset_si(found, index)
+        else:
+            queue_papers(found, index)
+            for column in ('DownloadURL', 'FailureReason'):
+                if column not in fieldnames:
+                    fieldnames.append(column)
+        write_csv(csv_path, fieldnames, rows)
+    elif dry_run:
+        print("[回放] 仅预览，未修改CSV和重试队列")
+    print(f"{'='*50}")
+    return not errors
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="修改关键词/规则后，离线重新提取已保存HTML快照中的链接")
+    parser.add_argument("--stage", default=CONFIG["STAGE"], choices=list(STATUS_COLUMNS), help="回放阶段")
+    parser.add_argument("--status", default="", help="回放哪种状态的行(默认: paper为Failed，si为NOSI)")
+    parser.add_argument("--csv", default=CONFIG["CSV_PATH"], help="论文列表CSV")
+    parser.add_argument("--html", default=CONFIG["HTML_PATH"], help="HTML快照文件夹")
+    parser.add_argument("--keywords", default=CONFIG["JSON_PATH"], help="关键词json")
+    parser.add_argument("--workers", type=int, default=CONFIG["WORKERS"], help="并行进程数")
+    parser.add_argument("--dry-run", action="store_true", help="只显示能找到链接的论文")
+    parser.add_argument("--verbose", action="store_true", help="显示各论文的提取过程")
+    args = parser.parse_args()
+
+    default_csv, default_html, default_json = stage_defaults(args.stage)
+    csv_path = args.csv or default_csv
+    if not os.path.exists(csv_path):
+        print(f"[回放错误] CSV不存在: {csv_path}")
+        sys.exit(1)
+    ok = replay(args.stage, args.status or CONFIG["STATUS"][args.stage], csv_path,
+                args.html or default_html, args.keywords or default_json,
+                args.workers, args.dry_run, args.verbose)
+    sys.exit(0 if ok else 1)
@@ -0,0 +1,145 @@
+import os
+import json
+import time
+import random
+import threading
+from datetime import datetime
+from typing import Dict, List, Optional
+
+# 失败类型 -> 重试策略
+#   action: redownload(用上次的下载链接重新下载) / reprocess(重新获取页面并提取链接) / login(先登录再重新处理)
+#   factor: 退避基数的倍数
+RETRY_STRATEGIES = {
+    "timeout": {"action": "redownload", "factor": 1},
+    "not_pdf": {"action": "reprocess", "factor": 2},
+    "login_wall": {"action": "login", "factor": 4},
+}
+
+
+class RetryQueue:
+    """持久化的延迟重试队列：下载失败的论文按域名指数退避(带抖动)后重新调度，队列保存在JSON中可跨运行继续"""
+
+    def __init__(self, json_path: str, max_delay: float = 1800, jitter: float = 0.5):
+        self.json_path = json_path
+        self.max_delay = max_delay  # 单次退避上限(秒)
+        self.jitter = jitter  # 抖动比例: 实际延迟在 [delay*(1-jitter), delay] 之间
+        self.entries: Dict[str, Dict] = {}  # DOI -> 重试项
+        self.lock = threading.Lock()
+
+    def load(self):
+        """加载上次运行留下的重试项"""
+        try:
+            if os.path.exists(self.json_path):
+                with open(self.json_path, 'r', encoding='utf-8-sig') as f:
+                    self.entries = {entry["doi"]: entry for entry in json.load(f).get("entries", [])}
+                print(f"[重试队列] 已加载 {len(self.entries)} 个待重试项")
+        except Exception as e:
+            print(f"[重试队列警告] 队列文件读取失败，重新开始: {str(e)}")
+            self.entries = {}
+
+    def __contains__(self, doi: str) -> bool:
+        return doi in self.entries
+
+    def __len__(self) -> int:
+        return len(self.entries)
+
+    def schedule(self, doi: str, domain: str, failure: str, attempt: int, max_attempts: int,
+                 base_delay: float, branch: str, url: Optional[str] = None) -> Optional[Dict]:
+        """登记第attempt次尝试的失败；返回新的重试项，达到最大尝试次数时移出队列并返回None"""
+        with self.lock:
+            if attempt >= max_attempts:
+                self.entries.pop(doi, None)
+                self._save()
+                return None
+            strategy = RETRY_STRATEGIES.get(failure, RETRY_STRATEGIES["timeout"])
+            delay = min(self.max_delay, base_delay * strategy["factor"] * 2 ** (attempt - 1))
+            delay *= random.uniform(1 - self.jitter, 1)
+            entry = {
+                "doi": doi,
+                "domain": domain,
+                "branch": branch,
+                "url": url,
+                "failure": failure,
+                "action": strategy["action"],
+                "attempt": attempt + 1,  # 下一次尝试的序号
+                "max_attempts": max_attempts,
+                "due": time.time() + delay,
+                "updated": datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
+            }
+            self.entries[doi] = entry
+            self._save()
+            print(f"[重试队列] {doi} ({failure}) 将在 {delay:.0f} 秒后第{attempt + 1}/{max_attempts}次尝试")
+            return entry
+
+    def park(self, doi: str, domain: str, due: float, max_attempts: int, reason: str = "circuit_open"):
+        """暂缓一篇论文(如所在域名已熔断、其它项目正在处理)到due时刻，不计入尝试次数；已在队列中的项保留原策略"""
+        with self.lock:
+            entry = self.entries.get(doi) or {
+                "doi": doi,
+                "domain": domain,
+                "branch": None,
+                "url": None,
+                "failure": reason,
+                "action": "reprocess",
+                "attempt": 1,
+                "max_attempts": max_attempts,
+            }
+            entry.pop("running", None)
+            entry["due"] = due
+            entry["updated"] = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+            self.entries[doi] = entry
+            self._save()
+
+    def enqueue(self, items: List[Dict]):
+        """登记一批已知下载链接、可立即重新下载的论文(如离线回放找到的新链接)，不计入尝试次数
+        
+        items: [{"doi", "domain", "url", "branch", "max_attempts", "failure"}]
+        """
+        with self.lock:
+            now = time.time()
+            for item in items:
+                self.entries[item["doi"]] = {
+                    "doi": item["doi"],
+                    "domain": item["domain"],
+                    "branch": item.get("branch", "keyword"),
+                    "url": item["url"],
+                    "failure": item.get("failure", "replay"),
+                    "action": "redownload",
+                    "attempt": 1,
+                    "max_attempts": item["max_attempts"],
+                    "due": now,
+                    "updated": datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
+                }
+            self._save()
+
+    def pop_due(self, now: Optional[float] = None) -> List[Dict]:
+        """取出所有已到期的重试项(按到期时间排序)；取出的项在remove/schedule之前仍保留在文件中"""
+        now = now or time.time()
+        with self.lock:
+            due = sorted((e for e in self.entries.values() if e["due"] <= now and not e.get("running")),
+                         key=lambda e: e["due"])
+            for entry in due:
+                entry["running"] = True
+            return [dict(entry) for entry in due]
+
+    def next_due(self) -> Optional[float]:
+        """最近一个未执行重试项的到期时间"""
+        with self.lock:
+            pending = [e["due"] for e in self.entries.values() if not e.get("running")]
+            return min(pending) if pending else None
+
+    def remove(self, doi: str):
+        """移出队列(下载成功或不再重试)"""
+        with self.lock:
+            if self.entries.pop(doi, None) is not None:
+                self._save()
+
+    def _save(self):
+        try:
+            entries = [{k: v for k, v in e.items() if k != "running"} for e in self.entries.values()]
+            temp_path = self.json_path + ".tmp"
+            with open(temp_path, 'w', encoding='utf-8') as f:
+                json.dump({"entries": entries}, f, ensure_ascii=False, indent=2)
+            os.replace(temp_path, self.json_path)
+        except Exception as e:
+            print(f"[重试队列警告] 队列保存失败: {str(e)}")
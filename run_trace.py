@@ -0,0 +1,233 @@
+import os
+import sys
+import json
+import math
+import time
+import functools
+import threading
+from contextlib import contextmanager, nullcontext
+from datetime import datetime
+from typing import Dict, List, Optional
+
+
+class RunTracer:
+    """运行耗时追踪类：记录分阶段的span(含time.sleep等待时间)，输出JSONL和Chrome trace"""
+    def __init__(self, output_dir: str, run_id: Optional[str] = None):
+        self.output_dir = output_dir
+        self.run_id = run_id or datetime.now().strftime("%Y%m%d_%H%M%S")
+        os.makedirs(output_dir, exist_ok=True)
+        self.jsonl_path = os.path.join(output_dir, f"trace_{self.run_id}.jsonl")
+        self.chrome_path = os.path.join(output_dir, f"trace_{self.run_id}.json")
+        self.summary_path = os.path.join(output_dir, f"trace_{self.run_id}_summary.txt")
+        self.records: List[Dict] = []
+        self.local = threading.local()  # 每个线程独立的span栈和上下文
+        self.lock = threading.Lock()
+        self.jsonl_file = open(self.jsonl_path, "a", encoding="utf-8")
+        self._next_id = 0
+
+    def _stack(self) -> List[Dict]:
+        if not hasattr(self.local, "stack"):
+            self.local.stack = []
+            self.local.context = {}
+        return self.local.stack
+
+    def set_context(self, **attrs):
+        """设置当前线程的上下文属性(如doi、domain)，之后结束的span都会带上"""
+        self._stack()
+        self.local.context.update(attrs)
+
+    def clear_context(self):
+        self._stack()
+        self.local.context = {}
+
+    def add_sleep(self, seconds: float):
+        """把time.sleep的时间计入当前线程所有未结束的span"""
+        for span in self._stack():
+            span["sleep"] += seconds
+
+    @contextmanager
+    def span(self, name: str, **attrs):
+        """记录一个阶段的耗时"""
+        stack = self._stack()
+        with self.lock:
+            self._next_id += 1
+            span_id = self._next_id
+        span = {
+            "id": span_id,
+            "parent": stack[-1]["id"] if stack else None,
+            "name": name,
+            "start": time.time(),
+            "sleep": 0.0,
+            "attrs": dict(attrs),
+        }
+        stack.append(span)
+        try:
+            yield span["attrs"]
+        except BaseException as e:
+            span["attrs"]["error"] = type(e).__name__
+            raise
+        finally:
+            stack.pop()
+            self._finish(span)
+
+    def _finish(self, span: Dict):
+        attrs = dict(self.local.context)
+        attrs.update(span["attrs"])
+        record = {
+            "id": span["id"],
+            "parent": span["parent"],
+            "name": span["name"],
+            "start": round(span["start"], 6),
+            "dur": round(time.time() - span["start"], 6),
+            "sleep": round(span["sleep"], 6),
+            "tid": threading.get_ident(),
+            "attrs": attrs,
+        }
+        with self.lock:
+            self.records.append(record)
+            self.jsonl_file.write(json.dumps(record, ensure_ascii=False) + "\n")
+            self.jsonl_file.flush()
+
+    def close(self):
+        """写出Chrome trace和统计报告"""
+        with self.lock:
+            self.jsonl_file.close()
+            records = list(self.records)
+        write_chrome_trace(records, self.chrome_path)
+        report = summarize(records)
+        with open(self.summary_path, "w", encoding="utf-8") as f:
+            f.write(report)
+        print(report)
+        print(f"[耗时追踪] 明细: {self.jsonl_path}")
+        print(f"[耗时追踪] Chrome trace: {self.chrome_path} (可在 chrome://tracing 或 Perfetto 中打开)")
+
+
+def percentile(values: List[float], p: float) -> float:
+    """最近秩百分位数"""
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    index = max(0, min(len(ordered) - 1, math.ceil(p / 100.0 * len(ordered)) - 1))
+    return ordered[index]
+
+
+def write_chrome_trace(records: List[Dict], path: str):
+    """按Chrome trace事件格式输出完整事件(ph=X)"""
+    events = []
+    for record in records:
+        args = dict(record["attrs"])
+        args["sleep_s"] = record["sleep"]
+        events.append({
+            "name": record["name"],
+            "cat": args.get("domain") or "run",
+            "ph": "X",
+            "ts": int(record["start"] * 1e6),
+            "dur": int(record["dur"] * 1e6),
+            "pid": os.getpid(),
+            "tid": record["tid"],
+            "args": args,
+        })
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump({"traceEvents": events, "displayTimeUnit": "ms"}, f, ensure_ascii=False)
+
+
+def summarize(records: List[Dict]) -> str:
+    """按阶段、按阶段+域名统计 p50/p95"""
+    by_stage: Dict[str, List[Dict]] = {}
+    by_domain: Dict[tuple, List[Dict]] = {}
+    for record in records:
+        by_stage.setdefault(record["name"], []).append(record)
+        domain = record["attrs"].get("domain")
+        if domain:
+            by_domain.setdefault((record["name"], domain), []).append(record)
+
+    def rows(groups) -> List[str]:
+        lines = []
+        for key in sorted(groups, key=lambda k: -sum(r["dur"] for r in groups[k])):
+            durations = [r["dur"] for r in groups[key]]
+            sleeps = [r["sleep"] for r in groups[key]]
+            total = sum(durations)
+            label = key if isinstance(key, str) else f"{key[0]} @ {key[1]}"
+            lines.append(f"{label:<48} {len(durations):>5} {percentile(durations, 50):>9.2f} "
+                         f"{percentile(durations, 95):>9.2f} {total:>10.1f} "
+                         f"{(sum(sleeps) / total if total else 0):>7.0%}")
+        return lines
+
+    header = f"{'阶段':<48} {'次数':>5} {'p50(秒)':>9} {'p95(秒)':>9} {'合计(秒)':>10} {'sleep':>7}"
+    report = [f"\n{'='*50}", "[耗时追踪] 各阶段耗时", header]
+    report += rows(by_stage)
+    report += ["", "[耗时追踪] 各阶段按域名耗时", header]
+    report += rows(by_domain)
+    report.append(f"{'='*50}")
+    return "\n".join(report) + "\n"
+
+
+# 当前运行的追踪器，未启用时各处的span为空操作
+_active: Optional[RunTracer] = None
+_original_sleep = time.sleep
+
+
+def _traced_sleep(seconds):
+    _original_sleep(seconds)
+    tracer = _active
+    if tracer is not None:
+        tracer.add_sleep(seconds)
+
+
+def start(output_dir: str, run_id: Optional[str] = None) -> RunTracer:
+    """开始追踪本次运行，并接管time.sleep以统计等待时间"""
+    global _active
+    _active = RunTracer(output_dir, run_id)
+    time.sleep = _traced_sleep
+    print(f"[耗时追踪] 已开启，输出目录: {output_dir}")
+    return _active
+
+
+def stop():
+    """结束追踪并输出报告"""
+    global _active
+    tracer, _active = _active, None
+    time.sleep = _original_sleep
+    if tracer is not None:
+        tracer.close()
+
+
+def span(name: str, **attrs):
+    """在当前追踪器中记录一个阶段，未开启追踪时不做任何事"""
+    tracer = _active
+    if tracer is None:
+        return nullcontext({})
+    return tracer.span(name, **attrs)
+
+
+def traced(name: str, **attrs):
+    """装饰器：把整个函数调用记录为一个span"""
+    def decorator(func):
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            with span(name, **attrs):
+                return func(*args, **kwargs)
+        return wrapper
+    return decorator
+
+
+def set_context(**attrs):
+    tracer = _active
+    if tracer is not None:
+        tracer.set_context(**attrs)
+
+
+def clear_context():
+    tracer = _active
+    if tracer is not None:
+        tracer.clear_context()
+
+
+if __name__ == "__main__":
+    # 对已有的JSONL明细重新生成统计报告: python run_trace.py trace_xxx.jsonl
+    if len(sys.argv) < 2:
+        print("用法: python run_trace.py <trace.jsonl>")
+        sys.exit(1)
+    with open(sys.argv[1], "r", encoding="utf-8") as f:
+        loaded = [json.loads(line) for line in f if line.strip()]
+    print(summarize(loaded))
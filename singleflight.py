@@ -0,0 +1,144 @@
+import os
+import json
+import time
+import uuid
+import socket
+import hashlib
+import threading
+from datetime import datetime
+from typing import Dict, Optional
+
+try:
+    import psutil
+except ImportError:  # 未安装psutil时只按锁文件的时间判断是否失效
+    psutil = None
+
+from doi_index import doi_key
+
+
+class DoiSingleFlight:
+    """跨进程的同DOI请求合并：多个项目同时处理同一DOI时，只有先拿到锁文件的进程执行
+    打开页面、登录、下载的完整流程；其它进程等待并共享其结果(最终URL、HTML快照、PDF路径)
+
+    锁文件和结果文件保存在各项目共享的目录中，以规范DOI键的哈希命名:
+      <root>/<sha1>.lock   正在处理的进程(主机、PID、开始时间)
+      <root>/<sha1>.json   最近一次处理的结果
+    持有进程退出或超过stale_after仍未完成时锁失效，可被其它进程接管。
+    """
+
+    def __init__(self, root: str, stale_after: float = 1800, result_ttl: float = 86400):
+        self.root = root
+        self.stale_after = stale_after  # 锁文件超过多久视为失效(秒)
+        self.result_ttl = result_ttl  # 结果保留多久(秒)
+        self.host = socket.gethostname()
+        self.owned: Dict[str, str] = {}  # 规范DOI键 -> 本进程持有的锁令牌
+        self.lock = threading.Lock()
+        os.makedirs(root, exist_ok=True)
+        self.cleanup()
+
+    def _path(self, doi: str, ext: str) -> str:
+        digest = hashlib.sha1(doi_key(doi).encode("utf-8")).hexdigest()
+        return os.path.join(self.root, f"{digest}.{ext}")
+
+    def acquire(self, doi: str) -> bool:
+        """尝试成为该DOI的处理者；其它进程正在处理时返回False"""
+        key = doi_key(doi)
+        lock_path = self._path(doi, "lock")
+        token = uuid.uuid4().hex
+        info = {
+            "doi": key,
+            "host": self.host,
+            "pid": os.getpid(),
+            "token": token,
+            "started": datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
+        }
+        for _ in range(2):
+            try:
+                fd = os.open(lock_path, os.O_CREAT | os.O_EXCL | os.O_WRONLY)
+            except FileExistsError:
+                if not self._break_if_stale(lock_path):
+                    return False
+                continue
+            with os.fdopen(fd, 'w', encoding='utf-8') as f:
+                json.dump(info, f, ensure_ascii=False)
+            with self.lock:
+                self.owned[key] = token
+            return True
+        return False
+
+    def holder(self, doi: str) -> Optional[Dict]:
+        """正在处理该DOI的进程信息，没有时返回None"""
+        return self._read(self._path(doi, "lock"))
+
+    def result(self, doi: str) -> Optional[Dict]:
+        """最近一次处理的结果(超过result_ttl的不返回)"""
+        path = self._path(doi, "json")
+        try:
+            if time.time() - os.path.getmtime(path) > self.result_ttl:
+                return None
+        except OSError:
+            return None
+        return self._read(path)
+
+    def publish(self, doi: str, result: Optional[Dict]):
+        """写入处理结果并释放锁(result为None时只释放锁)；只释放本进程持有的锁"""
+        key = doi_key(doi)
+        with self.lock:
+            token = self.owned.pop(key, None)
+        if token is None:
+            return
+        if result is not None:
+            self._write_result(doi, token, result)
+        lock_path = self._path(doi, "lock")
+        if (self._read(lock_path) or {}).get("token") == token:
+            self._remove(lock_path)
+
+    def _write_result(self, doi: str, token: str, result: Dict):
+        result = dict(result, doi=doi_key(doi), host=self.host, pid=os.getpid(),
+                      finished=datetime.now().strftime("%Y-%m-%d %H:%M:%S"))
+        path = self._path(doi, "json")
+        try:
+            temp_path = f"{path}.{token}.tmp"
+            with open(temp_path, 'w', encoding='utf-8') as f:
+                json.dump(result, f, ensure_ascii=False, indent=2)
+            os.replace(temp_path, path)
+        except OSError as e:
+            print(f"[请求合并警告] 结果保存失败: {str(e)}")
+
+    def _break_if_stale(self, lock_path: str) -> bool:
+        """锁的持有进程已退出或超时未完成时删除锁，返回是否已删除"""
+        info = self._read(lock_path)
+        try:
+            age = time.time() - os.path.getmtime(lock_path)
+        except OSError:
+            return True  # 锁刚被释放
+        dead = (psutil is not None and info and info.get("host") == self.host
+                and not psutil.pid_exists(info.get("pid", 0)))
+        if not dead and age < self.stale_after:
+            return False
+        print(f"[请求合并] 接管失效的锁: {(info or {}).get('doi', lock_path)} "
+              f"({'持有进程已退出' if dead else f'已持有{age:.0f}秒'})")
+        self._remove(lock_path)
+        return True
+
+    def cleanup(self):
+        """删除过期的结果文件和遗留的临时文件"""
+        now = time.time()
+        for entry in os.scandir(self.root):
+            if entry.name.endswith((".json", ".tmp")) and now - entry.stat().st_mtime > self.result_ttl:
+                self._remove(entry.path)
+
+    @staticmethod
+    def _read(path: str) -> Optional[Dict]:
+        try:
+            with open(path, 'r', encoding='utf-8') as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return None
+
+    @staticmethod
+    def _remove(path: str):
+        try:
+            os.remove(path)
+        except OSError:
+            pass
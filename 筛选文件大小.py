@@ -2,6 +2,8 @@ import os
 import csv
 import re
 
+from paper_library import LibraryLayout
+
 def advanced_path_matching_process(folder_path, csv_file_path, output_csv_path):
     """
     增强版路径匹配处理
@@ -46,12 +48,14 @@ def advanced_path_matching_process(folder_path, csv_file_path, output_csv_path):
     print(f"开始处理文件夹: {folder_path}")
     print(f"大小阈值: {SIZE_THRESHOLD/(1024 * 1024):.1f} MB")
     
-    for filename in os.listdir(folder_path):
-        if filename.lower().endswith('.pdf'):
-            file_path = os.path.join(folder_path, filename)
+    # 递归遍历分片目录，文件大小直接取自目录项
+    for entry in LibraryLayout(folder_path).iter_files():
+        if entry.name.lower().endswith('.pdf'):
+            filename = entry.name
+            file_path = entry.path
             
             try:
-                file_size = os.path.getsize(file_path)
+                file_size = entry.stat().st_size
                 
                 if file_size < SIZE_THRESHOLD:
                     print(f"\n删除小文件: {filename} ({file_size/(1024 * 1024):.2f} MB)")